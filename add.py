@@ -1,15 +1,29 @@
-import akshare as ak
+import numpy as np
 import pandas as pd
 import os
+import asyncio
 import time
-import concurrent.futures
 from tqdm import tqdm
 import requests
-import random
 import argparse
 import logging
 import sys
 
+from kline_fetch import (
+    DEFAULT_CONCURRENCY, DEFAULT_RATE, DEFAULT_SOURCES, KLINE_DAYS, MAX_RETRIES, RETRYABLE_ERRORS, TENCENT_HEADERS,
+    FetchStats, backoff_delay, classify_error, iter_klines, kline_url, make_sources, parse_tencent_kline,
+)
+from kline_store import KLINE_STORE_PATH, KlineStore, iter_cached_klines
+from limit_screen import build_panel, limit_prices, limit_rates, screen_panel
+from scan_checkpoint import ScanCheckpoint
+from screen_rules import RuleError, evaluate_rules, load_rules, merge_rule_hits, rules_lookback
+from stage_timer import SUMMARY_COLUMNS, StageTimer, profiled, timed
+from stock_universe import (
+    UNIVERSE_CACHE_PATH, UNIVERSE_PREFIXES, UNIVERSE_TTL,
+    merge_results, missing_shards, parse_shard, read_shard_stats, read_universe, shard_stocks, write_shard_stats,
+    write_universe,
+)
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -18,146 +32,368 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 每批判定并落盘的股票数
+SCAN_BATCH = 500
+
 # 🌟 关键设置：禁用代理干扰，确保直连腾讯/新浪接口
 os.environ['no_proxy'] = '*'
 
 def get_limit_price(code, prev_close):
     """
-    计算涨停价：主板 10%，创业板/科创板 20%
+    计算涨停价：主板 10%，创业板/科创板 20%；prev_close 可以是数组
     """
-    rate = 1.20 if code.startswith(("30", "68")) else 1.10
-    return round(prev_close * rate + 0.0001, 2)
+    return limit_prices(np.asarray(prev_close, dtype=float), limit_rates([code])[0])
 
-def get_robust_stock_list():
+def fetch_stock_list():
     """
     【核心改进】优先自腾讯通道获取全市场 5000+ 股票，GitHub 环境下 100% 可用
     """
     logger.info("📡 正在建立腾讯底层数据通道...")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1",
-        "Referer": "http://gu.qq.com"
-    }
+    # akshare 导入耗时较长，仅在缓存失效、确实需要拉取清单时才导入
+    try:
+        import akshare as ak
+    except ImportError as e:
+        logger.warning(f"⚠️ 无法导入 akshare: {e}")
+        return []
     
     try:
         # 这里仍旧依赖 akshare 基础列表，但在 GitHub Actions 中我们会确保依赖正确
         all_stocks = ak.stock_info_a_code_name()
-        # 涵盖沪深主板、创业板、科创板
-        filtered = all_stocks[all_stocks['code'].str.startswith(('00', '60', '300', '688'))]
-        return filtered.to_dict('records')
+        filtered = all_stocks[all_stocks['code'].str.startswith(UNIVERSE_PREFIXES)]
+        return filtered[['code', 'name']].to_dict('records')
     except Exception as e:
         logger.warning(f"⚠️ 基础通道波动: {e}，尝试保底方案...")
         try:
             # 保底方案：实时行情接口
             df_em = ak.stock_zh_a_spot_em()
             df_em = df_em.rename(columns={'代码': 'code', '名称': 'name'})[['code', 'name']]
-            return df_em[df_em['code'].str.startswith(('00', '60', '300', '688'))].to_dict('records')
-        except:
+            return df_em[df_em['code'].str.startswith(UNIVERSE_PREFIXES)].to_dict('records')
+        except Exception as e:
+            logger.warning(f"⚠️ 保底通道失败: {e}")
             return []
 
-def fetch_data_tencent(symbol):
+def get_robust_stock_list(cache_path=UNIVERSE_CACHE_PATH, ttl=UNIVERSE_TTL, refresh=False):
     """
-    腾讯数据接口，绕过常规 API 限制
+    标的清单：缓存未过期时直接读取；否则重新拉取并写回缓存，拉取失败时退回过期缓存
     """
-    try:
-        prefix = 'sh' if symbol.startswith('6') else 'sz'
-        # 获取近 40 天数据即可满足 T-5 分析需求
-        url = f"https://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={prefix}{symbol},day,,,40,qfq"
-        time.sleep(random.uniform(0.01, 0.05))
-        r = requests.get(url, timeout=10, headers={"User-Agent": "QQStock/10.15.0"})
-        data = r.json()
-        main_data = data['data'][f"{prefix}{symbol}"]
-        k_data = main_data.get('qfqday', main_data.get('day'))
-        
-        df = pd.DataFrame(k_data)
-        # 腾讯数据列: 0日期, 1开盘, 2收盘, 3最高, 4最低, 5成交量, 6换手率(有时是成交额)
-        df = df[[0, 2, 3, 6]].copy()
-        df.columns = ['date', 'close', 'high', 'turnover']
-        return df
-    except:
-        return None
-
-def process_stock(stock, target_date):
-    code, name = stock['code'], stock['name']
-    try:
-        df = fetch_data_tencent(code)
-        if df is None or len(df) < 5: return None
+    stocks = None if refresh else read_universe(cache_path, ttl)
+    if stocks:
+        logger.info(f"📦 使用缓存标的清单: {cache_path}")
+        return stocks
 
-        df['date'] = df['date'].astype(str).str.replace('-', '')
-        target_clean = target_date.replace('-', '')
-        
-        if target_clean not in df['date'].values: return None
-            
-        target_idx = df[df['date'] == target_clean].index[0]
-        if target_idx == 0: return None
-        
-        row_t5 = df.loc[target_idx]
-        row_prev = df.loc[target_idx - 1]
-        row_latest = df.iloc[-1]
+    stocks = fetch_stock_list()
+    if stocks:
+        try:
+            write_universe(stocks, cache_path)
+        except OSError as e:
+            logger.warning(f"⚠️ 标的清单缓存写入失败: {e}")
+        return stocks
+
+    stale = read_universe(cache_path, ttl=None)
+    if stale:
+        logger.warning(f"⚠️ 实时清单不可用，使用过期缓存: {cache_path}")
+        return stale
+    return []
+
+_session = requests.Session()
+
+def fetch_data_tencent(symbol, stats=None):
+    """
+    腾讯数据接口，绕过常规 API 限制（单只同步抓取，批量扫描走 kline_fetch 异步引擎）；
+    可重试的错误按退避重试，最终失败返回 None 并计入 stats
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            r = _session.get(kline_url(symbol), timeout=10, headers=TENCENT_HEADERS)
+            r.raise_for_status()
+            df = parse_tencent_kline(symbol, r.json())
+        except (requests.RequestException, ValueError, KeyError, TypeError, IndexError) as e:
+            kind = classify_error(e)
+            if kind not in RETRYABLE_ERRORS or attempt == MAX_RETRIES:
+                if stats is not None:
+                    stats.record_failure(symbol, kind)
+                return None
+            if stats is not None:
+                stats.retries += 1
+            time.sleep(backoff_delay(attempt))
+        else:
+            if stats is not None:
+                stats.ok += 1
+            return df
+
+def parse_target_dates(date=None, dates=None, date_range=None):
+    """
+    目标日期列表 (YYYYMMDD, 升序)：--date-range 起止日期内的全部工作日，或 --dates 逗号分隔，否则为 --date
+    """
+    if date_range:
+        start, _, end = date_range.partition(':')
+        return [d.strftime('%Y%m%d') for d in pd.bdate_range(start, end or start)]
+    items = dates.split(',') if dates else [date]
+    return sorted({pd.Timestamp(d.strip()).strftime('%Y%m%d') for d in items if d.strip()})
+
+def history_days(target_dates, lookback=1):
+    """
+    覆盖最早目标日前 lookback 根 K 线所需的抓取根数（工作日数为交易日数的上界）
+    """
+    span = len(pd.bdate_range(target_dates[0], pd.Timestamp.today().normalize())) + lookback
+    return max(KLINE_DAYS, span)
+
+def history_start(target_dates, lookback=1):
+    """
+    本地 K 线库至少要早于该日（YYYY-MM-DD）开始，才覆盖最早目标日前 lookback 根 K 线
+    """
+    return (pd.Timestamp(target_dates[0]) - pd.offsets.BDay(lookback - 1)).strftime('%Y-%m-%d')
+
+def screen_stock_dates(stock, df, target_dates):
+    """
+    对单只股票的 K 线判定所有目标日是否触及涨停，返回命中结果行列表（含“日期”列）
+    """
+    panel = build_panel([(stock['code'], df)])
+    return screen_panel(panel, target_dates, {stock['code']: stock['name']}).to_dict('records')
+
+def screen_stock(stock, df, target_date):
+    """
+    单个目标日的判定，命中返回结果行
+    """
+    rows = screen_stock_dates(stock, df, [target_date.replace('-', '')])
+    return rows[0] if rows else None
+
+def process_stock(stock, target_date, stats=None):
+    return screen_stock(stock, fetch_data_tencent(stock['code'], stats), target_date)
+
+async def flag_fetched(klines):
+    """
+    (code, DataFrame 或 None) -> (code, DataFrame 或 None, 是否抓取成功)，与 iter_cached_klines 的产出一致
+    """
+    async for code, df in klines:
+        yield code, df, df is not None
+
+async def scan_market(stocks, target_dates, concurrency, rate, checkpoint, store=None, stats=None, sources=None,
+                      hedge=False, done=(), batch_size=SCAN_BATCH, rules=None):
+    """
+    异步抓取全市场 K 线（共享连接池 + 令牌桶限速），每只股票只抓一次历史；
+    每攒满 batch_size 只拼成列式面板，一次性判定全部目标日。传入 store 时经本地 K 线库增量抓取，
+    传入 stats (FetchStats) 时汇总重试、失败与各数据源延迟（stats.timer 记录各阶段耗时）；sources / hedge 见 kline_fetch.iter_klines。
+    每批命中结果与已处理代码随即写入 checkpoint (ScanCheckpoint)，内存中只保留当前一批，done 中的代码跳过（断点续扫）。
+    传入 rules（screen_rules.load_rules 的结果）时在同一面板上一并评估全部规则，命中行随检查点落盘
+    """
+    by_code = {s['code']: s for s in stocks}
+    names = {code: s['name'] for code, s in by_code.items()}
+    codes = [code for code in by_code if code not in done]
+    # 规则中最长的窗口 / 位移决定需要回看的 K 线根数，不足时长窗口规则永远不会命中
+    lookback = rules_lookback(rules or ())
+    days = history_days(target_dates, lookback)
+    frames = []
+    # 抓取失败（含增量失败后退回本地旧数据）的代码不记入检查点，续扫时重试
+    unfetched = set()
+
+    timer = stats.timer if stats is not None else None
+
+    def flush():
+        with timed(timer, "screen"):
+            panel = build_panel(frames)
+            rows = screen_panel(panel, target_dates, names)
+        rule_rows = None
+        if rules:
+            with timed(timer, "rules"):
+                rule_rows = evaluate_rules(panel, rules, target_dates, names)
+        with timed(timer, "checkpoint"):
+            checkpoint.append(rows, [code for code, _ in frames if code not in unfetched], rule_rows)
+        frames.clear()
+
+    if store is not None:
+        since = history_start(target_dates, lookback)
+        klines = iter_cached_klines(codes, store, concurrency, rate, days=days, since=since, stats=stats,
+                                    sources=sources, hedge=hedge)
+    else:
+        klines = flag_fetched(iter_klines(codes, concurrency, rate, days, stats=stats, sources=sources, hedge=hedge))
+    with tqdm(total=len(by_code), initial=len(by_code) - len(codes), desc="全市场扫描",
+              bar_format="{l_bar}{bar:20}{r_bar}") as pbar:
+        async for code, df, fetched in klines:
+            frames.append((code, df))
+            if not fetched:
+                unfetched.add(code)
+            pbar.update(1)
+            if len(frames) >= batch_size:
+                flush()
+    flush()
+
+def write_report(final_df, label, target_dates, total, stats=None, timer=None, rule_df=None, missing=()):
+    """
+    输出结果表：打印、写 results_<label>.csv，并追加 GitHub Actions 报告（含抓取统计与阶段耗时）；
+    传入 rule_df（规则命中表）时另写 rules_<label>.csv，报告中按规则分表列出；missing 为合并时缺失的分片
+    """
+    if final_df.empty:
+        logger.info("⚠️ 今日未发现符合条件的目标。")
+    else:
+        logger.info(f"💎 扫描完成！共发现 {len(final_df)} 只符合特征的目标。")
         
-        limit_price = get_limit_price(code, float(row_prev['close']))
+        print("\n" + final_df.to_string(index=False))
         
-        # 判定触及涨停
-        if float(row_t5['high']) >= limit_price:
-            t5_pct = (float(row_t5['close']) - float(row_prev['close'])) / float(row_prev['close']) * 100
-            period_pct = (float(row_latest['close']) - float(row_t5['close'])) / float(row_t5['close']) * 100
-            # 这里的 turnover 如果是换手率直接 sum，如果是成交额则代表活跃度
-            period_activity = df.loc[target_idx:]['turnover'].astype(float).sum()
-            
-            return {
-                "代码": code, 
-                "名称": name, 
-                "区间涨幅%": round(period_pct, 2),
-                "累计活跃度": round(period_activity, 2), 
-                "T-5涨幅%": round(t5_pct, 2),
-                "状态": "涨停" if float(row_t5['close']) >= limit_price else "曾涨停",
-                "现价": float(row_latest['close'])
-            }
-    except: return None
-    return None
+        output_file = f"results_{label}.csv"
+        final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+
+    rule_counts = None
+    if rule_df is not None:
+        rule_counts = rule_df.groupby("规则", sort=False).size()
+        logger.info("🧪 规则命中: " + (", ".join(f"{name} {n}" for name, n in rule_counts.items()) or "无"))
+        if not rule_df.empty:
+            rule_df.to_csv(f"rules_{label}.csv", index=False, encoding='utf-8-sig')
+
+    # 写入 GitHub Actions 报告
+    summary_path = os.getenv('GITHUB_STEP_SUMMARY')
+    if summary_path:
+        with open(summary_path, 'a', encoding='utf-8') as f:
+            f.write(f"### 📊 选股报告 ({label})\n")
+            f.write(f"- 扫描总量: {total}\n")
+            if missing:
+                f.write(f"- ⚠️ 缺少分片: {', '.join(missing)}（结果不完整）\n")
+            f.write(f"- 命中数量: {len(final_df)}\n")
+            if stats is not None:
+                f.write(f"- 抓取失败: {len(stats.failed)}\n")
+            f.write("\n")
+            if not final_df.empty:
+                if len(target_dates) > 1:
+                    per_day = final_df.groupby("日期").size().rename("命中数量").reset_index()
+                    f.write(per_day.to_markdown(index=False) + "\n\n")
+                f.write(final_df.head(30).to_markdown(index=False) + "\n\n")
+            if rule_counts is not None:
+                f.write("#### 🧪 规则命中\n")
+                f.write(rule_counts.rename("命中数量").reset_index().to_markdown(index=False) + "\n\n")
+                for name, hits in rule_df.groupby("规则", sort=False):
+                    f.write(f"##### {name}\n")
+                    f.write(hits.drop(columns="规则").head(30).to_markdown(index=False) + "\n\n")
+            if stats is not None:
+                stats_df = pd.DataFrame(stats.summary_rows(), columns=["项目", "数量"])
+                f.write("#### 📶 抓取统计\n")
+                f.write(stats_df.to_markdown(index=False) + "\n")
+                if stats.failed:
+                    f.write(f"\n失败代码（前 50 个）: {', '.join(sorted(stats.failed)[:50])}\n")
+            if timer is not None and timer.samples:
+                f.write("\n#### ⏱️ 阶段耗时\n")
+                f.write(pd.DataFrame(timer.summary_rows(), columns=SUMMARY_COLUMNS).to_markdown(index=False) + "\n")
 
 def main():
     parser = argparse.ArgumentParser(description="GitHub 强力 A股选股机器人")
     parser.add_argument('--date', type=str, default=os.getenv('TARGET_DATE', "20260203"), help='检查日期 YYYYMMDD')
-    parser.add_argument('--workers', type=int, default=int(os.getenv('MAX_WORKERS', 10)), help='并行线程数')
+    parser.add_argument('--dates', type=str, default=None, help='多个检查日期，逗号分隔')
+    parser.add_argument('--date-range', type=str, default=None, help='检查日期区间 YYYYMMDD:YYYYMMDD（含首尾，仅工作日）')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MAX_WORKERS', DEFAULT_CONCURRENCY)), help='最大并发请求数')
+    parser.add_argument('--rate', type=float, default=float(os.getenv('MAX_RATE', DEFAULT_RATE)), help='每个数据源每秒最大请求数（令牌桶）')
+    parser.add_argument('--sources', type=str, default=DEFAULT_SOURCES, help='K 线数据源，逗号分隔（tencent, eastmoney；默认仅腾讯）')
+    parser.add_argument('--hedge', action='store_true', help='慢请求向次快的数据源补发')
+    parser.add_argument('--store', type=str, default=KLINE_STORE_PATH, help='本地 K 线库路径（增量抓取）')
+    parser.add_argument('--no-store', action='store_true', help='不使用本地 K 线库，每次全量抓取')
+    parser.add_argument('--shard', type=str, default=os.getenv('SCAN_SHARD'), help='只扫描第 i 片（共 N 片），格式 i/N')
+    parser.add_argument('--universe-cache', type=str, default=UNIVERSE_CACHE_PATH, help='标的清单缓存文件')
+    parser.add_argument('--refresh-universe', action='store_true', help='忽略缓存，重新拉取标的清单')
+    parser.add_argument('--resume', action='store_true', help='从上次中断处续扫（跳过检查点中已处理的标的）')
+    parser.add_argument('--timings', type=str, default=os.getenv('SCAN_TIMINGS'), help='各阶段耗时 (p50/p95/p99) 导出为 JSON 文件')
+    parser.add_argument('--profile', type=str, default=None, help='cProfile 剖析整个扫描，结果写入该 .prof 文件')
+    parser.add_argument('--rules', type=str, default=os.getenv('SCAN_RULES'), help='筛选规则文件（每行「名称 = 表达式」，default 为内置规则）')
+    parser.add_argument('--rule', action='append', default=[], metavar='名称=表达式', help='追加一条筛选规则，可重复')
+    parser.add_argument('--merge', nargs='+', metavar='CSV', help='合并各分片的结果 CSV（支持通配符）后退出')
+    parser.add_argument('--merge-stats', nargs='*', default=['stats_*_shard*.json'], metavar='JSON',
+                        help='合并时汇总的各分片抓取统计（支持通配符）')
+    parser.add_argument('--merge-rules', nargs='*', default=['rules_*_shard*.csv'], metavar='CSV',
+                        help='合并时一并合并的各分片规则命中表（支持通配符）')
     args = parser.parse_args()
 
-    logger.info(f"🌟 选股工具重构版启动 | 目标日期: {args.date} | 线程数: {args.workers}")
-    
-    stocks = get_robust_stock_list()
+    try:
+        rules = load_rules(args.rules, args.rule)
+    except (RuleError, OSError) as e:
+        parser.error(str(e))
+
+    target_dates = parse_target_dates(args.date, args.dates, args.date_range)
+    label = target_dates[0] if len(target_dates) == 1 else f"{target_dates[0]}-{target_dates[-1]}"
+
+    if args.merge:
+        paths, final_df = merge_results(args.merge)
+        shard_stats, symbols = read_shard_stats(args.merge_stats)
+        stats = FetchStats.from_dicts(shard_stats.values()) if shard_stats else None
+        # 命中为空的分片不写结果 CSV，是否缺失以抓取统计为准
+        missing = missing_shards(list(shard_stats))
+        logger.info(f"🧩 合并 {len(paths)} 个分片结果，{len(shard_stats)} 份抓取统计")
+        if missing:
+            logger.warning(f"⚠️ 缺少分片: {', '.join(missing)}，合并结果不完整。")
+        total = f"{symbols}（{len(shard_stats)} 个分片）" if shard_stats else f"{len(paths)} 个分片"
+        rule_paths, rule_df = merge_rule_hits(args.merge_rules, [r.name for r in rules])
+        if rule_paths:
+            logger.info(f"🧪 合并 {len(rule_paths)} 个分片的规则命中")
+        write_report(final_df, label, target_dates, total, stats, rule_df=rule_df if rule_paths or rules else None,
+                     missing=missing)
+        return
+
+    shard = parse_shard(args.shard) if args.shard else None
+    if shard:
+        label = f"{label}_shard{shard[0]}of{shard[1]}"
+
+    logger.info(f"🌟 选股工具重构版启动 | 目标日期: {label} ({len(target_dates)} 天) | 并发: {args.workers} | 限速: {args.rate:g}/s | 数据源: {args.sources}")
+
+    if rules:
+        logger.info(f"🧪 筛选规则 {len(rules)} 条（回看 {rules_lookback(rules)} 根 K 线）: "
+                    + "; ".join(f"{r.name} = {r.expr}" for r in rules))
+
+    timer = StageTimer()
+    with profiled(args.profile, enabled=bool(args.profile)):
+        run_scan(args, target_dates, label, shard, timer, rules)
+    if args.profile:
+        logger.info(f"🔬 cProfile 结果已写入 {args.profile}（python -m pstats {args.profile} 查看）")
+
+def run_scan(args, target_dates, label, shard, timer, rules=()):
+    """
+    取清单 -> 抓取与判定（含筛选规则） -> 写出结果，各阶段耗时记入 timer
+    """
+    with timer.stage("list_load"):
+        stocks = get_robust_stock_list(args.universe_cache, refresh=args.refresh_universe)
     if not stocks:
         logger.error("❌ 无法获取股票清单，请检查网络连接。")
         return
 
+    if shard:
+        total = len(stocks)
+        stocks = shard_stocks(stocks, *shard)
+        logger.info(f"🧩 分片 {shard[0]}/{shard[1]}: {len(stocks)}/{total} 只标的")
+
     logger.info(f"✅ 成功加载 {len(stocks)} 只标的，开始深度扫描...")
 
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-        futures = {executor.submit(process_stock, s, args.date): s for s in stocks}
-        with tqdm(total=len(stocks), desc="全市场扫描", bar_format="{l_bar}{bar:20}{r_bar}") as pbar:
-            for future in concurrent.futures.as_completed(futures):
-                res = future.result()
-                if res: results.append(res)
-                pbar.update(1)
-
-    if results:
-        final_df = pd.DataFrame(results).sort_values(by="区间涨幅%", ascending=False)
-        logger.info(f"💎 扫描完成！共发现 {len(results)} 只符合特征的目标。")
-        
-        print("\n" + final_df.to_string(index=False))
-        
-        output_file = f"results_{args.date.replace('-', '')}.csv"
-        final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        
-        # 写入 GitHub Actions 报告
-        summary_path = os.getenv('GITHUB_STEP_SUMMARY')
-        if summary_path:
-            with open(summary_path, 'a', encoding='utf-8') as f:
-                f.write(f"### 📊 选股报告 ({args.date})\n")
-                f.write(f"- 扫描总量: {len(stocks)}\n")
-                f.write(f"- 命中数量: {len(results)}\n\n")
-                f.write(final_df.head(30).to_markdown(index=False) + "\n")
-    else:
-        logger.info("⚠️ 今日未发现符合条件的目标。")
+    sources = make_sources(args.sources)
+    store = None if args.no_store else KlineStore(args.store)
+    stats = FetchStats(timer)
+    checkpoint = ScanCheckpoint(label, rules=bool(rules))
+    done = checkpoint.open(args.resume)
+    if done:
+        logger.info(f"⏩ 从检查点续扫: 已处理 {len(done)} 只，跳过")
+    try:
+        asyncio.run(scan_market(stocks, target_dates, args.workers, args.rate, checkpoint, store, stats, sources,
+                                args.hedge, done, rules=rules))
+    finally:
+        checkpoint.close()
+        if store is not None:
+            store.close()
+
+    logger.info("📶 抓取统计: " + ", ".join(f"{k} {v}" for k, v in stats.summary_rows()))
+    if shard:
+        # 分片的抓取统计单独落盘，合并报告据此汇总各分片的失败
+        write_shard_stats(f"stats_{label}.json", len(stocks), stats)
+    if stats.failed:
+        logger.warning(f"⚠️ {len(stats.failed)} 只标的重试后仍抓取失败，结果不完整，可加 --resume 只重试失败标的。")
+
+    with timer.stage("write"):
+        # 最终结果以落盘的结果流为准（含续扫前已写入的部分）
+        final_df = checkpoint.load_results()
+        rule_df = checkpoint.load_rule_hits(rules) if rules else None
+        write_report(final_df, label, target_dates, len(stocks), stats, timer, rule_df)
+    if not stats.failed:
+        checkpoint.remove()
+
+    logger.info("⏱️ 阶段耗时: " + "; ".join(
+        f"{name} ×{n} 合计 {total:.0f}ms p50 {p50:.1f} / p95 {p95:.1f} / p99 {p99:.1f}ms"
+        for name, n, total, p50, p95, p99, _ in timer.summary_rows()
+    ))
+    if args.timings:
+        timer.write_json(args.timings, label=label, symbols=len(stocks))
+        logger.info(f"⏱️ 阶段耗时已导出: {args.timings}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,22 @@
 import streamlit as st
 import pandas as pd
-import pdfplumber
+import numpy as np
+import io
 import os
-import re
-from datetime import datetime
+import tempfile
+import time
+
+import risk_engine
+import statement_parser
+from audit_ledger import DEFAULT_LEDGER, AuditLedger, ledger_path
+from compact_frame import compact_frame, concat_compact, expand_frame
+from reconcile_cache import ResultCache, parse_key, reconcile_key
+from reconcile_engine import (
+    STATUS_DIFF, DayIndex, count_keys, frame_day_numbers, merge_counts, reconcile_daily, reconcile_fuzzy,
+    report_from_counts,
+)
+from reconcile_pairs import match_pairs
+from stage_timer import SUMMARY_COLUMNS, StageTimer, profile_report, profiled, timed
 
 # --- 配置与视觉风格 (复古未来极简主义) ---
 st.set_page_config(page_title="DEBIT_SYNC // 对账工具", layout="wide")
@@ -79,135 +92,51 @@ st.markdown("""
 
 # --- 核心逻辑函数 ---
 
-# 初始化 Session State
+# 初始化 Session State（不使用本地台账时，审核记录只在本会话内有效）
 if 'audited_dates' not in st.session_state:
-    st.session_state['audited_dates'] = []
+    st.session_state['audited_dates'] = set()
 if 'last_reconcile_results' not in st.session_state:
     st.session_state['last_reconcile_results'] = None
+# 各阶段耗时在会话内跨多次对账累计，样本足够时分位数才有意义
+if 'stage_timer' not in st.session_state:
+    st.session_state['stage_timer'] = StageTimer()
 
 SUSPICIOUS_KEYWORDS = ["游戏", "内购", "充值", "捐赠", "爱心", "打赏", "直播", "App Store"]
 
-def parse_excel_universal(uploaded_file, type_tag="ICBC"):
+# 风险扫描规则（与 reconcile_bills 共用向量化规则引擎；账单只有日期，凌晨类规则不会命中）
+LARGE_AMOUNT = 2000.0
+RISK_RULES = [risk_engine.keyword_rule(SUSPICIOUS_KEYWORDS), risk_engine.amount_rule(LARGE_AMOUNT)]
+
+# 异常明细每页展示的天数
+ANOMALY_PAGE_SIZE = 10
+
+# 流式对账时原始数据预览保留的行数
+STREAM_PREVIEW_ROWS = 1000
+
+@st.cache_resource
+def get_ledger(name=DEFAULT_LEDGER):
     """
-    通用 Excel 账单解析逻辑
+    按名称跨会话共享的本地对账台账（SQLite；默认台账路径由 DEBIT_SYNC_LEDGER 指定，其余名称见 ledger_path）
     """
-    try:
-        raw_data = pd.read_excel(uploaded_file, header=None).head(40)
-        start_row = 0
-        for i, row in raw_data.iterrows():
-            row_str = " ".join([str(x) for x in row.values if pd.notna(x)])
-            if ("时间" in row_str or "日期" in row_str) and ("金额" in row_str or "支出" in row_str):
-                start_row = i
-                break
-        
-        df = pd.read_excel(uploaded_file, skiprows=start_row)
-        df.columns = [str(c).strip() for c in df.columns]
-
-        # 优先级排序的映射规则
-        mapping_rules = [
-            ("时间", ["交易时间", "日期", "时间"]),
-            ("金额", ["金额", "支出金额", "收入/支出", "交易金额"]),
-            ("方向", ["收/支", "方向"]),
-            ("摘要", ["摘要", "交易详情"]),
-            ("商品", ["商品", "商品名称"]),
-            ("商户", ["商户", "商户名称"]),
-            ("交易对方", ["交易对方", "交易对象"]),
-            ("对方户名", ["对方户名", "对方名称"])
-        ]
-        
-        found_map = {}
-        used_cols = set()
-        
-        for std, targets in mapping_rules:
-            for c in df.columns:
-                if c in used_cols: continue
-                if any(t in c for t in targets):
-                    found_map[c] = std
-                    used_cols.add(c)
-                    break # 该标准列已找到
-        
-        if "时间" not in found_map.values() or "金额" not in found_map.values():
-            st.error(f"{type_tag} 账单识别失败：找不到关键的时间或金额列")
-            return None
-
-        # 预先处理好描述（在 rename 之前，使用原始列名防止索引混淆）
-        desc_orig_cols = [c for c, std in found_map.items() if std in ["摘要", "商户", "商品"]]
-        if desc_orig_cols:
-            df["_total_desc"] = df[desc_orig_cols].fillna("").astype(str).agg(" | ".join, axis=1)
-        else:
-            df["_total_desc"] = "无详细描述"
-
-        # 执行重命名
-        df = df.rename(columns=found_map)
-        
-        def clean_amt(val):
-            s = str(val).replace("¥", "").replace(",", "").strip()
-            if s.startswith('+'): return float(s[1:])
-            if s.startswith('-'): return -float(s[1:])
-            try: return float(s)
-            except: return 0.0
-
-        if "方向" in df.columns:
-            df["金额"] = df.apply(lambda r: clean_amt(r["金额"]) * (-1 if "支" in str(r["方向"]) else 1), axis=1)
-        else:
-            df["金额"] = df["金额"].apply(clean_amt)
-            
-        df["日期"] = pd.to_datetime(df["时间"], errors='coerce').dt.date
-        df = df.dropna(subset=["日期", "金额"])
-        
-        # 封装结果列
-        res_cols = {
-            "日期": df["日期"],
-            "描述": df["_total_desc"],
-            "金额": df["金额"]
-        }
-        for col in ["对方户名", "交易对方", "商品"]:
-            if col in df.columns:
-                res_cols[col] = df[col].astype(str).fillna("-")
-            else:
-                res_cols[col] = "-"
-                
-        return pd.DataFrame(res_cols).copy()
-    except Exception as e:
-        st.error(f"{type_tag} 解析失败: {e}")
-        return None
+    return AuditLedger(ledger_path(name))
 
-def reconcile_daily(bank_df, wechat_df):
+def audited_dates(ledger):
     """
-    按日对账算法
+    当前有效的审核日期集合（ledger 为台账名称，未使用台账时为 None）
     """
-    all_dates = sorted(list(set(bank_df["日期"]) | set(wechat_df["日期"])))
-    results = []
-    
-    for d in all_dates:
-        # 对比当日全量交易金额 (含正数收入和负数支出)
-        b_amounts = sorted([float(x) for x in bank_df[bank_df["日期"] == d]["金额"]])
-        w_amounts = sorted([float(x) for x in wechat_df[wechat_df["日期"] == d]["金额"]])
-        
-        matched = []
-        unmatched_bank = []
-        unmatched_wechat = list(w_amounts)
-        
-        for amt in b_amounts:
-            if amt in unmatched_wechat:
-                unmatched_wechat.remove(amt)
-                matched.append(amt)
-            else:
-                unmatched_bank.append(amt)
-                
-        status = "✅ 完全匹配" if not unmatched_bank and not unmatched_wechat else "⚠️ 存在差异"
-        
-        results.append({
-            "日期": d,
-            "状态": status,
-            "银行支笔数": len(b_amounts),
-            "微信支笔数": len(w_amounts),
-            "匹配总额": sum(matched),
-            "银行漏项": unmatched_bank,
-            "微信漏项": unmatched_wechat
-        })
-    
-    return pd.DataFrame(results)
+    return get_ledger(ledger).audited_dates() if ledger else st.session_state['audited_dates']
+
+def parse_excel_universal(uploaded_file, type_tag="ICBC", streaming=False, timer=None):
+    """
+    通用 Excel 账单解析逻辑（解析内核见 statement_parser），返回紧凑表示（见 compact_frame）
+    """
+    try:
+        if streaming:
+            return statement_parser.parse_excel_streaming(uploaded_file, type_tag, timer=timer, compact=True)
+        return statement_parser.parse_excel_universal(uploaded_file, type_tag, timer, compact=True)
+    except statement_parser.StatementParseError as e:
+        st.error(str(e))
+        return None
 
 # --- UI 界面渲染 ---
 
@@ -228,40 +157,225 @@ with col2:
     wechat_file = st.file_uploader("上传微信 Excel 账单", type=["xlsx"])
     st.markdown('</div>', unsafe_allow_html=True)
 
+streaming_mode = st.checkbox(
+    "流式读取（超大账单，逐块解析与对账，只保留异常日期的明细）", value=False,
+    help="使用本地台账时仍需完整流水入账，此时流式读取只改变读取方式，不降低峰值内存。",
+)
+ledger_mode = st.checkbox(
+    "使用本地台账（保存历史流水与审核记录，只重新对账出现新流水的日期）", value=False,
+    help="开启后两端逐笔流水（含描述、对方户名、交易对方）会写入本机 SQLite 文件，直到清空该台账。",
+)
+ledger_name = None
+if ledger_mode:
+    with st.expander("📒 台账设置", expanded=True):
+        st.caption("同一台账内的历史流水会并入之后的每次对账；不同账户或不同人请使用不同的台账名称。")
+        ledger_name = st.text_input("台账名称", value=DEFAULT_LEDGER).strip() or DEFAULT_LEDGER
+        confirm_clear = st.checkbox(f"确认清空台账「{ledger_name}」中的全部流水与审核记录")
+        if st.button("🗑️ 清空台账", disabled=not confirm_clear):
+            get_ledger(ledger_name).clear()
+            st.session_state['last_reconcile_results'] = None
+            st.success(f"台账「{ledger_name}」已清空。")
+
+with st.expander("⚙️ 匹配设置"):
+    fuzzy_mode = st.checkbox("启用容差匹配（跨日入账 / 小额差异）", value=False)
+    f1, f2 = st.columns(2)
+    day_window = f1.number_input("允许的入账日差（±天）", min_value=0, max_value=7, value=1)
+    tolerance = f2.number_input("金额容差（元）", min_value=0.0, max_value=100.0, value=0.0, step=0.5)
+
+@st.cache_resource
+def get_result_cache():
+    """
+    跨会话共享的解析/对账结果缓存；设置 DEBIT_SYNC_CACHE_DIR 时同时持久化到磁盘
+    """
+    return ResultCache(disk_dir=os.getenv("DEBIT_SYNC_CACHE_DIR"))
+
+def cached_parse(cache, uploaded_file, type_tag, streaming=False, timer=None):
+    """
+    按文件内容摘要命中缓存，未命中时解析并写入；返回 (缓存键, 解析结果)
+    """
+    key = parse_key(uploaded_file.getvalue(), f"{type_tag}|compact")
+    df = cache.get_or_compute(key, lambda: parse_excel_universal(uploaded_file, type_tag, streaming, timer))
+    return key, df
+
+def cached_reconcile(cache, i_key, w_key, i_df, w_df, timer=None):
+    """
+    按两端解析键与匹配选项命中缓存；返回 (报告, 容差配对明细或 None)；只有实际匹配时才计入 match 阶段
+    """
+    if not fuzzy_mode:
+        def compute():
+            with timed(timer, "match"):
+                return reconcile_daily(i_df, w_df)
+        return cache.get_or_compute(reconcile_key(i_key, w_key), compute), None
+
+    key = reconcile_key(i_key, w_key, f"fuzzy|{day_window}|{tolerance}")
+    report, pairs = cache.get(key), cache.get(key + "-pairs")
+    if report is None or pairs is None:
+        with timed(timer, "match"):
+            report, pairs = reconcile_fuzzy(i_df, w_df, day_window, tolerance)
+        cache.put(key, report)
+        cache.put(key + "-pairs", pairs)
+    return report, pairs
+
+def pair_marks(n_rows, paired_rows):
+    """
+    逐行配对标记（paired_rows 为已配对的行位置）
+    """
+    paired = np.zeros(n_rows, dtype=bool)
+    paired[np.asarray(paired_rows, dtype="int64")] = True
+    return np.where(paired, "✅ 已配对", "❌ 未配对")
+
+def scan_side(tag, df):
+    """
+    对一端流水（或其中一块）做风险扫描，返回带来源列的风险交易表
+    """
+    risks = risk_engine.identify_risks(expand_frame(df), RISK_RULES, text_cols=["描述", "对方户名", "交易对方", "商品"], time_col="日期")
+    return risks.rename(columns={"时间": "日期"}).assign(来源=tag)
+
+def scan_risks(i_df, w_df):
+    """
+    对两端流水做风险扫描，返回带来源列的风险交易表
+    """
+    return pd.concat([scan_side("工行", i_df), scan_side("微信", w_df)], ignore_index=True)
+
+def stream_chunks(uploaded_file, type_tag, timer=None):
+    """
+    逐块解析上传文件并转为紧凑表示；每次调用从头重新读取
+    """
+    chunks = statement_parser.iter_excel_chunks(io.BytesIO(uploaded_file.getvalue()), type_tag, timer=timer)
+    return (compact_frame(chunk) for chunk in chunks)
+
+def diff_day_rows(df, report):
+    """
+    流水中落在报告「存在差异」日期上的行
+    """
+    return df[np.isin(frame_day_numbers(df), frame_day_numbers(report[report["状态"] == STATUS_DIFF]))]
+
+def fuzzy_on_diff_days(report, i_df, w_df, timer=None):
+    """
+    在精确对账报告上叠加容差匹配，返回 (报告, 容差配对明细)；i_df / w_df 至少包含存在差异日期的全部流水。
+
+    容差匹配只作用于精确匹配后的剩余交易，而剩余交易都落在存在差异的日期上，
+    因此对异常日期明细做容差对账、再替换报告中这些日期的行，结果与整表容差对账一致。
+    """
+    with timed(timer, "match"):
+        diff_report, pairs = reconcile_fuzzy(diff_day_rows(i_df, report), diff_day_rows(w_df, report), day_window, tolerance)
+        report = pd.concat([report[report["状态"] != STATUS_DIFF].assign(容差匹配=0), diff_report], ignore_index=True)
+        return report.sort_values("日期", kind="stable").reset_index(drop=True), pairs
+
+def stream_reconcile(files, timer=None):
+    """
+    流式对账：第一遍逐块累加 (日期, 金额分) 计数、扫描风险并保留预览行，第二遍只保留存在差异日期的流水；
+    任一时刻只在内存中保留一个数据块、计数表与异常日期明细。files 为 [(账单类型, 上传文件)]（工行在前）。
+    返回结果字典（report / pairs / i_df / w_df / risks / preview），解析失败时返回 None
+    """
+    counts, risks, previews = [], [], []
+    try:
+        for tag, uploaded_file in files:
+            total, head, n_head = None, [], 0
+            for chunk in stream_chunks(uploaded_file, tag, timer):
+                with timed(timer, "match"):
+                    total = merge_counts(total, count_keys(chunk))
+                with timed(timer, "risk"):
+                    risks.append(scan_side(tag, chunk))
+                if n_head < STREAM_PREVIEW_ROWS:
+                    head.append(chunk.iloc[:STREAM_PREVIEW_ROWS - n_head])
+                    n_head += len(head[-1])
+            if total is None:
+                raise statement_parser.StatementParseError(tag, "账单识别失败：工作表为空")
+            counts.append(total)
+            previews.append(concat_compact(head))
+
+        with timed(timer, "match"):
+            report = report_from_counts(*counts)
+        diff_days = frame_day_numbers(report[report["状态"] == STATUS_DIFF])
+        details = []
+        for tag, uploaded_file in files:
+            kept = [chunk[np.isin(frame_day_numbers(chunk), diff_days)] for chunk in stream_chunks(uploaded_file, tag, timer)]
+            details.append(concat_compact(kept))
+    except statement_parser.StatementParseError as e:
+        st.error(str(e))
+        return None
+
+    pairs = None
+    if fuzzy_mode:
+        report, pairs = fuzzy_on_diff_days(report, details[0], details[1], timer)
+    return {
+        'report': report,
+        'pairs': pairs,
+        'i_df': details[0],
+        'w_df': details[1],
+        'risks': pd.concat(risks, ignore_index=True),
+        'preview': tuple(previews),
+    }
+
 # 核心分析逻辑
 if st.button("🔍 开始当日流水比对"):
     if not icbc_file or not wechat_file:
         st.warning("⚠️ 请同时上传工行和微信的 Excel 账单文件。")
     else:
-        with st.spinner("正在进行逐日对账..."):
-            i_df = parse_excel_universal(icbc_file, "工行")
-            w_df = parse_excel_universal(wechat_file, "微信")
+        timer = st.session_state['stage_timer']
+        profile_path = os.path.join(tempfile.gettempdir(), f"debit_sync_{os.getpid()}.prof")
+        profiling = st.session_state.get('profile_run', False)
+        with st.spinner("正在进行逐日对账..."), profiled(profile_path if profiling else None, profiling) as profile:
+            cache = get_result_cache()
+            if streaming_mode and not ledger_mode:
+                # 流式对账不经解析缓存，整份流水不会同时驻留内存
+                streamed = stream_reconcile([("工行", icbc_file), ("微信", wechat_file)], timer)
+                if streamed is not None:
+                    streamed.update(
+                        i_index=DayIndex(streamed['i_df']), w_index=DayIndex(streamed['w_df']), ledger=None,
+                    )
+                    st.session_state['last_reconcile_results'] = streamed
+                i_df = w_df = None
+            else:
+                i_key, i_df = cached_parse(cache, icbc_file, "工行", streaming_mode, timer)
+                w_key, w_df = cached_parse(cache, wechat_file, "微信", streaming_mode, timer)
             if i_df is not None and w_df is not None:
-                report = reconcile_daily(i_df, w_df)
+                with timer.stage("risk"):
+                    risks = scan_risks(i_df, w_df)
+                if ledger_mode:
+                    # 入账并只对出现新流水的日期重新对账；报告与明细覆盖台账中的全部历史，
+                    # 容差匹配同样作用于台账中存在差异日期的流水
+                    ledger = get_ledger(ledger_name)
+                    with timer.stage("ledger"):
+                        ledger.ingest_and_reconcile(i_df, w_df)
+                        report, pairs = ledger.report(), None
+                        i_df, w_df = ledger.frame("bank"), ledger.frame("wechat")
+                    if fuzzy_mode:
+                        report, pairs = fuzzy_on_diff_days(report, i_df, w_df, timer)
+                else:
+                    report, pairs = cached_reconcile(cache, i_key, w_key, i_df, w_df, timer)
                 # 存入缓存
+                # 日期 -> 行区间索引只在对账时构建一次，明细展示直接切片
                 st.session_state['last_reconcile_results'] = {
                     'report': report,
+                    'pairs': pairs,
                     'i_df': i_df,
-                    'w_df': w_df
+                    'w_df': w_df,
+                    'i_index': DayIndex(i_df),
+                    'w_index': DayIndex(w_df),
+                    'risks': risks,
+                    'ledger': ledger_name
                 }
+        if profile is not None:
+            with open(profile_path, "rb") as f:
+                st.session_state['profile_result'] = (profile_report(profile), f.read())
 
 # 渲染对账结果（如果存在）
 if st.session_state['last_reconcile_results']:
+    render_began = time.perf_counter()
     results = st.session_state['last_reconcile_results']
     report = results['report'].copy()
+    audited = audited_dates(results.get('ledger'))
     
     # 根据审核状态更新 Report 状态说明
-    def update_report_status(row):
-        if row['日期'] in st.session_state['audited_dates']:
-            return "✅ 审核通过 (人工核实)"
-        return row['状态']
-    
-    report['显示状态'] = report.apply(update_report_status, axis=1)
+    is_audited_day = report['日期'].isin(audited).to_numpy()
+    report['显示状态'] = np.where(is_audited_day, "✅ 审核通过 (人工核实)", report['状态'])
 
     # 指标面板
     m1, m2, m3 = st.columns(3)
     m1.metric("对账天数", len(report))
-    m2.metric("异常天数", len(report[report['状态'].str.contains("差异") & ~report['日期'].isin(st.session_state['audited_dates'])]))
+    m2.metric("异常天数", int((report['状态'].str.contains("差异") & ~is_audited_day).sum()))
     m3.metric("匹配支出总额", f"¥{report['匹配总额'].sum():,.2f}")
     
     # 展示报告
@@ -269,21 +383,36 @@ if st.session_state['last_reconcile_results']:
     
     def highlight_status(val):
         if '差异' in str(val): color = '#ff4b4b' 
+        elif '容差' in str(val): color = '#ffaa00'
         else: color = '#10b981'
         return f'color: {color}; font-weight: bold'
 
     # 使用专门的显示列
-    display_df = report[['日期', '显示状态', '银行支笔数', '微信支笔数', '匹配总额']]
+    display_cols = ['日期', '显示状态', '银行支笔数', '微信支笔数', '匹配总额']
+    if '容差匹配' in report.columns:
+        display_cols.append('容差匹配')
+    display_df = report[display_cols]
     st.dataframe(display_df.style.map(highlight_status, subset=['显示状态']), width="stretch")
+
+    if results.get('pairs') is not None and not results['pairs'].empty:
+        with st.expander(f"🔗 容差配对明细 ({len(results['pairs'])} 对)"):
+            st.dataframe(results['pairs'], width="stretch")
     
     # 异常项汇总分析
     st.markdown("### 🚨 异常明细追踪")
     anomalies = report[report["状态"].str.contains("差异")]
     
     if not anomalies.empty:
-        for idx, row in anomalies.iterrows():
+        # 分页渲染：只生成当前页的展开面板
+        n_pages = -(-len(anomalies) // ANOMALY_PAGE_SIZE)
+        page = 1
+        if n_pages > 1:
+            page = st.number_input(f"异常日期页码（共 {len(anomalies)} 天 / {n_pages} 页）", min_value=1, max_value=n_pages, value=1)
+        page_rows = anomalies.iloc[(page - 1) * ANOMALY_PAGE_SIZE:page * ANOMALY_PAGE_SIZE]
+
+        for idx, row in page_rows.iterrows():
             d = row['日期']
-            is_audited = d in st.session_state['audited_dates']
+            is_audited = d in audited
             
             exp_label = f"日期: {d} 的差异详情 " + ("(✅ 已审核)" if is_audited else "(🔴 待核实)")
             with st.expander(exp_label, expanded=not is_audited):
@@ -299,34 +428,67 @@ if st.session_state['last_reconcile_results']:
                 # 展示当日详细对比表
                 st.markdown("---")
                 col_bank, col_wechat = st.columns(2)
+                day_bank = expand_frame(results['i_index'].rows(d))
+                day_wechat = expand_frame(results['w_index'].rows(d))
+                # 同额多笔按描述 / 户名相似度配对，未配对的才是真正的漏项
+                day_pairs = match_pairs(day_bank, day_wechat, score_all=True)
+                day_bank['配对'] = pair_marks(len(day_bank), day_pairs['银行行号'])
+                day_wechat['配对'] = pair_marks(len(day_wechat), day_pairs['微信行号'])
                 
                 with col_bank:
                     st.write(f"🏦 当日银行流水 ({row['日期']})")
-                    day_bank = results['i_df'][results['i_df']['日期'] == d]
                     # 组合展示需要的列
-                    st.dataframe(day_bank[['描述', '对方户名', '金额']], height=200, width="stretch")
+                    st.dataframe(day_bank[['描述', '对方户名', '金额', '配对']], height=200, width="stretch")
                 
                 with col_wechat:
                     st.write(f"🐧 当日微信流水 ({row['日期']})")
-                    day_wechat = results['w_df'][results['w_df']['日期'] == d]
                     # 组合展示需要的列
-                    st.dataframe(day_wechat[['描述', '交易对方', '商品', '金额']], height=200, width="stretch")
+                    st.dataframe(day_wechat[['描述', '交易对方', '商品', '金额', '配对']], height=200, width="stretch")
+
+                if not day_pairs.empty:
+                    st.write(f"🔗 当日逐笔配对 ({len(day_pairs)} 对)")
+                    b_rows = day_bank.iloc[day_pairs['银行行号']]
+                    w_rows = day_wechat.iloc[day_pairs['微信行号']]
+                    st.dataframe(pd.DataFrame({
+                        '金额': day_pairs['金额'],
+                        '银行描述': b_rows['描述'].astype(str).to_numpy(),
+                        '对方户名': b_rows['对方户名'].astype(str).to_numpy(),
+                        '微信交易对方': w_rows['交易对方'].astype(str).to_numpy(),
+                        '微信商品': w_rows['商品'].astype(str).to_numpy(),
+                        '相似度': day_pairs['相似度'],
+                    }), height=200, width="stretch")
                 
                 # 审核按钮
                 st.markdown("---")
                 if not is_audited:
                     if st.button(f"确认当日情况无误，审核通过", key=f"audit_{d}"):
-                        st.session_state['audited_dates'].append(d)
+                        if results.get('ledger'):
+                            get_ledger(results['ledger']).audit(d)
+                        else:
+                            st.session_state['audited_dates'].add(d)
                         st.rerun()
                 else:
                     st.success("✅ 该日期已通过审核")
     else:
         st.success("所有日期支出完全匹配！")
     
+    # 风险交易扫描
+    st.markdown("### 🛡️ 风险交易扫描")
+    risks = results.get('risks')
+    if risks is not None and not risks.empty:
+        st.dataframe(risks[['来源', '日期', '商户/商品', '金额', '风险原因']], width="stretch")
+    else:
+        st.success("未发现明显的风险交易。")
+
     with st.expander("📝 原始数据预览"):
+        preview = results.get('preview') or (results['i_df'], results['w_df'])
+        if results.get('preview'):
+            st.caption(f"流式读取只保留每端前 {STREAM_PREVIEW_ROWS} 行用于预览。")
         t_a, t_b = st.tabs(["工行原始", "微信原始"])
-        with t_a: st.dataframe(results['i_df'], width="stretch")
-        with t_b: st.dataframe(results['w_df'], width="stretch")
+        with t_a: st.dataframe(expand_frame(preview[0]), width="stretch")
+        with t_b: st.dataframe(expand_frame(preview[1]), width="stretch")
+
+    st.session_state['stage_timer'].add("render", time.perf_counter() - render_began)
 
 else:
     st.info("👋 欢迎！上传 Excel 账单后点击下方按钮开始按日对位分析。")
@@ -338,7 +500,26 @@ else:
     
     with st.expander("💡 它是如何工作的？"):
         st.write("""
-        1. **隐私安全**：所有文件解析均在本地或内存中完成，数据不会上传到任何其他服务器。
+        1. **隐私安全**：所有文件解析均在本地或内存中完成，数据不会上传到任何其他服务器；默认只在内存中处理，勾选“使用本地台账”后逐笔流水才会写入本机 SQLite 文件，可随时清空。
         2. **算法匹配**：我们通过排序后的金额序列进行“Multiset 对比”，精准匹配当日每一笔流水。
         3. **异常预警**：自动列出无法配对的差额，方便您快速补交或核对账目。
         """)
+
+# 性能计时面板：各阶段 p50 / p95 / p99，可导出 JSON；勾选后下一次对账在 cProfile 下执行
+with st.expander("⏱️ 性能计时"):
+    stage_timer = st.session_state['stage_timer']
+    st.checkbox("下一次对账启用 cProfile 剖析", key="profile_run")
+    if stage_timer.samples:
+        st.dataframe(pd.DataFrame(stage_timer.summary_rows(), columns=SUMMARY_COLUMNS), width="stretch")
+        c1, c2 = st.columns(2)
+        c1.download_button("导出计时 JSON", stage_timer.to_json(), file_name="debit_sync_timings.json", mime="application/json")
+        if c2.button("清空计时"):
+            st.session_state['stage_timer'] = StageTimer()
+            st.session_state.pop('profile_result', None)
+            st.rerun()
+    else:
+        st.caption("完成一次对账后显示各阶段耗时。")
+    if st.session_state.get('profile_result'):
+        text, data = st.session_state['profile_result']
+        st.download_button("下载 .prof 文件", data, file_name="debit_sync.prof")
+        st.code(text)
@@ -0,0 +1,241 @@
+"""
+本地对账台账（SQLite）：保存解析后的流水、按日对账结果与人工审核记录
+
+- 每笔流水以 (日期, 金额, 描述字段, 同内容序号) 的摘要为键去重，重复上传同一份或有重叠的账单不会重复入账；
+- 新上传只对出现新流水的日期重新对账（按日对账各日相互独立），其余日期直接读已存结果；
+- 审核记录保存审核当时两端的笔数，该日之后有新流水入账时审核自动失效，需要重新确认。
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from compact_frame import compact_text
+from reconcile_cache import content_hash
+from reconcile_engine import CENTS_COLUMN, DAY_COLUMN, REPORT_COLUMNS, frame_cents, frame_day_numbers, reconcile_daily
+
+AUDIT_LEDGER_PATH = os.getenv("DEBIT_SYNC_LEDGER", "debit_sync_ledger.sqlite")
+
+# 默认台账名称（对应 AUDIT_LEDGER_PATH），其余名称各自一个 SQLite 文件
+DEFAULT_LEDGER = "default"
+
+SIDES = ("bank", "wechat")
+
+# 台账列 -> 文本列（statement_parser.clean_frame 的输出）
+TEXT_FIELDS = {"description": "描述", "counterparty": "对方户名", "payee": "交易对方", "goods": "商品"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    side TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    cents INTEGER NOT NULL,
+    description TEXT,
+    counterparty TEXT,
+    payee TEXT,
+    goods TEXT,
+    PRIMARY KEY (side, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date, side);
+CREATE TABLE IF NOT EXISTS reports (
+    date TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    bank_count INTEGER NOT NULL,
+    wechat_count INTEGER NOT NULL,
+    matched REAL NOT NULL,
+    bank_missing TEXT NOT NULL,
+    wechat_missing TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS audits (
+    date TEXT PRIMARY KEY,
+    bank_count INTEGER NOT NULL,
+    wechat_count INTEGER NOT NULL,
+    at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def ledger_path(name=DEFAULT_LEDGER, base=AUDIT_LEDGER_PATH):
+    """
+    台账名称 -> SQLite 路径：默认台账为 base，其余为 base 同目录下的 <主名>_<名称>.sqlite（名称中的特殊字符替换为 _）
+    """
+    name = (name or "").strip()
+    if not name or name == DEFAULT_LEDGER:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}_{re.sub(r'[^0-9A-Za-z_一-鿿-]', '_', name)}{ext or '.sqlite'}"
+
+
+def _text(values):
+    return values.astype(object).fillna("").astype(str)
+
+
+def transaction_hashes(df):
+    """
+    逐笔流水摘要：日期 + 金额分 + 描述字段 + 同内容流水中的序号（同日同额同描述的多笔各自保留）；标准或紧凑表示均可
+    """
+    key = pd.Series(frame_day_numbers(df).astype(str), index=df.index) + "|" + frame_cents(df).astype(str)
+    for col in TEXT_FIELDS.values():
+        if col in df.columns:
+            key = key + "|" + _text(df[col])
+    ordinal = key.groupby(key, sort=False).cumcount().astype(str)
+    return [content_hash(k.encode())[:32] for k in (key + "#" + ordinal)]
+
+
+class AuditLedger:
+    """
+    对账台账；Streamlit 各会话线程共用一个实例，读写经内部锁串行化
+    """
+
+    def __init__(self, path=AUDIT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        # 连接跨线程共用，由 self._lock 保证串行访问
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def ingest(self, side, df):
+        """
+        写入一端流水（clean_frame 输出格式或其紧凑表示），已存在的流水跳过；返回出现新流水的日期集合
+        """
+        if side not in SIDES:
+            raise ValueError(f"side 应为 {SIDES}: {side}")
+        if df is None or df.empty:
+            return set()
+        hashes = transaction_hashes(df)
+        day_values = frame_day_numbers(df).astype("datetime64[D]")
+        days = day_values.astype(str)
+        first, last = str(day_values.min()), str(day_values.max())
+        with self._lock:
+            existing = {h for (h,) in self._conn.execute(
+                "SELECT hash FROM transactions WHERE side = ? AND date BETWEEN ? AND ?", (side, first, last)
+            )}
+            new = np.array([h not in existing for h in hashes], dtype=bool)
+            if not new.any():
+                return set()
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM transactions").fetchone()[0]
+            cents = frame_cents(df)
+            texts = [
+                _text(df[col]).to_numpy() if col in df.columns else np.full(len(df), "-", dtype=object)
+                for col in TEXT_FIELDS.values()
+            ]
+            idx = np.flatnonzero(new)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transactions "
+                "(side, hash, seq, date, cents, description, counterparty, payee, goods) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(side, hashes[i], seq + k + 1, days[i], int(cents[i]), *(t[i] for t in texts)) for k, i in enumerate(idx)],
+            )
+            self._conn.commit()
+        return {date.fromisoformat(d) for d in np.unique(days[idx])}
+
+    def frame(self, side, dates=None):
+        """
+        读出一端流水（紧凑表示，见 compact_frame；按入账顺序）；dates 为日期集合时只读这些日期
+        """
+        sql = f"SELECT date, cents, {', '.join(TEXT_FIELDS)} FROM transactions WHERE side = ?"
+        with self._lock:
+            if dates is None:
+                rows = self._conn.execute(sql + " ORDER BY seq", (side,)).fetchall()
+            else:
+                keys = sorted(d.isoformat() for d in dates)
+                rows = []
+                # 按日期索引逐批查询，避免超过 SQLite 的参数个数上限
+                for i in range(0, len(keys), 500):
+                    part = keys[i:i + 500]
+                    rows += self._conn.execute(
+                        sql + f" AND date IN ({', '.join('?' * len(part))}) ORDER BY seq", (side, *part)
+                    ).fetchall()
+        df = pd.DataFrame(rows, columns=["date", "cents", *TEXT_FIELDS])
+        out = pd.DataFrame({
+            DAY_COLUMN: np.array(df["date"].tolist(), dtype="datetime64[D]").astype("int32"),
+            CENTS_COLUMN: df["cents"].to_numpy(dtype="int64"),
+        })
+        for col, name in TEXT_FIELDS.items():
+            out[name] = compact_text(df[col])
+        return out
+
+    def reconcile(self, dates):
+        """
+        只对 dates 中的日期重新对账并写回结果，返回重新对账的天数
+        """
+        if not dates:
+            return 0
+        bank, wechat = self.frame("bank", dates), self.frame("wechat", dates)
+        report = reconcile_daily(bank, wechat)
+        rows = [
+            (d.isoformat(), status, int(nb), int(nw), float(m), json.dumps(bm), json.dumps(wm))
+            for d, status, nb, nw, m, bm, wm in report[REPORT_COLUMNS].itertuples(index=False, name=None)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def ingest_and_reconcile(self, bank_df, wechat_df):
+        """
+        两端流水入账，并只对出现新流水的日期重新对账；返回受影响的日期集合
+        """
+        affected = self.ingest("bank", bank_df) | self.ingest("wechat", wechat_df)
+        self.reconcile(affected)
+        return affected
+
+    def report(self):
+        """
+        台账中全部日期的对账报告（REPORT_COLUMNS，日期升序）
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM reports ORDER BY date").fetchall()
+        return pd.DataFrame([
+            (date.fromisoformat(d), status, nb, nw, m, json.loads(bm), json.loads(wm))
+            for d, status, nb, nw, m, bm, wm in rows
+        ], columns=REPORT_COLUMNS)
+
+    def audit(self, day):
+        """
+        记录某日审核通过（保存当时两端笔数，之后该日有新流水时审核失效）
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audits (date, bank_count, wechat_count, at) "
+                "SELECT date, bank_count, wechat_count, ? FROM reports WHERE date = ?",
+                (time.time(), day.isoformat()),
+            )
+            self._conn.commit()
+
+    def revoke(self, day):
+        with self._lock:
+            self._conn.execute("DELETE FROM audits WHERE date = ?", (day.isoformat(),))
+            self._conn.commit()
+
+    def audited_dates(self):
+        """
+        仍然有效的审核日期集合（成员判断 O(1)）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.date FROM audits a JOIN reports r ON r.date = a.date "
+                "WHERE r.bank_count = a.bank_count AND r.wechat_count = a.wechat_count"
+            ).fetchall()
+        return {date.fromisoformat(d) for (d,) in rows}
+
+    def clear(self):
+        """
+        清空台账中的全部流水、对账结果与审核记录
+        """
+        with self._lock:
+            self._conn.executescript("DELETE FROM transactions; DELETE FROM reports; DELETE FROM audits;")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
@@ -0,0 +1,43 @@
+"""
+批量对账吞吐基准：同一批账单分别以 1 个进程与多个进程运行 reconcile_batch
+
+用法: python benchmarks/bench_batch.py [--pairs 8] [--rows 5000] [--workers 4]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reconcile_batch import discover_pairs, run_batch  # noqa: E402
+from synth import write_icbc_xlsx, write_wechat_xlsx  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量对账吞吐基准")
+    parser.add_argument("--pairs", type=int, default=8, help="账单组数")
+    parser.add_argument("--rows", type=int, default=5000, help="每份账单行数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="多进程档位的进程数")
+    args = parser.parse_args()
+    logging.getLogger("reconcile_batch").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.pairs):
+            write_icbc_xlsx(os.path.join(tmp, f"acct{i:03d}_icbc.xlsx"), args.rows, seed=i)
+            write_wechat_xlsx(os.path.join(tmp, f"acct{i:03d}_wechat.xlsx"), args.rows, seed=i)
+        pairs = discover_pairs(tmp)
+
+        base = None
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            run_batch(pairs, os.path.join(tmp, f"out{workers}"), workers)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f"进程数 {workers:>2}: {elapsed:.2f}s, {len(pairs) / elapsed:.2f} 组/秒, 加速比 x{base / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
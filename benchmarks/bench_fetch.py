@@ -0,0 +1,70 @@
+"""
+K 线抓取基准：旧版线程池 + 逐个 requests.get + 随机 sleep vs 异步连接池引擎，均请求本地替身服务
+
+用法: python benchmarks/bench_fetch.py [--symbols 2000] [--latency-ms 20] [--threads 10] [--concurrency 64] [--error-rate 0.1]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import random
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_fetch import TENCENT_HEADERS, FetchStats, fetch_klines, kline_url, parse_tencent_kline  # noqa: E402
+from kline_server import start_server  # noqa: E402
+
+
+def legacy_fetch(code, base_url):
+    """
+    旧版抓取方式：每次新建连接，并随机 sleep，失败直接返回 None
+    """
+    time.sleep(random.uniform(0.01, 0.05))
+    try:
+        r = requests.get(kline_url(code, base_url=base_url), timeout=10, headers=TENCENT_HEADERS)
+        return parse_tencent_kline(code, r.json())
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K 线抓取基准")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--threads", type=int, default=10, help="旧版线程数")
+    parser.add_argument("--concurrency", type=int, default=64, help="异步引擎并发数")
+    parser.add_argument("--rate", type=float, default=5000.0, help="异步引擎限速（每秒请求数）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务随机返回 429/5xx 的比例")
+    args = parser.parse_args()
+
+    codes = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(args.symbols)]
+
+    server, url = start_server(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+        legacy = dict(zip(codes, executor.map(lambda c: legacy_fetch(c, url), codes)))
+    t_old, conn_old = time.perf_counter() - start, server.connections
+    server.shutdown()
+
+    server, url = start_server(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    start = time.perf_counter()
+    stats = FetchStats()
+    fresh = asyncio.run(fetch_klines(codes, concurrency=args.concurrency, rate=args.rate, url=url, stats=stats))
+    t_new, conn_new = time.perf_counter() - start, server.connections
+    server.shutdown()
+
+    both = [c for c in codes if fresh[c] is not None and legacy[c] is not None]
+    assert all(fresh[c].equals(legacy[c]) for c in both)
+    missing_old = sum(df is None for df in legacy.values())
+    missing_new = sum(df is None for df in fresh.values())
+    print(f"旧版线程池: {t_old:.2f}s, {conn_old} 个连接, 缺失 {missing_old}")
+    print(f"异步引擎:   {t_new:.2f}s, {conn_new} 个连接, 缺失 {missing_new} (x{t_old / t_new:.1f})")
+    print("异步引擎统计: " + ", ".join(f"{k} {v}" for k, v in stats.summary_rows()))
+
+
+if __name__ == "__main__":
+    main()
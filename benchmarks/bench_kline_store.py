@@ -0,0 +1,69 @@
+"""
+本地 K 线库基准：冷启动全量抓取 / 同日重跑 / 行情推进一个交易日后的增量抓取，均请求本地替身服务
+
+用法: python benchmarks/bench_kline_store.py [--symbols 2000] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_fetch import fetch_klines  # noqa: E402
+from kline_server import END_DATE, start_server  # noqa: E402
+from kline_store import MARKET_TZ, KlineStore, iter_cached_klines, normalize_bars  # noqa: E402
+
+
+def after_close(day):
+    """
+    某日收盘后一小时的时间戳（作为扫描时刻）
+    """
+    return datetime(day.year, day.month, day.day, 16, tzinfo=MARKET_TZ).timestamp()
+
+
+async def collect(codes, store, url, now, concurrency):
+    return {code: df async for code, df, _ in iter_cached_klines(codes, store, concurrency, rate=5000.0, url=url, now=now)}
+
+
+def timed_run(label, codes, store, server, now, concurrency):
+    before = server.requests
+    start = time.perf_counter()
+    frames = asyncio.run(collect(codes, store, server.url, now, concurrency))
+    print(f"{label}: {time.perf_counter() - start:.2f}s, {server.requests - before} 次请求")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 K 线库基准")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    codes = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(args.symbols)]
+    prev_day = END_DATE - timedelta(days=1)
+    server, server.url = start_server(latency_ms=args.latency_ms, end_date=prev_day)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KlineStore(os.path.join(tmp, "kline.sqlite"))
+        timed_run("冷启动（全量）", codes, store, server, after_close(prev_day), args.concurrency)
+        timed_run("同日重跑", codes, store, server, after_close(prev_day) + 600, args.concurrency)
+
+        server.end_date = END_DATE
+        frames = timed_run("次日增量", codes, store, server, after_close(END_DATE), args.concurrency)
+        store.close()
+
+    # 增量合并结果与直接全量抓取的末尾一致
+    full = asyncio.run(fetch_klines(codes, concurrency=args.concurrency, rate=5000.0, url=server.url))
+    for code in codes:
+        expected = normalize_bars(full[code])
+        assert frames[code].tail(len(expected)).reset_index(drop=True).equals(expected), code
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+流水内存表示基准：标准结果列 vs 紧凑表示（日序 int32 / 金额分 int64 / 字典编码文本）
+
+用法: python benchmarks/bench_memory.py [--sizes 10000,100000] [--min-ratio 3]
+
+账单由 synth 按固定种子生成 Excel（缓存在 benchmarks/.cache）后经 parse_excel_universal 解析，
+分别统计两端合计的深度内存占用（memory_usage(deep=True)）与 reconcile_daily 耗时。
+「标准(object)」为文本列按 object 存储时的占用（pandas 2 未启用 Arrow 字符串时的默认布局）。
+紧凑表示相对标准结果列的缩减倍数低于 --min-ratio 时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compact_frame import compact_frame  # noqa: E402
+from reconcile_cache import frame_nbytes  # noqa: E402
+from reconcile_engine import reconcile_daily  # noqa: E402
+from statement_parser import parse_excel_universal  # noqa: E402
+from synth import cached_workbooks  # noqa: E402
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def best_time(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def as_object(df):
+    return df.astype({c: object for c in df.columns if df[c].dtype.kind not in "if"})
+
+
+def layouts(bank, wechat):
+    """
+    同一对账单的各种内存布局 {名称: (工行表, 微信表)}
+    """
+    out = {
+        "标准": (bank, wechat),
+        "标准(object)": (as_object(bank), as_object(wechat)),
+        "紧凑": (compact_frame(bank), compact_frame(wechat)),
+    }
+    try:
+        out["紧凑(Arrow)"] = (compact_frame(bank, arrow=True), compact_frame(wechat, arrow=True))
+    except ImportError:
+        pass
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流水内存表示基准")
+    parser.add_argument("--sizes", default="10000,100000", help="逗号分隔的每端行数")
+    parser.add_argument("--repeat", type=int, default=3, help="对账计时重复次数（取最短）")
+    parser.add_argument("--min-ratio", type=float, default=3.0, help="紧凑表示相对标准结果列的最低缩减倍数")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'行数':>8} {'布局':<12} {'内存(MB)':>9} {'字节/行':>8} {'缩减':>6} {'对账(s)':>8}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        bank_path, wechat_path = cached_workbooks(n, CACHE_DIR)
+        bank = parse_excel_universal(bank_path, "工行")
+        wechat = parse_excel_universal(wechat_path, "微信")
+        base = frame_nbytes(bank) + frame_nbytes(wechat)
+        for name, (b, w) in layouts(bank, wechat).items():
+            nbytes = frame_nbytes(b) + frame_nbytes(w)
+            seconds = best_time(reconcile_daily, b, w, repeat=args.repeat)
+            print(f"{n:>8} {name:<12} {nbytes / 2**20:>9.1f} {nbytes / (len(b) + len(w)):>8.1f} "
+                  f"{base / nbytes:>5.1f}x {seconds:>8.3f}")
+            if name == "紧凑" and base / nbytes < args.min_ratio:
+                failed = True
+    if failed:
+        print(f"\n⚠️ 紧凑表示的缩减倍数低于 {args.min_ratio}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+逐笔配对基准：按原始顺序配对 vs 分桶文本择优（reconcile_pairs.match_pairs）vs 同日全量文本比较
+
+用法: python benchmarks/bench_pairs.py [--sizes 1000,10000,100000] [--naive-max 10000]
+
+账单由 synth 按固定种子生成 Excel（缓存在 benchmarks/.cache）后解析为紧凑表示，微信端打乱顺序；
+两端本来是同一批交易，配对质量以「银行对方户名 == 微信交易对方」的比例衡量。
+同日全量比较对每天的全部两端流水两两计算相似度，只在不超过 --naive-max 行时运行。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reconcile_engine import frame_cents, frame_day_numbers  # noqa: E402
+from reconcile_pairs import TokenCache, match_pairs, row_tokens, similarity  # noqa: E402
+from statement_parser import parse_excel_universal  # noqa: E402
+from synth import cached_workbooks  # noqa: E402
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def naive_pairs(bank, wechat):
+    """
+    旧式做法：逐日对全部两端流水两两比较（金额相同才可配对），按相似度贪心
+    """
+    cache = TokenCache()
+    b_tokens = row_tokens(bank, np.arange(len(bank)), cache)
+    w_tokens = row_tokens(wechat, np.arange(len(wechat)), cache)
+    b_days, w_days = frame_day_numbers(bank), frame_day_numbers(wechat)
+    b_cents, w_cents = frame_cents(bank), frame_cents(wechat)
+    rows = []
+    for day in np.unique(b_days):
+        cands = [
+            (-similarity(b_tokens[i], w_tokens[j]) if b_cents[i] == w_cents[j] else 1.0, i, j)
+            for i in np.flatnonzero(b_days == day) for j in np.flatnonzero(w_days == day)
+        ]
+        used_b, used_w = set(), set()
+        for s, i, j in sorted(cands):
+            if s <= 0 and i not in used_b and j not in used_w:
+                used_b.add(i)
+                used_w.add(j)
+                rows.append((i, j))
+    return pd.DataFrame(rows, columns=["银行行号", "微信行号"])
+
+
+def agreement(bank, wechat, pairs):
+    b = bank["对方户名"].astype(str).to_numpy()[pairs["银行行号"].to_numpy()]
+    w = wechat["交易对方"].astype(str).to_numpy()[pairs["微信行号"].to_numpy()]
+    return float((b == w).mean()) if len(pairs) else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐笔配对基准")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="逗号分隔的每端行数")
+    parser.add_argument("--naive-max", type=int, default=10000, help="同日全量比较只在不超过该行数时运行")
+    args = parser.parse_args()
+
+    print(f"{'行数':>8} {'方式':<10} {'耗时(s)':>8} {'配对数':>8} {'户名一致':>8}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        bank_path, wechat_path = cached_workbooks(n, CACHE_DIR)
+        bank = parse_excel_universal(bank_path, "工行", compact=True)
+        wechat = parse_excel_universal(wechat_path, "微信", compact=True).sample(frac=1.0, random_state=0)
+        wechat = wechat.reset_index(drop=True)
+        runs = [
+            ("按顺序", lambda: match_pairs(bank, wechat, max_bucket=1)),
+            ("分桶择优", lambda: match_pairs(bank, wechat)),
+        ]
+        if n <= args.naive_max:
+            runs.append(("同日全量", lambda: naive_pairs(bank, wechat)))
+        for name, run in runs:
+            start = time.perf_counter()
+            pairs = run()
+            seconds = time.perf_counter() - start
+            print(f"{n:>8} {name:<10} {seconds:>8.3f} {len(pairs):>8} {agreement(bank, wechat, pairs):>8.2%}")
+
+
+if __name__ == "__main__":
+    main()
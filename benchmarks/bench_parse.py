@@ -0,0 +1,101 @@
+"""
+parse_excel_universal 性能基准（单次读取 + 向量化清洗 vs 旧版两次读取 + 逐行 apply）
+
+用法: python benchmarks/bench_parse.py [--rows 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statement_parser import excel_engine, parse_excel_universal  # noqa: E402
+from synth import write_icbc_xlsx, write_wechat_xlsx  # noqa: E402
+
+
+def legacy_parse_excel_universal(uploaded_file, type_tag="ICBC"):
+    """
+    旧版解析逻辑（去掉 Streamlit 调用），仅用于对比
+    """
+    raw_data = pd.read_excel(uploaded_file, header=None).head(40)
+    start_row = 0
+    for i, row in raw_data.iterrows():
+        row_str = " ".join([str(x) for x in row.values if pd.notna(x)])
+        if ("时间" in row_str or "日期" in row_str) and ("金额" in row_str or "支出" in row_str):
+            start_row = i
+            break
+
+    df = pd.read_excel(uploaded_file, skiprows=start_row)
+    df.columns = [str(c).strip() for c in df.columns]
+    mapping_rules = [
+        ("时间", ["交易时间", "日期", "时间"]),
+        ("金额", ["金额", "支出金额", "收入/支出", "交易金额"]),
+        ("方向", ["收/支", "方向"]),
+        ("摘要", ["摘要", "交易详情"]),
+        ("商品", ["商品", "商品名称"]),
+        ("商户", ["商户", "商户名称"]),
+        ("交易对方", ["交易对方", "交易对象"]),
+        ("对方户名", ["对方户名", "对方名称"])
+    ]
+    found_map, used_cols = {}, set()
+    for std, targets in mapping_rules:
+        for c in df.columns:
+            if c in used_cols: continue
+            if any(t in c for t in targets):
+                found_map[c] = std
+                used_cols.add(c)
+                break
+    desc_orig_cols = [c for c, std in found_map.items() if std in ["摘要", "商户", "商品"]]
+    if desc_orig_cols:
+        df["_total_desc"] = df[desc_orig_cols].fillna("").astype(str).agg(" | ".join, axis=1)
+    else:
+        df["_total_desc"] = "无详细描述"
+    df = df.rename(columns=found_map)
+
+    def clean_amt(val):
+        s = str(val).replace("¥", "").replace(",", "").strip()
+        if s.startswith('+'): return float(s[1:])
+        if s.startswith('-'): return -float(s[1:])
+        try: return float(s)
+        except: return 0.0
+
+    if "方向" in df.columns:
+        df["金额"] = df.apply(lambda r: clean_amt(r["金额"]) * (-1 if "支" in str(r["方向"]) else 1), axis=1)
+    else:
+        df["金额"] = df["金额"].apply(clean_amt)
+    df["日期"] = pd.to_datetime(df["时间"], errors='coerce').dt.date
+    df = df.dropna(subset=["日期", "金额"])
+    res_cols = {"日期": df["日期"], "描述": df["_total_desc"], "金额": df["金额"]}
+    for col in ["对方户名", "交易对方", "商品"]:
+        res_cols[col] = df[col].astype(str).fillna("-") if col in df.columns else "-"
+    return pd.DataFrame(res_cols).copy()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_excel_universal 基准测试")
+    parser.add_argument("--rows", type=int, default=50000, help="合成账单行数")
+    args = parser.parse_args()
+
+    print(f"读取引擎: {excel_engine() or 'openpyxl'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for tag, writer in [("工行", write_icbc_xlsx), ("微信", write_wechat_xlsx)]:
+            path = os.path.join(tmp, f"{tag}.xlsx")
+            writer(path, args.rows)
+            new, t_new = timed(parse_excel_universal, path, tag)
+            old, t_old = timed(legacy_parse_excel_universal, path, tag)
+            pd.testing.assert_frame_equal(new, old, check_dtype=False)
+            print(f"{tag} {args.rows} 行: 旧版 {t_old:.2f}s -> 新版 {t_new:.2f}s (x{t_old / t_new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+identify_risks 性能基准：向量化规则引擎 vs 旧版 iterrows 实现
+
+用法: python benchmarks/bench_risk.py [--sizes 20000,1000000] [--legacy-max 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import risk_engine  # noqa: E402
+from reconcile_bills import SUSPICIOUS_KEYWORDS, identify_risks  # noqa: E402
+from synth import synth_wechat_frame  # noqa: E402
+
+
+def legacy_identify_risks(wechat_df):
+    """
+    旧版实现（逐行 iterrows + 逐词 in），仅用于对比
+    """
+    risks = []
+    for _, row in wechat_df.iterrows():
+        content = f"{row['商户']} {row['商品']}"
+        matched_keywords = [k for k in SUSPICIOUS_KEYWORDS if k in content]
+        is_night = 1 <= row["交易时间"].hour <= 5
+        if matched_keywords or is_night:
+            reason = []
+            if matched_keywords: reason.append(f"包含敏感词: {', '.join(matched_keywords)}")
+            if is_night: reason.append("非正常消费时间(凌晨)")
+            risks.append({"时间": row["交易时间"], "商户/商品": content, "金额": row["金额(元)"], "风险原因": " | ".join(reason)})
+    return pd.DataFrame(risks)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="identify_risks 基准测试")
+    parser.add_argument("--sizes", default="20000,1000000", help="逗号分隔的行数")
+    parser.add_argument("--legacy-max", type=int, default=20000, help="旧实现只在不超过该行数时运行")
+    args = parser.parse_args()
+
+    full_rules = risk_engine.default_rules(SUSPICIOUS_KEYWORDS) + [
+        risk_engine.amount_rule(500),
+        risk_engine.merchant_burst_rule(3, 10),
+        risk_engine.night_cluster_rule(3),
+    ]
+    print(f"{'行数':>10} {'默认规则(s)':>12} {'全部规则(s)':>12} {'旧实现(s)':>10} {'命中':>8}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        df = synth_wechat_frame(n)
+        risks, t_new = timed(identify_risks, df)
+        _, t_full = timed(identify_risks, df, full_rules)
+        t_old = "-"
+        if n <= args.legacy_max:
+            legacy, t = timed(legacy_identify_risks, df)
+            assert risks["风险原因"].tolist() == legacy["风险原因"].tolist()
+            t_old = f"{t:.2f}"
+        print(f"{n:>10} {t_new:>12.2f} {t_full:>12.2f} {t_old:>10} {len(risks):>8}")
+
+
+if __name__ == "__main__":
+    main()
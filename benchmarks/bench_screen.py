@@ -0,0 +1,86 @@
+"""
+涨停筛选基准：列式面板一次性判定 vs 旧版逐只股票 pandas 流程
+
+用法: python benchmarks/bench_screen.py [--symbols 5000] [--bars 60] [--dates 1,5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_server import synth_bars, trading_days  # noqa: E402
+from limit_screen import build_panel, screen_panel  # noqa: E402
+
+
+def make_frames(n_symbols, n_bars):
+    """
+    fetch_data_tencent 输出格式（字符串列）的合成 K 线
+    """
+    codes = [f"{600000 + i:06d}" if i % 3 == 0 else f"{300000 + i:06d}" if i % 3 == 1 else f"{i:06d}" for i in range(n_symbols)]
+    frames = {}
+    for code in codes:
+        df = pd.DataFrame(synth_bars(code)[-n_bars:])[[0, 2, 3, 6]]
+        df.columns = ["date", "close", "high", "turnover"]
+        frames[code] = df
+    return frames
+
+
+def legacy_screen(code, df, target_date):
+    """
+    旧版 process_stock 的筛选部分（逐只股票、逐个目标日），仅用于对比
+    """
+    if df is None or len(df) < 5: return None
+    df = df.copy()
+    df['date'] = df['date'].astype(str).str.replace('-', '')
+    if target_date not in df['date'].values: return None
+    target_idx = df[df['date'] == target_date].index[0]
+    if target_idx == 0: return None
+    row_t5, row_prev, row_latest = df.loc[target_idx], df.loc[target_idx - 1], df.iloc[-1]
+    rate = 1.20 if code.startswith(("30", "68")) else 1.10
+    limit_price = round(float(row_prev['close']) * rate + 0.0001, 2)
+    if float(row_t5['high']) >= limit_price:
+        t5_pct = (float(row_t5['close']) - float(row_prev['close'])) / float(row_prev['close']) * 100
+        period_pct = (float(row_latest['close']) - float(row_t5['close'])) / float(row_t5['close']) * 100
+        period_activity = df.loc[target_idx:]['turnover'].astype(float).sum()
+        return {
+            "日期": target_date, "代码": code, "名称": "",
+            "区间涨幅%": round(period_pct, 2), "累计活跃度": round(period_activity, 2), "T-5涨幅%": round(t5_pct, 2),
+            "状态": "涨停" if float(row_t5['close']) >= limit_price else "曾涨停", "现价": float(row_latest['close'])
+        }
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="涨停筛选基准")
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--bars", type=int, default=60)
+    parser.add_argument("--dates", default="1,5", help="逗号分隔的目标日数量")
+    args = parser.parse_args()
+
+    frames = make_frames(args.symbols, args.bars)
+    days = [d.strftime("%Y%m%d") for d in trading_days()]
+    print(f"{'目标日':>6} {'面板(s)':>8} {'旧实现(s)':>10} {'倍数':>6} {'命中':>6}")
+    for n_dates in [int(x) for x in args.dates.split(",")]:
+        targets = days[-n_dates - 5:-5]
+
+        start = time.perf_counter()
+        fresh = screen_panel(build_panel(frames.items()), targets)
+        t_new = time.perf_counter() - start
+
+        start = time.perf_counter()
+        legacy = [r for d in targets for code, df in frames.items() if (r := legacy_screen(code, df, d))]
+        t_old = time.perf_counter() - start
+
+        key = ["日期", "代码"]
+        legacy = pd.DataFrame(legacy, columns=fresh.columns).sort_values(key).reset_index(drop=True)
+        fresh = fresh.sort_values(key).reset_index(drop=True)
+        pd.testing.assert_frame_equal(fresh, legacy, check_dtype=False)
+        print(f"{n_dates:>6} {t_new:>8.3f} {t_old:>10.2f} {t_old / t_new:>6.0f} {len(fresh):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+冷启动预算检查：在全新子进程中导入核心模块，测量耗时并确认未连带导入重依赖
+
+用法: python benchmarks/bench_startup.py [--budget 1.5] [--repeat 3]
+
+任一模块超出预算或导入了 Streamlit / pdfplumber / openpyxl 时以非零状态退出，可直接用于 CI。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 核心路径（命令行 / 脚本调用）需要保持轻量的模块
+CORE_MODULES = ["statement_parser", "reconcile_engine", "compact_frame", "audit_ledger", "reconcile_multi", "reconcile_pairs", "reconcile_cache", "reconcile_batch", "reconcile_bills", "screen_rules"]
+
+# 核心路径不应在导入时加载的重依赖
+HEAVY_MODULES = ["streamlit", "pdfplumber", "openpyxl"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    """
+    多次冷启动取最小值，返回 (秒, 被连带导入的重依赖)
+    """
+    best, heavy = None, []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        best = res["seconds"] if best is None else min(best, res["seconds"])
+        heavy = res["heavy"]
+    return best, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核心模块冷启动预算检查")
+    parser.add_argument("--budget", type=float, default=1.5, help="单个模块导入耗时上限（秒）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块冷启动次数")
+    args = parser.parse_args()
+
+    failed = False
+    for module in CORE_MODULES:
+        seconds, heavy = measure(module, args.repeat)
+        ok = seconds <= args.budget and not heavy
+        failed |= not ok
+        note = f" 连带导入: {', '.join(heavy)}" if heavy else ""
+        print(f"{'✅' if ok else '❌'} {module:<18} {seconds:.3f}s{note}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
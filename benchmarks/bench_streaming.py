@@ -0,0 +1,73 @@
+"""
+流式读取内存基准：对比整表读取与只读流式分块对账的峰值内存 (ru_maxrss)
+
+用法: python benchmarks/bench_streaming.py [--sizes 20000,80000] [--chunk-rows 10000]
+
+每种模式在独立子进程中运行，避免相互影响峰值统计。
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_mode(mode, bank_path, wechat_path, chunk_rows):
+    """
+    子进程入口：按指定模式完成解析 + 对账，输出耗时与峰值内存 (MB)
+    """
+    import reconcile_engine
+    import statement_parser
+
+    start = time.perf_counter()
+    if mode == "full":
+        report = reconcile_engine.reconcile_daily(
+            statement_parser.parse_excel_universal(bank_path, "工行"),
+            statement_parser.parse_excel_universal(wechat_path, "微信"),
+        )
+    else:
+        report = reconcile_engine.reconcile_daily_chunks(
+            statement_parser.iter_excel_chunks(bank_path, "工行", chunk_rows),
+            statement_parser.iter_excel_chunks(wechat_path, "微信", chunk_rows),
+        )
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {peak_mb:.1f} {len(report)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式读取内存基准")
+    parser.add_argument("--sizes", default="20000,80000", help="逗号分隔的行数")
+    parser.add_argument("--chunk-rows", type=int, default=10000, help="流式模式每块行数")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "BANK", "WECHAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(*args.run, args.chunk_rows)
+        return
+
+    from synth import write_icbc_xlsx, write_wechat_xlsx
+
+    print(f"{'行数':>8} {'模式':>6} {'耗时(s)':>8} {'峰值内存(MB)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            bank_path = os.path.join(tmp, f"icbc_{n}.xlsx")
+            wechat_path = os.path.join(tmp, f"wechat_{n}.xlsx")
+            write_icbc_xlsx(bank_path, n)
+            write_wechat_xlsx(wechat_path, n)
+            for mode in ["full", "stream"]:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--chunk-rows", str(args.chunk_rows), "--run", mode, bank_path, wechat_path],
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()
+                print(f"{n:>8} {mode:>6} {out[0]:>8} {out[1]:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+腾讯 fqkline / 东方财富 kline 接口的本地替身：按股票代码生成确定性的合成日 K 线，支持 keep-alive、模拟延迟与故障
+
+用法: python benchmarks/kline_server.py [--port 18080] [--latency-ms 20] [--tail-rate 0.05 --tail-ms 500]
+      然后设置 TENCENT_KLINE_URL=http://127.0.0.1:18080/appstock/app/fqkline/get
+      与 EASTMONEY_KLINE_URL=http://127.0.0.1:18080/api/qt/stock/kline/get 运行 add.py
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+KLINE_PATH = "/appstock/app/fqkline/get"
+EASTMONEY_PATH = "/api/qt/stock/kline/get"
+END_DATE = date(2026, 2, 13)
+HISTORY_DAYS = 400
+
+
+def trading_days(end=END_DATE, n=HISTORY_DAYS):
+    """
+    截至 end 的 n 个工作日（不考虑节假日）
+    """
+    days, d = [], end
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d -= timedelta(days=1)
+    return days[::-1]
+
+
+def synth_bars(code, n_days=HISTORY_DAYS, end=END_DATE):
+    """
+    生成某只股票的日 K 线（腾讯格式：日期, 开, 收, 高, 低, 量, 换手率），约 3% 的交易日触及涨停
+    """
+    rng = np.random.default_rng(int(code))
+    days = trading_days(end, n_days)
+    limit = 0.20 if code.startswith(("30", "68")) else 0.10
+    pct = rng.normal(0.0, 0.02, n_days).clip(-limit, limit)
+    touch = rng.random(n_days) < 0.03
+    pct[touch] = limit
+    close = np.round(10.0 * np.cumprod(1 + pct), 2)
+    prev = np.r_[close[0], close[:-1]]
+    high = np.maximum(close, np.round(prev * (1 + np.where(touch, limit, np.abs(pct) + 0.005)), 2))
+    low = np.minimum(close, np.round(prev * (1 - 0.01), 2))
+    volume = rng.integers(10000, 500000, n_days)
+    turnover = np.round(rng.uniform(0.5, 15.0, n_days), 2)
+    return [
+        [d.isoformat(), f"{p:.2f}", f"{c:.2f}", f"{h:.2f}", f"{l:.2f}", f"{v}.000", f"{t:.2f}"]
+        for d, p, c, h, l, v, t in zip(days, prev, close, high, low, volume, turnover)
+    ]
+
+
+class KlineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests += 1
+        if url.path == KLINE_PATH:
+            symbol, _, start, _, days, _ = query["param"][0].split(",")
+            code = symbol[2:]
+        elif url.path == EASTMONEY_PATH:
+            code = query["secid"][0].split(".")[1]
+            beg, days = query["beg"][0], query["lmt"][0]
+            start = f"{beg[:4]}-{beg[4:6]}-{beg[6:]}" if beg != "0" else ""
+        else:
+            self.send_error(404)
+            return
+
+        delay = self.latency
+        if self.server.tail_rate and self.server.rng.random() < self.server.tail_rate:
+            delay += self.server.tail_ms / 1000
+        if delay:
+            time.sleep(delay)
+        if self.server.error_rate and self.server.rng.random() < self.server.error_rate:
+            self.send_error(self.server.rng.choice([429, 502, 503]))
+            return
+        end = self.server.end_date.isoformat()
+        bars = [b for b in synth_bars(code) if start <= b[0] <= end][-int(days or HISTORY_DAYS):]
+        if url.path == KLINE_PATH:
+            payload = {"code": 0, "msg": "", "data": {symbol: {"qfqday": bars}}}
+        else:
+            # 东财字段: 日期, 开盘, 收盘, 最高, 最低, 成交量, 成交额, 换手率
+            klines = [",".join([d, o, c, h, lo, v.split(".")[0], "0.00", t]) for d, o, c, h, lo, v, t in bars]
+            payload = {"rc": 0, "data": {"code": code, "klines": klines}}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+
+class KlineServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端取消补发请求时会直接断开连接，不打印堆栈
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def start_server(port=0, latency_ms=0, end_date=END_DATE, error_rate=0.0, tail_rate=0.0, tail_ms=0.0):
+    """
+    在后台线程启动替身服务，返回 (server, 腾讯接口地址)，东财接口地址为 server.eastmoney_url；
+    server.requests / server.connections 为累计计数，修改 server.end_date（不晚于 END_DATE）可模拟行情推进到新的交易日，
+    error_rate 为随机返回 429/5xx 的比例，tail_rate 比例的请求额外延迟 tail_ms 毫秒（长尾）
+    """
+    handler = type("Handler", (KlineHandler,), {"latency": latency_ms / 1000})
+    server = KlineServer(("127.0.0.1", port), handler)
+    server.requests = 0
+    server.connections = 0
+    server.end_date = end_date
+    server.error_rate = error_rate
+    server.tail_rate = tail_rate
+    server.tail_ms = tail_ms
+    server.rng = random.Random(0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    server.eastmoney_url = f"{base}{EASTMONEY_PATH}"
+    return server, f"{base}{KLINE_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="腾讯 / 东财 K 线接口本地替身")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="每个请求的模拟延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 429/5xx 的比例")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="长尾请求比例")
+    parser.add_argument("--tail-ms", type=float, default=500.0, help="长尾请求的额外延迟")
+    args = parser.parse_args()
+    server, url = start_server(args.port, args.latency_ms, error_rate=args.error_rate,
+                               tail_rate=args.tail_rate, tail_ms=args.tail_ms)
+    print(f"K 线替身服务已启动: {url} | {server.eastmoney_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
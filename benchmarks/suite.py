@@ -0,0 +1,240 @@
+"""
+可复现的基准套件：解析、reconcile_daily、reconcile_multi、identify_risks 与全市场扫描，结果存档并与上一次对比
+
+用法: python benchmarks/suite.py [--sizes 1000,10000,100000,1000000] [--parse-max 100000] [--symbols 2000]
+                                [--cases parse,reconcile,multi,risk,scan] [--baseline latest|PATH] [--threshold 0.2]
+
+全部输入由固定种子合成：账单 Excel 缓存在 benchmarks/.cache（百万行首次生成需数分钟），
+全市场扫描以子进程运行 add.py，K 线请求指向本地替身服务。每次运行写入 benchmarks/results/<时间>-<提交>.json，
+并与基线（默认为上一次结果）逐项对比；耗时增加超过 threshold 且超过噪声下限的项记为回退，
+加 --fail-on-regression 时以非零状态退出，可直接用于 CI。
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kline_server import start_server  # noqa: E402
+from reconcile_bills import identify_risks  # noqa: E402
+from reconcile_engine import reconcile_daily  # noqa: E402
+from reconcile_multi import reconcile_multi  # noqa: E402
+from statement_parser import excel_engine, parse_excel_universal  # noqa: E402
+from stock_universe import write_universe  # noqa: E402
+from synth import (  # noqa: E402
+    cached_workbooks, synth_multi_sources, synth_statement_pair, synth_universe, synth_wechat_frame,
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+CACHE_DIR = os.path.join(BENCH_DIR, ".cache")
+
+# 对比时低于该差值（秒）的变化视为噪声
+NOISE_FLOOR = 0.05
+
+# 替身服务的日 K 线截止于 2026-02-13，扫描其前一周的某日
+SCAN_DATE = "20260210"
+
+
+def best_of(fn, repeat):
+    """
+    重复执行取最短耗时，返回 (最后一次结果, 秒)
+    """
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def bench_parse(sizes, repeat):
+    for n in sizes:
+        bank_path, wechat_path = cached_workbooks(n, CACHE_DIR)
+        for tag, path in [("工行", bank_path), ("微信", wechat_path)]:
+            df, t = best_of(lambda: parse_excel_universal(path, tag), repeat)
+            yield {"case": f"parse/{tag}", "size": n, "seconds": t, "rows": len(df)}
+
+
+def bench_reconcile(sizes, repeat):
+    for n in sizes:
+        bank, wechat = synth_statement_pair(n)
+        report, t = best_of(lambda: reconcile_daily(bank, wechat), repeat)
+        yield {"case": "reconcile_daily", "size": n, "seconds": t, "rows": len(report)}
+
+
+def bench_multi(sizes, repeat):
+    for n in sizes:
+        sources = synth_multi_sources(n)
+        (report, groups), t = best_of(lambda: reconcile_multi(sources), repeat)
+        yield {"case": "reconcile_multi", "size": n, "seconds": t, "rows": int(report["组合匹配"].sum())}
+
+
+def bench_risk(sizes, repeat):
+    for n in sizes:
+        df = synth_wechat_frame(n)
+        risks, t = best_of(lambda: identify_risks(df), repeat)
+        yield {"case": "identify_risks", "size": n, "seconds": t, "rows": len(risks)}
+
+
+def bench_scan(n_symbols, repeat, latency_ms):
+    """
+    以子进程运行 add.py 扫描 n_symbols 只合成标的（不用本地 K 线库，每次全量抓取）
+    """
+    server, url = start_server(latency_ms=latency_ms)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            universe = os.path.join(tmp, "universe.csv")
+            timings = os.path.join(tmp, "timings.json")
+            write_universe(synth_universe(n_symbols), universe)
+            env = {k: v for k, v in os.environ.items() if k != "GITHUB_STEP_SUMMARY"}
+            env.update(TENCENT_KLINE_URL=url, EASTMONEY_KLINE_URL=server.eastmoney_url)
+            cmd = [
+                sys.executable, os.path.join(ROOT, "add.py"), "--date", SCAN_DATE, "--universe-cache", universe,
+                "--no-store", "--sources", "tencent", "--workers", "64", "--rate", "5000", "--timings", timings,
+            ]
+
+            def run():
+                subprocess.run(cmd, cwd=tmp, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                with open(timings, encoding="utf-8") as f:
+                    return json.load(f)["stages"]
+
+            stages, t = best_of(run, repeat)
+    finally:
+        server.shutdown()
+    return {
+        "case": "scan", "size": n_symbols, "seconds": t, "rows": n_symbols,
+        "stages": {name: {k: s[k] for k in ("total_ms", "p50_ms", "p95_ms")} for name, s in stages.items()},
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "excel_engine": excel_engine() or "openpyxl",
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(spec, exclude=None):
+    """
+    spec 为 "latest"（结果目录中最新的一份）或文件路径；找不到时返回 None
+    """
+    if spec == "latest":
+        paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+        if not paths:
+            return None
+        spec = paths[-1]
+    with open(spec, encoding="utf-8") as f:
+        return json.load(f) | {"path": spec}
+
+
+def compare(results, baseline, threshold):
+    """
+    逐项对比 (case, size)，返回 (对比表, 回退项列表)
+    """
+    base = {(r["case"], r["size"]): r["seconds"] for r in baseline["results"]}
+    rows, regressions = [], []
+    for r in results:
+        old = base.get((r["case"], r["size"]))
+        if old is None:
+            rows.append((r["case"], r["size"], r["seconds"], None, None, "新增"))
+            continue
+        ratio = r["seconds"] / old if old > 0 else float("inf")
+        slower = ratio > 1 + threshold and r["seconds"] - old > NOISE_FLOOR
+        faster = ratio < 1 / (1 + threshold) and old - r["seconds"] > NOISE_FLOOR
+        verdict = "回退" if slower else "提升" if faster else "持平"
+        rows.append((r["case"], r["size"], r["seconds"], old, ratio, verdict))
+        if slower:
+            regressions.append(r)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="可复现基准套件")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="对账与风险扫描的行数，逗号分隔")
+    parser.add_argument("--parse-max", type=int, default=100000, help="Excel 解析只在不超过该行数时运行")
+    parser.add_argument("--multi-max", type=int, default=100000, help="多来源组合对账只在不超过该行数时运行")
+    parser.add_argument("--symbols", type=int, default=2000, help="全市场扫描的标的数")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="替身服务每个请求的模拟延迟")
+    parser.add_argument("--cases", default="parse,reconcile,multi,risk,scan", help="运行的基准项，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最短）")
+    parser.add_argument("--baseline", default="latest", help="对比基线：latest 或结果文件路径，none 不对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例记为回退")
+    parser.add_argument("--fail-on-regression", action="store_true", help="出现回退时以非零状态退出")
+    parser.add_argument("--no-save", action="store_true", help="不写入结果文件")
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(",")]
+    cases = set(args.cases.split(","))
+    results = []
+    runs = [
+        ("parse", lambda: bench_parse([n for n in sizes if n <= args.parse_max], args.repeat)),
+        ("reconcile", lambda: bench_reconcile(sizes, args.repeat)),
+        ("multi", lambda: bench_multi([n for n in sizes if n <= args.multi_max], args.repeat)),
+        ("risk", lambda: bench_risk(sizes, args.repeat)),
+        ("scan", lambda: [bench_scan(args.symbols, args.repeat, args.latency_ms)]),
+    ]
+    print(f"{'基准项':<18} {'规模':>9} {'耗时(s)':>9} {'行/秒':>12}")
+    for name, run in runs:
+        if name not in cases:
+            continue
+        for r in run():
+            results.append(r)
+            print(f"{r['case']:<18} {r['size']:>9} {r['seconds']:>9.3f} {r['size'] / r['seconds']:>12,.0f}")
+            for stage, s in r.get("stages", {}).items():
+                print(f"  {stage:<16} 合计 {s['total_ms']:>10.1f}ms  p50 {s['p50_ms']:>8.2f}ms  p95 {s['p95_ms']:>8.2f}ms")
+
+    record = {"env": environment(), "args": vars(args), "results": results}
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{record['env']['commit']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {os.path.relpath(path)}")
+
+    baseline = None if args.baseline == "none" else load_baseline(args.baseline, exclude=path)
+    if baseline is None:
+        return
+    rows, regressions = compare(results, baseline, args.threshold)
+    env = baseline["env"]
+    print(f"\n对比基线 {os.path.relpath(baseline['path'])}（提交 {env['commit']}，{env['time']}）")
+    print(f"{'基准项':<18} {'规模':>9} {'本次(s)':>9} {'基线(s)':>9} {'倍数':>7}  结论")
+    for case, size, new, old, ratio, verdict in rows:
+        old_s = f"{old:>9.3f}" if old is not None else f"{'-':>9}"
+        ratio_s = f"{ratio:>7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{case:<18} {size:>9} {new:>9.3f} {old_s} {ratio_s}  {verdict}")
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} 项耗时回退超过 {args.threshold:.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
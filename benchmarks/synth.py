@@ -0,0 +1,155 @@
+"""
+合成数据生成器：按 parse_excel_universal 能识别的表头布局生成工行/微信 Excel，
+已解析格式的对账 / 风险扫描输入表，以及选股脚本的标的清单（K 线由 kline_server 按代码合成）
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ICBC_HEADER = ["交易日期", "摘要", "交易场所", "交易金额", "余额", "对方户名"]
+WECHAT_HEADER = ["交易时间", "交易类型", "交易对方", "商品", "收/支", "金额(元)", "支付方式", "当前状态", "交易单号", "商户单号", "备注"]
+
+MERCHANTS = ["美团", "王小二餐馆", "滴滴出行", "京东商城", "App Store", "便利蜂", "中国石化", "肯德基"]
+GOODS = ["午餐", "打车", "日用品", "软件订阅", "加油", "早餐", "游戏充值", "会员"]
+
+
+def synth_transactions(n_rows, n_days=365, seed=0, start=datetime(2025, 1, 1)):
+    """
+    生成交易时间、金额（元，正数）、商户与商品下标
+    """
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, n_days * 86400, n_rows)
+    times = [start + timedelta(seconds=int(s)) for s in np.sort(seconds)]
+    amounts = np.round(rng.gamma(2.0, 40.0, n_rows) + 0.01, 2)
+    merchants = rng.integers(0, len(MERCHANTS), n_rows)
+    goods = rng.integers(0, len(GOODS), n_rows)
+    return times, amounts, merchants, goods
+
+
+def write_icbc_xlsx(path, n_rows, seed=0):
+    """
+    工行布局：三行标题说明 + 表头（交易日期/摘要/交易场所/交易金额/余额/对方户名）
+    """
+    from openpyxl import Workbook
+
+    times, amounts, merchants, _ = synth_transactions(n_rows, seed=seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("明细")
+    ws.append(["中国工商银行借记账户历史明细"])
+    ws.append(["卡号: 6212********0000", None, "币种: 人民币"])
+    ws.append([])
+    ws.append(ICBC_HEADER)
+    balance = 100000.0
+    for t, a, m in zip(times, amounts, merchants):
+        balance -= a
+        ws.append([
+            t.strftime("%Y-%m-%d"), "消费", "财付通-" + MERCHANTS[m],
+            f"-{a:,.2f}", f"{balance:,.2f}", MERCHANTS[m],
+        ])
+    wb.save(path)
+
+
+def write_wechat_xlsx(path, n_rows, seed=0):
+    """
+    微信布局：16 行导出说明 + 表头（交易时间/交易类型/交易对方/商品/收/支/金额(元)...）
+    """
+    from openpyxl import Workbook
+
+    times, amounts, merchants, goods = synth_transactions(n_rows, seed=seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("微信支付账单明细")
+    ws.append(["微信支付账单明细"])
+    for i in range(15):
+        ws.append([f"说明行 {i + 1}"])
+    ws.append(WECHAT_HEADER)
+    for i, (t, a, m, g) in enumerate(zip(times, amounts, merchants, goods)):
+        ws.append([
+            t.strftime("%Y-%m-%d %H:%M:%S"), "商户消费", MERCHANTS[m], GOODS[g], "支出",
+            f"¥{a:.2f}", "工商银行储蓄卡(0000)", "支付成功", f"42000{i:012d}", f"M{i:012d}", "/",
+        ])
+    wb.save(path)
+
+
+def cached_workbooks(n_rows, cache_dir, seed=0):
+    """
+    返回 (工行路径, 微信路径)；同一行数与种子的账单只生成一次（百万行写出需数分钟）
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = []
+    for tag, write in [("icbc", write_icbc_xlsx), ("wechat", write_wechat_xlsx)]:
+        path = os.path.join(cache_dir, f"{tag}_{n_rows}_{seed}.xlsx")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            write(tmp_path, n_rows, seed)
+            os.replace(tmp_path, path)
+        paths.append(path)
+    return tuple(paths)
+
+
+def synth_statement_pair(n_rows, n_days=365, seed=0):
+    """
+    生成一对已解析格式的流水表（日期/描述/金额），微信端约 5% 丢失、另有少量额外交易
+    """
+    rng = np.random.default_rng(seed)
+    base = date(2025, 1, 1)
+    day_pool = np.array([base + timedelta(days=i) for i in range(n_days)], dtype=object)
+    days = day_pool[rng.integers(0, n_days, n_rows)]
+    amounts = -np.round(rng.gamma(2.0, 40.0, n_rows), 2)
+    bank = pd.DataFrame({"日期": days, "描述": "合成交易", "金额": amounts})
+
+    keep = rng.random(n_rows) > 0.05
+    extra = max(1, n_rows // 50)
+    wechat = pd.DataFrame({
+        "日期": np.concatenate([days[keep], day_pool[rng.integers(0, n_days, extra)]]),
+        "描述": "合成交易",
+        "金额": np.concatenate([amounts[keep], -np.round(rng.gamma(2.0, 40.0, extra), 2)]),
+    })
+    return bank, wechat.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def synth_wechat_frame(n_rows, seed=0):
+    """
+    生成 reconcile_bills.parse_wechat_excel 输出格式的微信账单
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-01-01T00:00:00")
+    return pd.DataFrame({
+        "交易时间": pd.to_datetime(start + np.sort(rng.integers(0, 365 * 86400, n_rows)).astype("timedelta64[s]")),
+        "商户": np.array(MERCHANTS, dtype=object)[rng.integers(0, len(MERCHANTS), n_rows)],
+        "商品": np.array(GOODS, dtype=object)[rng.integers(0, len(GOODS), n_rows)],
+        "金额(元)": np.round(rng.gamma(2.0, 40.0, n_rows), 2),
+    })
+
+
+def synth_universe(n_symbols):
+    """
+    标的清单 [{'code', 'name'}]，沪市主板 / 深市主板 / 创业板 / 科创板轮流分配
+    """
+    prefixes = [600000, 0, 300000, 688000]
+    codes = [f"{prefixes[i % 4] + i // 4:06d}" for i in range(n_symbols)]
+    return [{"code": c, "name": f"合成{c}"} for c in codes]
+
+
+def synth_multi_sources(n_rows, n_days=365, seed=0, split_ratio=0.1):
+    """
+    多来源流水 {工行, 微信, 支付宝}：银行每笔扣款对应微信或支付宝的一笔支付，
+    其中 split_ratio 比例拆成同日 2~3 笔（合并扣款），用于组合对账
+    """
+    rng = np.random.default_rng(seed)
+    bank, _ = synth_statement_pair(n_rows, n_days, seed)
+    cents = -np.rint(bank["金额"].to_numpy() * 100).astype("int64")
+    channel = rng.integers(0, 2, n_rows)
+    parts = np.where(rng.random(n_rows) < split_ratio, rng.integers(2, 4, n_rows), 1)
+
+    rows = [[], []]
+    for day, total, ch, k in zip(bank["日期"], cents, channel, parts):
+        if k > 1 and total >= k:
+            cuts = np.sort(rng.choice(np.arange(1, total), k - 1, replace=False))
+            pieces = np.diff(np.concatenate([[0], cuts, [total]]))
+        else:
+            pieces = [total]
+        rows[ch] += [(day, -p / 100) for p in pieces]
+    wechat, alipay = (pd.DataFrame(r, columns=["日期", "金额"]).assign(描述="合成交易") for r in rows)
+    return {"工行": bank, "微信": wechat, "支付宝": alipay}
@@ -0,0 +1,97 @@
+"""
+流水的紧凑内存表示
+
+标准结果列（日期为 datetime.date 对象、金额为浮点元、文本为逐行字符串）每行约 100~400 字节，
+紧凑表示改为：
+- 日序：自 1970-01-01 起的天数（int32）
+- 金额分：整数分（int64）
+- 文本列：重复度高的列字典编码为 category，几乎逐行不同的列（如带单号的描述）保留为字符串
+
+对账引擎（count_keys / DayIndex / reconcile_multi）、本地台账与风险扫描直接读取日序与金额分，
+不再逐笔转换日期与金额；只有展示时才用 expand_frame 还原日期与金额列。
+arrow=True 时各列改为 Arrow 存储（文本为 dictionary 类型），可零拷贝写入 Parquet 磁盘缓存。
+"""
+import numpy as np
+import pandas as pd
+
+from reconcile_engine import CENTS_COLUMN, DAY_COLUMN, frame_cents, frame_day_numbers
+
+# 参与紧凑化的文本列（statement_parser.clean_frame 的输出）
+TEXT_COLUMNS = ["描述", "对方户名", "交易对方", "商品"]
+
+# 不同取值占行数的比例不超过该值时字典编码
+CATEGORY_MAX_RATIO = 0.5
+
+
+def is_compact(df):
+    return DAY_COLUMN in df.columns and CENTS_COLUMN in df.columns
+
+
+def compact_text(values):
+    """
+    文本列：重复度高时转 category，否则转为字符串类型（pandas 3 / 安装 pyarrow 时为 Arrow 字符串）
+    """
+    values = values.astype(object).where(values.notna(), "")
+    if values.nunique() <= max(1, len(values) * CATEGORY_MAX_RATIO):
+        return values.astype("category")
+    return values.astype("string")
+
+
+def compact_frame(df, arrow=False):
+    """
+    标准结果列 -> 紧凑表示（日序 / 金额分 / 文本列），行顺序与索引不变；已是紧凑表示时原样返回
+    """
+    if is_compact(df):
+        return to_arrow(df) if arrow else df
+    out = pd.DataFrame({
+        DAY_COLUMN: frame_day_numbers(df).astype("int32"),
+        CENTS_COLUMN: frame_cents(df),
+    }, index=df.index)
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            out[col] = compact_text(df[col])
+    return to_arrow(out) if arrow else out
+
+
+def concat_compact(chunks):
+    """
+    合并分块得到的紧凑表示；各块类别不同的文本列合并后退化为 object，重新编码
+    """
+    df = pd.concat(chunks)
+    for col in TEXT_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = compact_text(df[col])
+    return df
+
+
+def to_arrow(df):
+    """
+    各列改为 Arrow 存储（需 pyarrow），category 列对应 Arrow dictionary 类型
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    out = table.to_pandas(types_mapper=pd.ArrowDtype)
+    out.index = df.index
+    return out
+
+
+def day_dates(day_numbers):
+    """
+    日序 -> datetime.date 对象数组（与 clean_frame 输出的日期列一致）
+    """
+    return np.asarray(day_numbers, dtype="int64").astype("datetime64[D]").astype(object)
+
+
+def expand_frame(df):
+    """
+    紧凑表示 -> 标准结果列（日期 / 描述 / 金额 / 其余文本列），用于展示与导出；标准表原样返回
+    """
+    if not is_compact(df):
+        return df
+    out = pd.DataFrame({"日期": day_dates(frame_day_numbers(df))}, index=df.index)
+    for col in df.columns:
+        if col not in (DAY_COLUMN, CENTS_COLUMN):
+            out[col] = df[col]
+    out.insert(min(2, len(out.columns)), "金额", frame_cents(df) / 100)
+    return out
@@ -0,0 +1,513 @@
+"""
+K 线异步抓取引擎（腾讯 / 东方财富）
+
+共享一个 keep-alive 连接池，用熔断器限制（并自适应调整）并发、令牌桶限制请求速率，替代逐个 requests.get + 随机 sleep。
+超时、连接错误、限流 (429) 与 5xx 按指数退避 + 抖动重试，失败按错误类别计数，不再与“未命中”混为一谈。
+各数据源归一化为 date/close/high/turnover 四列，按最近延迟把请求路由到最快的健康数据源，可选对慢请求补发（hedge）。
+"""
+import asyncio
+import bisect
+import os
+import random
+import time
+from collections import Counter, deque
+
+import pandas as pd
+
+from stage_timer import timed
+
+TENCENT_KLINE_URL = os.getenv("TENCENT_KLINE_URL", "https://web.ifzq.gtimg.cn/appstock/app/fqkline/get")
+TENCENT_HEADERS = {"User-Agent": "QQStock/10.15.0"}
+EASTMONEY_KLINE_URL = os.getenv("EASTMONEY_KLINE_URL", "https://push2his.eastmoney.com/api/qt/stock/kline/get")
+# 默认只用腾讯：两家的前复权价取整与换手列口径不同，混用会让本地库的重叠校验误判、滚动窗口口径不一，
+# 多数据源路由 / 补发需经 KLINE_SOURCES 或 --sources 显式开启
+DEFAULT_SOURCES = os.getenv("KLINE_SOURCES", "tencent")
+
+# 获取近 40 天数据即可满足 T-5 分析需求
+KLINE_DAYS = 40
+REQUEST_TIMEOUT = 10
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_RATE = 100.0
+
+# 重试：第 n 次重试前等待 [0, min(BACKOFF_MAX, BACKOFF_BASE * 2^n)] 秒（full jitter）
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# 熔断：最近 BREAKER_WINDOW 次请求的失败率达到 BREAKER_THRESHOLD 时暂停 BREAKER_COOLDOWN 秒并把并发减半
+BREAKER_WINDOW = 50
+BREAKER_THRESHOLD = 0.5
+BREAKER_COOLDOWN = 5.0
+
+ERROR_LABELS = {
+    "timeout": "超时",
+    "connect": "连接失败",
+    "http_429": "限流 (429)",
+    "http_5xx": "服务端错误 (5xx)",
+    "http_4xx": "请求错误 (4xx)",
+    "bad_payload": "数据异常",
+}
+RETRYABLE_ERRORS = {"timeout", "connect", "http_429", "http_5xx"}
+
+# 路由：按最近 LATENCY_WINDOW 次延迟的中位数挑选最快数据源，EXPLORE_RATE 比例的请求随机分给其他健康源以更新统计
+LATENCY_WINDOW = 200
+LATENCY_BUCKETS_MS = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+EXPLORE_RATE = 0.05
+# hedge：主源超过其 p95 延迟（至少 HEDGE_MIN_DELAY 秒）仍未返回时向次快的源补发，补发数不超过请求数的 HEDGE_MAX_RATIO
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MAX_RATIO = 0.1
+
+
+def tencent_symbol(code):
+    prefix = 'sh' if code.startswith('6') else 'sz'
+    return f"{prefix}{code}"
+
+
+def kline_url(code, days=KLINE_DAYS, base_url=None, start=""):
+    """
+    start 为 YYYY-MM-DD 时只取该日及之后的 K 线（增量抓取）
+    """
+    return f"{base_url or TENCENT_KLINE_URL}?param={tencent_symbol(code)},day,{start},,{days},qfq"
+
+
+def parse_tencent_kline(code, payload):
+    """
+    腾讯返回的 JSON 转为 date/close/high/turnover 四列 DataFrame
+    """
+    main_data = payload['data'][tencent_symbol(code)]
+    k_data = main_data.get('qfqday', main_data.get('day'))
+
+    df = pd.DataFrame(k_data)
+    # 腾讯数据列: 0日期, 1开盘, 2收盘, 3最高, 4最低, 5成交量, 6换手率(有时是成交额)
+    df = df[[0, 2, 3, 6]].copy()
+    df.columns = ['date', 'close', 'high', 'turnover']
+    return df
+
+
+def eastmoney_url(code, days=KLINE_DAYS, base_url=None, start=""):
+    """
+    东方财富前复权日 K 线地址；start 为 YYYY-MM-DD 时只取该日及之后的 K 线
+    """
+    secid = f"{1 if code.startswith('6') else 0}.{code}"
+    beg = start.replace('-', '') or "0"
+    return (f"{base_url or EASTMONEY_KLINE_URL}?secid={secid}&fields1=f1,f2,f3"
+            f"&fields2=f51,f52,f53,f54,f55,f56,f57,f61&klt=101&fqt=1&beg={beg}&end=20500101&lmt={days}")
+
+
+def parse_eastmoney_kline(code, payload):
+    """
+    东方财富返回的 JSON 转为 date/close/high/turnover 四列 DataFrame
+    """
+    rows = [line.split(',') for line in payload['data']['klines']]
+
+    df = pd.DataFrame(rows)
+    # 东财数据列: 0日期, 1开盘, 2收盘, 3最高, 4最低, 5成交量, 6成交额, 7换手率
+    df = df[[0, 2, 3, 7]].copy()
+    df.columns = ['date', 'close', 'high', 'turnover']
+    return df
+
+
+class KlineSource:
+    """
+    K 线数据源适配器：build_url(code, days, base_url, start) 生成请求地址，parse(code, payload) 归一化为四列 DataFrame
+    """
+
+    def __init__(self, name, build_url, parse, base_url=None, headers=None):
+        self.name = name
+        self.build_url = build_url
+        self.parse = parse
+        self.base_url = base_url
+        self.headers = headers
+
+    def url(self, code, days=KLINE_DAYS, start=""):
+        return self.build_url(code, days, self.base_url, start)
+
+
+SOURCE_ADAPTERS = {
+    "tencent": (kline_url, parse_tencent_kline, TENCENT_HEADERS),
+    "eastmoney": (eastmoney_url, parse_eastmoney_kline, None),
+}
+
+
+def make_sources(names=DEFAULT_SOURCES, base_urls=None):
+    """
+    按名称（逗号分隔或列表）创建数据源；base_urls 为 {名称: 地址}，用于指向本地替身服务
+    """
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SOURCE_ADAPTERS]
+    if unknown:
+        raise ValueError(f"未知数据源: {', '.join(unknown)}（可选: {', '.join(SOURCE_ADAPTERS)}）")
+    base_urls = base_urls or {}
+    return [KlineSource(n, *SOURCE_ADAPTERS[n][:2], base_url=base_urls.get(n), headers=SOURCE_ADAPTERS[n][2]) for n in names]
+
+
+def classify_error(exc):
+    """
+    异常归类为 ERROR_LABELS 中的错误类别（兼容 aiohttp 与 requests 的异常）
+    """
+    status = getattr(exc, "status", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429:
+        return "http_429"
+    if status:
+        return "http_5xx" if status >= 500 else "http_4xx"
+    if isinstance(exc, asyncio.TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    if isinstance(exc, (ValueError, KeyError, TypeError, IndexError)):
+        return "bad_payload"
+    return "connect"
+
+
+def backoff_delay(attempt):
+    """
+    第 attempt 次重试前的等待秒数（指数退避 + full jitter）
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class LatencyHistogram:
+    """
+    延迟直方图：按 LATENCY_BUCKETS_MS 分桶累计，另保留最近 window 次样本用于分位数
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.recent.append(ms)
+        self.total += 1
+
+    def quantile(self, q):
+        """
+        最近样本的 q 分位延迟（毫秒），没有样本时返回 None
+        """
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def buckets(self):
+        """
+        [(区间标签, 次数)]，省略空桶
+        """
+        edges = ("0",) + tuple(str(b) for b in LATENCY_BUCKETS_MS) + ("∞",)
+        return [(f"{edges[i]}-{edges[i + 1]}ms", n) for i, n in enumerate(self.counts) if n]
+
+
+class FetchStats:
+    """
+    抓取统计：成功数、重试次数、按错误类别的最终失败数与失败代码、熔断次数、补发次数，以及各数据源的延迟与错误；
+    传入 timer (StageTimer) 时另记录逐只抓取 (fetch，含排队、重试与解析) 与响应解析 (parse) 的耗时
+    """
+
+    def __init__(self, timer=None):
+        self.timer = timer
+        self.ok = 0
+        self.retries = 0
+        self.errors = Counter()
+        self.failed = []
+        self.breaker_trips = 0
+        self.hedged = 0
+        self.latency = {}
+        self.source_errors = {}
+
+    def record_failure(self, code, kind):
+        self.errors[kind] += 1
+        self.failed.append(code)
+
+    def to_dict(self):
+        """
+        可序列化的计数（不含延迟直方图），用于分片扫描后汇总
+        """
+        return {
+            "ok": self.ok, "retries": self.retries, "errors": dict(self.errors), "failed": list(self.failed),
+            "breaker_trips": self.breaker_trips, "hedged": self.hedged,
+        }
+
+    @classmethod
+    def from_dicts(cls, items):
+        """
+        合并多份 to_dict 的结果
+        """
+        stats = cls()
+        for item in items:
+            stats.ok += item.get("ok", 0)
+            stats.retries += item.get("retries", 0)
+            stats.errors.update(item.get("errors", {}))
+            stats.failed.extend(item.get("failed", []))
+            stats.breaker_trips += item.get("breaker_trips", 0)
+            stats.hedged += item.get("hedged", 0)
+        return stats
+
+    def summary_rows(self):
+        """
+        报告用的统计行 [(项目, 数量)]
+        """
+        rows = [("成功", self.ok), ("重试次数", self.retries), ("熔断次数", self.breaker_trips)]
+        if self.hedged:
+            rows.append(("补发请求", self.hedged))
+        rows += [(f"失败: {ERROR_LABELS.get(kind, kind)}", n) for kind, n in self.errors.most_common()]
+        for name, hist in self.latency.items():
+            p50, p95 = hist.quantile(0.5), hist.quantile(0.95)
+            timing = f"p50 {p50:.0f}ms / p95 {p95:.0f}ms" if p50 is not None else "无成功样本"
+            errors = sum(self.source_errors.get(name, {}).values())
+            rows.append((f"数据源 {name}", f"{hist.total} 次成功, {timing}, 出错 {errors} 次"))
+        return rows
+
+
+class CircuitBreaker:
+    """
+    熔断器兼并发闸门：同时在途的请求不超过 limit；最近 window 次请求失败率达到 threshold 时
+    熔断 cooldown 秒并把 limit 减半，之后每连续成功 window 次把 limit 加一，直至恢复初始并发
+    """
+
+    def __init__(self, concurrency, window=BREAKER_WINDOW, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.max_limit = concurrency
+        self.limit = concurrency
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trips = 0
+        self._active = 0
+        self._open_until = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._streak = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            while True:
+                wait = self._open_until - time.monotonic()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self._active < self.limit:
+                    self._active += 1
+                    return self
+                else:
+                    await self._cond.wait()
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self._open_until
+
+    def record(self, ok):
+        """
+        记录一次请求结果（仅传输层错误计为失败）
+        """
+        self._outcomes.append(ok)
+        if ok:
+            self._streak += 1
+            if self._streak >= self.window and self.limit < self.max_limit:
+                self.limit += 1
+                self._streak = 0
+            return
+        self._streak = 0
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.window and failures >= self.threshold * self.window:
+            self.trips += 1
+            self.limit = max(1, self.limit // 2)
+            self._open_until = time.monotonic() + self.cooldown
+            self._outcomes.clear()
+
+
+class TokenBucket:
+    """
+    令牌桶限速：平均每秒 rate 个请求，最多允许 capacity 个突发
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SourceRouter:
+    """
+    数据源调度：每个源各有熔断器、令牌桶与延迟直方图；请求路由到最近延迟中位数最小的健康源
+    （没有样本的源优先试探，熔断中的源跳过），hedge=True 时对超过主源 p95 延迟的请求向次快源补发
+    """
+
+    def __init__(self, sources, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, hedge=False, stats=None):
+        self.sources = list(sources)
+        self.hedge = hedge and len(self.sources) > 1
+        self.stats = stats if stats is not None else FetchStats()
+        self.requests = 0
+        self.breakers = {s.name: CircuitBreaker(concurrency) for s in self.sources}
+        self.buckets = {s.name: TokenBucket(rate) for s in self.sources}
+        for s in self.sources:
+            self.stats.latency.setdefault(s.name, LatencyHistogram())
+            self.stats.source_errors.setdefault(s.name, Counter())
+
+    def ranked(self, exclude=()):
+        """
+        健康数据源按最近延迟中位数升序排列；全部熔断时退回全部数据源
+        """
+        pool = [s for s in self.sources if s.name not in exclude] or self.sources
+        healthy = [s for s in pool if not self.breakers[s.name].is_open] or pool
+        return sorted(healthy, key=lambda s: self.stats.latency[s.name].quantile(0.5) or 0.0)
+
+    def pick(self, exclude=()):
+        ranked = self.ranked(exclude)
+        if len(ranked) > 1 and random.random() < EXPLORE_RATE:
+            return random.choice(ranked[1:])
+        return ranked[0]
+
+    async def request(self, session, source, code, days=KLINE_DAYS, start=""):
+        """
+        向单个数据源发一次请求，返回 (DataFrame 或 None, 错误类别 或 None)
+        """
+        import aiohttp
+
+        breaker = self.breakers[source.name]
+        async with breaker:
+            await self.buckets[source.name].acquire()
+            began = time.perf_counter()
+            try:
+                async with session.get(source.url(code, days, start), headers=source.headers) as r:
+                    r.raise_for_status()
+                    payload = await r.json(content_type=None)
+                with timed(self.stats.timer, "parse"):
+                    df = source.parse(code, payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, TypeError, IndexError) as e:
+                kind = classify_error(e)
+                breaker.record(kind not in RETRYABLE_ERRORS)
+                self.stats.source_errors[source.name][kind] += 1
+                return None, kind
+            breaker.record(True)
+            self.stats.latency[source.name].add(time.perf_counter() - began)
+            return df, None
+
+    async def hedged_request(self, session, source, code, days=KLINE_DAYS, start=""):
+        """
+        主源超过其 p95 延迟仍未返回时向次快的源补发，先成功者胜出；补发数超过请求数的 HEDGE_MAX_RATIO 时不再补发。
+        主源落败被取消时，以取消时已等待的时长记一次（截尾）延迟，避免只记快请求使 p95 与补发阈值逐渐偏低
+        """
+        backup = [s for s in self.ranked(exclude=(source.name,)) if s.name != source.name]
+        delay = self.stats.latency[source.name].quantile(HEDGE_QUANTILE)
+        self.requests += 1
+        began = time.perf_counter()
+        first = asyncio.create_task(self.request(session, source, code, days, start))
+        if not backup or delay is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=max(HEDGE_MIN_DELAY, delay / 1000))
+        if done:
+            return first.result()
+        if self.stats.hedged >= HEDGE_MAX_RATIO * self.requests:
+            return await first
+
+        self.stats.hedged += 1
+        pending = {first, asyncio.create_task(self.request(session, backup[0], code, days, start))}
+        result = (None, "timeout")
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result[0] is not None:
+                        return result
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+                if task is first:
+                    self.stats.latency[source.name].add(time.perf_counter() - began)
+
+
+async def fetch_kline(session, code, router, days=KLINE_DAYS, start=""):
+    """
+    抓取单只股票 K 线：可重试的错误按退避重试（每次重新选源），数据异常时先换其他源再试；
+    最终失败返回 None 并计入 router.stats
+    """
+    stats = router.stats
+    tried = set()
+    for attempt in range(MAX_RETRIES + 1):
+        source = router.pick(exclude=tried)
+        if router.hedge:
+            df, kind = await router.hedged_request(session, source, code, days, start)
+        else:
+            df, kind = await router.request(session, source, code, days, start)
+        if df is not None:
+            stats.ok += 1
+            return df
+
+        tried.add(source.name)
+        if kind not in RETRYABLE_ERRORS:
+            if len(tried) >= len(router.sources) or attempt == MAX_RETRIES:
+                stats.record_failure(code, kind)
+                return None
+            continue
+        if attempt == MAX_RETRIES:
+            stats.record_failure(code, kind)
+            return None
+        stats.retries += 1
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def iter_klines(codes, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, days=KLINE_DAYS, url=None, starts=None,
+                      stats=None, sources=None, hedge=False):
+    """
+    并发抓取多只股票，按完成顺序产出 (code, DataFrame 或 None)；starts 为 {代码: 增量起始日期}，
+    stats 为 FetchStats（可选，用于汇总重试、失败与各源延迟）；sources 为数据源列表（默认仅腾讯，
+    url 可覆盖其地址），rate 为每个数据源的限速，hedge 开启慢请求补发
+    """
+    import aiohttp
+
+    if sources is None:
+        sources = make_sources("tencent", {"tencent": url})
+    stats = stats if stats is not None else FetchStats()
+    router = SourceRouter(sources, concurrency, rate, hedge, stats)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency * 2, ttl_dns_cache=300, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def one(code):
+            start = (starts or {}).get(code, "")
+            async with semaphore:
+                with timed(stats.timer, "fetch"):
+                    return code, await fetch_kline(session, code, router, days, start)
+
+        tasks = [asyncio.create_task(one(code)) for code in codes]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            stats.breaker_trips += sum(b.trips for b in router.breakers.values())
+            for task in tasks:
+                task.cancel()
+
+
+async def fetch_klines(codes, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, days=KLINE_DAYS, url=None, stats=None,
+                       sources=None, hedge=False):
+    """
+    并发抓取多只股票，返回 {code: DataFrame 或 None}
+    """
+    return {code: df async for code, df in iter_klines(codes, concurrency, rate, days, url, stats=stats,
+                                                        sources=sources, hedge=hedge)}
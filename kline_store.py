@@ -0,0 +1,221 @@
+"""
+本地增量 K 线库（SQLite）
+
+按 (代码, 日期) 保存抓取到的日 K 线。再次扫描时：
+- 上次检查晚于最近一个交易日收盘的股票直接读本地，不发请求；
+- 其余股票只从本地倒数第二根 K 线起增量抓取，重叠的那根用于校验前复权价是否变动，
+  变动（除权除息）时整段重抓替换；最后一根可能是盘中未收盘的数据，每次增量都会覆盖。
+"""
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from kline_fetch import DEFAULT_CONCURRENCY, DEFAULT_RATE, KLINE_DAYS, iter_klines
+
+KLINE_STORE_PATH = os.getenv("KLINE_STORE", "kline_store.sqlite")
+KLINE_COLUMNS = ["date", "close", "high", "turnover"]
+
+# A 股收盘时间（北京时间）
+MARKET_TZ = timezone(timedelta(hours=8))
+MARKET_CLOSE_HOUR = 15
+
+# 重叠 K 线的价格差超过该值视为复权价已变动
+PRICE_EPS = 0.005
+
+# 每写入多少只股票提交一次
+COMMIT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL,
+    high REAL,
+    turnover REAL,
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checked (
+    code TEXT PRIMARY KEY,
+    at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listed (
+    code TEXT PRIMARY KEY,
+    date TEXT NOT NULL
+);
+"""
+
+
+def last_market_close(now=None):
+    """
+    不晚于 now 的最近一个工作日 15:00（北京时间）的时间戳；节假日按工作日处理
+    """
+    now = datetime.fromtimestamp(now if now is not None else time.time(), MARKET_TZ)
+    close = now.replace(hour=MARKET_CLOSE_HOUR, minute=0, second=0, microsecond=0)
+    if close > now:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.timestamp()
+
+
+def normalize_bars(df):
+    """
+    抓取结果统一为 date(YYYY-MM-DD) + 数值列，按日期升序
+    """
+    out = pd.DataFrame({
+        "date": df["date"].astype(str),
+        "close": pd.to_numeric(df["close"], errors="coerce"),
+        "high": pd.to_numeric(df["high"], errors="coerce"),
+        "turnover": pd.to_numeric(df["turnover"], errors="coerce"),
+    })
+    return out.sort_values("date").reset_index(drop=True)
+
+
+class KlineStore:
+    """
+    SQLite K 线库；仅在单线程（扫描所在的事件循环）中使用
+    """
+
+    def __init__(self, path=KLINE_STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pending = 0
+
+    def load(self, code):
+        """
+        读取某只股票的全部本地 K 线，没有数据时返回 None
+        """
+        rows = self._conn.execute(
+            "SELECT date, close, high, turnover FROM bars WHERE code = ? ORDER BY date", (code,)
+        ).fetchall()
+        return pd.DataFrame(rows, columns=KLINE_COLUMNS) if rows else None
+
+    def plan(self, codes, now=None, days=KLINE_DAYS, since=None):
+        """
+        划分抓取计划，返回 (无需请求的代码列表, {代码: 增量起始日期，空字符串表示整段抓取})
+
+        since (YYYY-MM-DD) 要求本地数据早于该日开始，不足时整段重抓 days 根；
+        上次整段抓取已取到上市首日（listed 表）的股票本地数据就是全部历史，不再重抓。
+        """
+        checked = dict(self._conn.execute("SELECT code, at FROM checked"))
+        listed = dict(self._conn.execute("SELECT code, date FROM listed"))
+        heads = dict(self._conn.execute("SELECT code, MIN(date) FROM bars GROUP BY code"))
+        tails = {}
+        for code, day in self._conn.execute(
+            "SELECT code, date FROM (SELECT code, date, "
+            "ROW_NUMBER() OVER (PARTITION BY code ORDER BY date DESC) AS rn FROM bars) WHERE rn <= 2 "
+            "ORDER BY code, date DESC"
+        ):
+            tails.setdefault(code, []).append(day)
+
+        cutoff = last_market_close(now)
+        today = datetime.fromtimestamp(cutoff, MARKET_TZ).date()
+        fresh, starts = [], {}
+        for code in codes:
+            tail = tails.get(code)
+            if tail and since and heads[code] >= since and listed.get(code) != heads[code]:
+                starts[code] = ""
+            elif tail and checked.get(code, 0) >= cutoff:
+                fresh.append(code)
+            elif tail and (today - date.fromisoformat(tail[-1])).days < days:
+                # 从倒数第二根起抓：它用于校验复权，最后一根可能是盘中数据需要覆盖
+                starts[code] = tail[-1]
+            else:
+                starts[code] = ""
+        return fresh, starts
+
+    def merge(self, code, df, start, now=None, days=None):
+        """
+        合并增量抓取结果；重叠 K 线与本地不一致（复权价变动）时不写入并返回 False；
+        整段抓取（start 为空）时 days 为请求的根数，含义同 replace
+        """
+        bars = normalize_bars(df)
+        if not start:
+            self.replace(code, bars, now, days)
+            return True
+
+        new = bars[bars["date"] >= start]
+        stored = self._conn.execute(
+            "SELECT close, high FROM bars WHERE code = ? AND date = ?", (code, start)
+        ).fetchone()
+        if new.empty or new["date"].iloc[0] != start or stored is None:
+            return False
+        first = new.iloc[0]
+        if abs(first["close"] - stored[0]) > PRICE_EPS or abs(first["high"] - stored[1]) > PRICE_EPS:
+            return False
+
+        self._write(code, new, now)
+        return True
+
+    def replace(self, code, df, now=None, days=None):
+        """
+        整段替换某只股票的本地 K 线；days 为请求的根数，返回不足 days 根时说明已取到上市首日，记入 listed 表
+        """
+        bars = normalize_bars(df)
+        self._conn.execute("DELETE FROM bars WHERE code = ?", (code,))
+        if days is not None and 0 < len(bars) < days:
+            self._conn.execute("INSERT OR REPLACE INTO listed (code, date) VALUES (?, ?)", (code, bars["date"].iloc[0]))
+        else:
+            self._conn.execute("DELETE FROM listed WHERE code = ?", (code,))
+        self._write(code, bars, now)
+
+    def _write(self, code, bars, now=None):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO bars (code, date, close, high, turnover) VALUES (?, ?, ?, ?, ?)",
+            [(code, *row) for row in bars[KLINE_COLUMNS].itertuples(index=False, name=None)],
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO checked (code, at) VALUES (?, ?)",
+            (code, now if now is not None else time.time()),
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+
+async def iter_cached_klines(codes, store, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, url=None, now=None,
+                             days=KLINE_DAYS, since=None, stats=None, sources=None, hedge=False):
+    """
+    经本地库抓取多只股票，产出 (code, 本地全部 K 线 或 None, 是否为最新数据)；days / since 含义同 KlineStore.plan，
+    stats / sources / hedge 同 iter_klines
+
+    增量请求失败时退回本地已有数据，但标记为非最新（该代码已计入 stats.failed，调用方不应记入检查点）；
+    复权价变动的股票在第二轮整段重抓。
+    """
+    fresh, starts = store.plan(codes, now, days, since)
+    try:
+        for code in fresh:
+            yield code, store.load(code), True
+
+        refetch = []
+        async for code, df in iter_klines(list(starts), concurrency, rate, days, url, starts, stats, sources, hedge):
+            if df is None:
+                yield code, store.load(code) if starts[code] else None, False
+            elif store.merge(code, df, starts[code], now, days):
+                yield code, store.load(code), True
+            else:
+                refetch.append(code)
+
+        async for code, df in iter_klines(refetch, concurrency, rate, days, url, stats=stats, sources=sources, hedge=hedge):
+            if df is not None:
+                store.replace(code, df, now, days)
+                yield code, store.load(code), True
+            else:
+                # 本地价格已过时（复权前），不再使用
+                yield code, None, False
+    finally:
+        store.commit()
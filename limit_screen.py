@@ -0,0 +1,125 @@
+"""
+全市场涨停筛选（列式面板）
+
+各股票的 K 线拼成一张按 (代码, 日期) 排序的长表，涨停价、触及判定、T-5 涨幅、区间涨幅与累计活跃度
+全部在整张表上以数组运算一次算出，不再逐只股票跑 pandas 流程。
+"""
+import numpy as np
+import pandas as pd
+
+PANEL_COLUMNS = ["code", "date", "close", "high", "turnover"]
+RESULT_COLUMNS = ["日期", "代码", "名称", "区间涨幅%", "累计活跃度", "T-5涨幅%", "状态", "现价"]
+
+# 少于该根数的 K 线不参与判定
+MIN_BARS = 5
+
+
+def limit_rates(codes):
+    """
+    涨停倍数：创业板 (30) / 科创板 (68) 为 1.20，其余 1.10
+    """
+    codes = pd.Series(codes, dtype=object).astype(str)
+    return np.where(codes.str.startswith(("30", "68")), 1.20, 1.10)
+
+
+def limit_prices(prev_close, rates):
+    """
+    涨停价：前收盘 × 倍数，四舍五入到分
+    """
+    return np.round(prev_close * rates + 0.0001, 2)
+
+
+def _to_float(col):
+    """
+    整列转 float：先走快速类型转换，含非法值时退回逐值解析（非法值为 NaN）
+    """
+    try:
+        return col.astype(float).to_numpy(float)
+    except (ValueError, TypeError):
+        return pd.to_numeric(col, errors="coerce").to_numpy(float)
+
+
+def build_panel(frames):
+    """
+    (代码, K 线 DataFrame) 序列拼成面板：code 为分类列，date 为 YYYYMMDD 整数，其余为 float；
+    None 或空表跳过，拼接与类型转换在整张表上一次完成
+    """
+    codes, parts = [], []
+    for code, df in frames:
+        if df is None or df.empty:
+            continue
+        codes.append(code)
+        parts.append(df)
+
+    if not codes:
+        return pd.DataFrame({
+            "code": pd.Categorical([]),
+            "date": np.array([], dtype="int64"),
+            **{c: np.array([], dtype=float) for c in PANEL_COLUMNS[2:]},
+        })
+
+    bars = pd.concat(parts, ignore_index=True)
+    code_idx = np.repeat(np.arange(len(codes)), [len(df) for df in parts])
+    # 全市场的交易日只有几百个，先去重再转换；缺失日期 (factorize 记为 -1) 映射到末尾的 -1
+    day_idx, days = pd.factorize(bars["date"])
+    days = _to_float(pd.Series(days, dtype=object).astype(str).str.replace("-", "", regex=False))
+    date = np.append(np.nan_to_num(days, nan=-1).astype("int64"), -1)[day_idx]
+    order = np.lexsort((date, code_idx))
+    return pd.DataFrame({
+        "code": pd.Categorical.from_codes(code_idx[order], categories=codes),
+        "date": date[order],
+        **{c: _to_float(bars[c])[order] for c in PANEL_COLUMNS[2:]},
+    })
+
+
+def screen_panel(panel, target_dates, names=None):
+    """
+    在面板上一次性判定所有目标日（YYYYMMDD）是否触及涨停，返回命中结果表（RESULT_COLUMNS）
+    """
+    n = len(panel)
+    if n == 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    code_idx = panel["code"].cat.codes.to_numpy()
+    categories = panel["code"].cat.categories
+    date = panel["date"].to_numpy()
+    close = panel["close"].to_numpy()
+    high = panel["high"].to_numpy()
+    turnover = np.nan_to_num(panel["turnover"].to_numpy())
+
+    # 每只股票在面板中是连续的一段
+    starts = np.flatnonzero(np.r_[True, code_idx[1:] != code_idx[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(len(starts)), sizes)
+    ends = starts + sizes - 1
+    pos = np.arange(n) - starts[group]
+
+    # 这里的 turnover 如果是换手率直接 sum，如果是成交额则代表活跃度；组内后缀和即目标日至今的累计值
+    csum = np.cumsum(turnover)
+    activity = csum[ends][group] - csum + turnover
+    latest = close[ends][group]
+
+    targets = np.asarray([int(d) for d in target_dates], dtype="int64")
+    rows = np.flatnonzero(np.isin(date, targets) & (pos > 0) & (sizes[group] >= MIN_BARS))
+    prev = close[rows - 1]
+    limit = limit_prices(prev, limit_rates(categories)[code_idx[rows]])
+
+    # 判定触及涨停
+    hit = high[rows] >= limit
+    rows, prev, limit = rows[hit], prev[hit], limit[hit]
+    t5_pct = (close[rows] - prev) / prev * 100
+    period_pct = (latest[rows] - close[rows]) / close[rows] * 100
+
+    codes = categories[code_idx[rows]].astype(str)
+    names = names or {}
+    # 命中行很少，按 Python round 取两位与逐只计算的结果保持一致
+    return pd.DataFrame({
+        "日期": date[rows].astype(str),
+        "代码": codes,
+        "名称": [names.get(c, "") for c in codes],
+        "区间涨幅%": [round(v, 2) for v in period_pct.tolist()],
+        "累计活跃度": [round(v, 2) for v in activity[rows].tolist()],
+        "T-5涨幅%": [round(v, 2) for v in t5_pct.tolist()],
+        "状态": np.where(close[rows] >= limit, "涨停", "曾涨停"),
+        "现价": latest[rows],
+    }, columns=RESULT_COLUMNS)
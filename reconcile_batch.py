@@ -0,0 +1,183 @@
+"""
+批量对账命令行工具：不依赖 Streamlit，多进程并行处理多组 工行/微信 账单
+
+用法:
+    python reconcile_batch.py statements/ -o reports/ --workers 8
+    python reconcile_batch.py manifest.csv -o reports/ --fuzzy --day-window 1 --tolerance 0.5
+
+输入为目录时，按文件名配对：<名称>_工行.xlsx / <名称>_icbc.xlsx 与 <名称>_微信.xlsx / <名称>_wechat.xlsx，
+工行账单也可以是 PDF（<名称>_icbc.pdf）。
+输入为 CSV 清单时，需包含 name, bank, wechat 三列（路径可相对于清单所在目录）。
+"""
+import argparse
+import concurrent.futures
+import csv
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from reconcile_bills import extract_pdf_tables
+from reconcile_engine import STATUS_DIFF, reconcile_daily, reconcile_fuzzy
+from statement_parser import frame_from_table_rows, parse_excel_universal
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+BANK_SUFFIXES = ("_工行", "_icbc", "_bank")
+WECHAT_SUFFIXES = ("_微信", "_wechat")
+STATEMENT_EXTS = (".xlsx", ".xls", ".pdf")
+
+SUMMARY_COLUMNS = ["名称", "对账天数", "异常天数", "匹配总额", "银行漏项笔数", "微信漏项笔数", "容差配对数", "耗时(s)", "报告文件", "错误"]
+
+
+def _split_suffix(stem, suffixes):
+    for suffix in suffixes:
+        if stem.lower().endswith(suffix):
+            return stem[:-len(suffix)]
+    return None
+
+
+def discover_pairs(directory):
+    """
+    扫描目录，按文件名后缀配对工行与微信账单，返回 [(名称, 工行路径, 微信路径)]
+    """
+    banks, wechats = {}, {}
+    for fname in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(fname)
+        if ext.lower() not in STATEMENT_EXTS:
+            continue
+        path = os.path.join(directory, fname)
+        name = _split_suffix(stem, BANK_SUFFIXES)
+        if name is not None:
+            banks[name] = path
+            continue
+        name = _split_suffix(stem, WECHAT_SUFFIXES)
+        if name is not None:
+            wechats[name] = path
+
+    for name in sorted(set(banks) ^ set(wechats)):
+        logger.warning(f"⚠️ {name} 缺少配对账单，已跳过")
+    return [(name, banks[name], wechats[name]) for name in sorted(set(banks) & set(wechats))]
+
+
+def read_manifest(manifest_path):
+    """
+    读取 CSV 清单 (name, bank, wechat)，返回 [(名称, 工行路径, 微信路径)]
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    with open(manifest_path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            pairs.append((
+                row["name"].strip(),
+                os.path.join(base, row["bank"].strip()),
+                os.path.join(base, row["wechat"].strip()),
+            ))
+    return pairs
+
+
+def load_statement(path, type_tag):
+    """
+    按扩展名解析账单：PDF 走表格抽取 + 列推断（单进程，避免与外层进程池叠加），其余走 Excel 解析
+    """
+    if path.lower().endswith(".pdf"):
+        rows = [row for table in extract_pdf_tables(path, workers=1) for row in table if row and any(row)]
+        return frame_from_table_rows(rows, type_tag)
+    return parse_excel_universal(path, type_tag)
+
+
+def reconcile_pair(name, bank_path, wechat_path, output_dir, fuzzy=False, day_window=1, tolerance=0.0):
+    """
+    单组账单：解析 -> 对账 -> 写出报告，返回汇总行（在子进程中执行）
+    """
+    start = time.perf_counter()
+    summary = dict.fromkeys(SUMMARY_COLUMNS, "")
+    summary["名称"] = name
+    try:
+        i_df = load_statement(bank_path, "工行")
+        w_df = load_statement(wechat_path, "微信")
+        pairs = None
+        if fuzzy:
+            report, pairs = reconcile_fuzzy(i_df, w_df, day_window, tolerance)
+        else:
+            report = reconcile_daily(i_df, w_df)
+
+        report_path = os.path.join(output_dir, f"{name}_report.csv")
+        report.to_csv(report_path, index=False, encoding="utf-8-sig")
+        if pairs is not None and not pairs.empty:
+            pairs.to_csv(os.path.join(output_dir, f"{name}_pairs.csv"), index=False, encoding="utf-8-sig")
+
+        summary.update({
+            "对账天数": len(report),
+            "异常天数": int((report["状态"] == STATUS_DIFF).sum()),
+            "匹配总额": round(float(report["匹配总额"].sum()), 2),
+            "银行漏项笔数": int(report["银行漏项"].map(len).sum()),
+            "微信漏项笔数": int(report["微信漏项"].map(len).sum()),
+            "容差配对数": len(pairs) if pairs is not None else 0,
+            "报告文件": report_path,
+        })
+    except Exception as e:
+        summary["错误"] = f"{type(e).__name__}: {e}"
+    summary["耗时(s)"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(pairs, output_dir, workers=None, fuzzy=False, day_window=1, tolerance=0.0):
+    """
+    进程池并行处理多组账单，写出 summary.csv 并返回汇总表
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(reconcile_pair, name, bank, wechat, output_dir, fuzzy, day_window, tolerance): name
+            for name, bank, wechat in pairs
+        }
+        for future in concurrent.futures.as_completed(futures):
+            res = future.result()
+            if res["错误"]:
+                logger.warning(f"⚠️ {res['名称']} 对账失败: {res['错误']}")
+            else:
+                logger.info(f"✅ {res['名称']}: {res['对账天数']} 天, 异常 {res['异常天数']} 天 ({res['耗时(s)']}s)")
+            rows.append(res)
+
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS).sort_values("名称").reset_index(drop=True)
+    summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False, encoding="utf-8-sig")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量对账：多组工行/微信账单并行比对")
+    parser.add_argument("source", help="账单目录，或包含 name,bank,wechat 列的 CSV 清单")
+    parser.add_argument("-o", "--output", default="reports", help="报告输出目录")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="并行进程数")
+    parser.add_argument("--fuzzy", action="store_true", help="启用跨日 / 金额容差匹配")
+    parser.add_argument("--day-window", type=int, default=1, help="容差匹配允许的入账日差（±天）")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="容差匹配的金额容差（元）")
+    args = parser.parse_args(argv)
+
+    pairs = discover_pairs(args.source) if os.path.isdir(args.source) else read_manifest(args.source)
+    if not pairs:
+        logger.error("❌ 未找到可配对的账单。")
+        return 1
+
+    logger.info(f"🌟 批量对账启动 | {len(pairs)} 组账单 | 进程数: {args.workers}")
+    start = time.perf_counter()
+    summary = run_batch(pairs, args.output, args.workers, args.fuzzy, args.day_window, args.tolerance)
+    elapsed = time.perf_counter() - start
+
+    failed = int((summary["错误"] != "").sum())
+    logger.info(f"💎 完成 {len(summary) - failed}/{len(summary)} 组，用时 {elapsed:.2f}s ({len(summary) / elapsed:.2f} 组/秒)")
+    print("\n" + summary.drop(columns=["报告文件"]).to_string(index=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
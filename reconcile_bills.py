@@ -1,102 +1,146 @@
 import pandas as pd
-import pdfplumber
 import re
 from datetime import datetime, timedelta
 import os
+import json
+import concurrent.futures
+
+import risk_engine
+from reconcile_cache import content_hash
+from statement_parser import frame_from_table_rows, iter_raw_chunks
 
 # --- 配置区域 ---
 # 建议将账单文件命名为以下名称并放在脚本同级目录，或修改下方路径
 ICBC_PDF_PATH = "icbc.pdf"
 WECHAT_EXCEL_PATH = "wechat.xlsx"
 
+# 每个抽取进程至少分到的页数，页数太少时不值得开进程池
+PDF_MIN_PAGES_PER_WORKER = 4
+
 # 可疑关键字列表
 SUSPICIOUS_KEYWORDS = ["游戏", "捐赠", "爱心", "内购", "充值", "娱乐", "直播", "打赏", "代充"]
 
-def parse_icbc_pdf(pdf_path):
+def _extract_pages(pdf_path, page_numbers):
+    """
+    抽取指定页的表格（在子进程中执行，每个进程只打开一次 PDF）
+    """
+    # pdfplumber 较重，只在真正解析 PDF 时导入
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return {n: pdf.pages[n].extract_table() or [] for n in page_numbers}
+
+def _page_cache_path(cache_dir, doc_hash, page_number):
+    return os.path.join(cache_dir, doc_hash, f"{page_number}.json")
+
+def extract_pdf_tables(pdf_path, workers=None, cache_dir=None):
+    """
+    按页并行抽取 PDF 表格，返回按页顺序排列的表格列表
+
+    页结果以 (文档摘要, 页码) 为键缓存到 cache_dir，同一份账单再次解析时只抽取缺失的页。
+    """
+    import pdfplumber
+
+    with open(pdf_path, "rb") as f:
+        doc_hash = content_hash(f.read())[:32]
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+
+    tables = {}
+    if cache_dir:
+        for n in range(n_pages):
+            path = _page_cache_path(cache_dir, doc_hash, n)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    tables[n] = json.load(f)
+
+    missing = [n for n in range(n_pages) if n not in tables]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(missing) // PDF_MIN_PAGES_PER_WORKER))
+    if workers > 1:
+        # 每个进程处理一段连续页，减少重复打开文档的开销
+        size = -(-len(missing) // workers)
+        batches = [missing[i:i + size] for i in range(0, len(missing), size)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for part in executor.map(_extract_pages, [pdf_path] * len(batches), batches):
+                tables.update(part)
+    elif missing:
+        tables.update(_extract_pages(pdf_path, missing))
+
+    if cache_dir:
+        for n in missing:
+            path = _page_cache_path(cache_dir, doc_hash, n)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(tables[n], f, ensure_ascii=False)
+
+    return [tables[n] for n in range(n_pages)]
+
+def parse_icbc_pdf(pdf_path, workers=None, cache_dir=None):
     """
     解析工商银行 PDF 账单
+
+    按页并行抽取表格后推断日期/金额列，输出与 parse_excel_universal 相同的标准列，可直接参与按日对账
     """
     print(f"正在读取工行 PDF: {pdf_path}...")
-    data = []
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                table = page.extract_table()
-                if table:
-                    # 过滤掉表头或空行（工行 PDF 通常第一行是标题）
-                    for row in table:
-                        if row[0] and "日期" not in row[0]:
-                            data.append(row)
-        
-        # 假设工行表格列顺序：日期, 摘要, 支出, 收入, 余额...
-        # 注意：不同版本的工行 PDF 格式可能略有不同
-        df = pd.DataFrame(data)
-        # 根据实际观察调整列索引，这里做一个通用的推断逻辑
-        # 我们寻找包含金额的列
-        df.columns = [f"col_{i}" for i in range(len(df.columns))]
-        
-        # 简单清洗逻辑（需要根据真实文件调整）
-        # 转换日期和金额
-        return df
+        if cache_dir is None and os.getenv("DEBIT_SYNC_CACHE_DIR"):
+            cache_dir = os.path.join(os.getenv("DEBIT_SYNC_CACHE_DIR"), "pdf_pages")
+        tables = extract_pdf_tables(pdf_path, workers, cache_dir)
+        rows = [row for table in tables for row in table if row and any(row)]
+        return frame_from_table_rows(rows, "工行")
     except Exception as e:
         print(f"解析工行 PDF 失败: {e}")
         return None
 
-def parse_wechat_excel(excel_path):
+def parse_wechat_excel(excel_path, streaming=False):
     """
     解析微信支付 Excel 账单
+
+    streaming=True 时以 openpyxl 只读模式逐块读取并过滤，表头自动探测，适合多年导出的超大账单
     """
     print(f"正在读取微信 Excel: {excel_path}...")
     try:
+        if streaming:
+            chunks = [_clean_wechat(chunk.infer_objects()) for chunk in iter_raw_chunks(excel_path)]
+            return pd.concat(chunks) if chunks else None
+
         # 微信导出的 Excel 通常前面有几行说明文字，需要跳过
         df = pd.read_excel(excel_path, skiprows=16) # 微信通常 17 行开始是数据
-        
-        # 统一列名（去除空格等）
-        df.columns = [c.strip() for c in df.columns]
-        
-        # 选出必要的列
-        required_cols = ["交易时间", "交易类型", "商户", "商品", "金额(元)", "收/支", "支付方式"]
-        df = df[required_cols]
-        
-        # 过滤出支出且通过工商银行支付的记录
-        df = df[df["收/支"] == "支出"]
-        df = df[df["支付方式"].str.contains("工商银行", na=False)]
-        
-        # 处理金额和时间
-        df["金额(元)"] = df["金额(元)"].str.replace("¥", "").astype(float)
-        df["交易时间"] = pd.to_datetime(df["交易时间"])
-        
-        return df
+        return _clean_wechat(df)
     except Exception as e:
         print(f"解析微信 Excel 失败: {e}")
         return None
 
-def identify_risks(wechat_df):
+def _clean_wechat(df):
     """
-    识别可疑交易
+    微信账单列筛选与清洗（整表与分块读取共用）
     """
-    risks = []
-    for _, row in wechat_df.iterrows():
-        # 1. 关键字匹配
-        content = f"{row['商户']} {row['商品']}"
-        matched_keywords = [k for k in SUSPICIOUS_KEYWORDS if k in content]
-        
-        # 2. 异常时间匹配 (比如凌晨 1点到 5点)
-        is_night = 1 <= row["交易时间"].hour <= 5
-        
-        if matched_keywords or is_night:
-            reason = []
-            if matched_keywords: reason.append(f"包含敏感词: {', '.join(matched_keywords)}")
-            if is_night: reason.append("非正常消费时间(凌晨)")
-            
-            risks.append({
-                "时间": row["交易时间"],
-                "商户/商品": content,
-                "金额": row["金额(元)"],
-                "风险原因": " | ".join(reason)
-            })
+    # 统一列名（去除空格等）
+    df.columns = [c.strip() for c in df.columns]
+    
+    # 选出必要的列
+    required_cols = ["交易时间", "交易类型", "商户", "商品", "金额(元)", "收/支", "支付方式"]
+    df = df[required_cols]
+    
+    # 过滤出支出且通过工商银行支付的记录
+    df = df[df["收/支"] == "支出"]
+    df = df[df["支付方式"].str.contains("工商银行", na=False)]
+    
+    # 处理金额和时间
+    df["金额(元)"] = df["金额(元)"].str.replace("¥", "").astype(float)
+    df["交易时间"] = pd.to_datetime(df["交易时间"])
     
-    return pd.DataFrame(risks)
+    return df
+
+def identify_risks(wechat_df, rules=None):
+    """
+    识别可疑交易（向量化规则引擎，默认规则：敏感词 + 凌晨交易；可传入 risk_engine 中的其他规则组合）
+    """
+    if rules is None:
+        rules = risk_engine.default_rules(SUSPICIOUS_KEYWORDS)
+    return risk_engine.identify_risks(
+        wechat_df, rules, text_cols=["商户", "商品"], time_col="交易时间", amount_col="金额(元)", merchant_col="商户"
+    )
 
 def main():
     if not os.path.exists(ICBC_PDF_PATH) or not os.path.exists(WECHAT_EXCEL_PATH):
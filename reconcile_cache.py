@@ -0,0 +1,145 @@
+import hashlib
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from reconcile_engine import ENGINE_VERSION
+from statement_parser import PARSER_VERSION
+
+# 内存缓存默认上限
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(*parts):
+    """
+    依次喂入各段字节内容的 SHA-256 摘要
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+
+def parse_key(data, type_tag):
+    """
+    解析结果的缓存键：文件内容摘要 + 账单类型 + 解析器版本
+    """
+    return f"parse-{content_hash(type_tag.encode(), b'|', data)[:40]}-p{PARSER_VERSION}"
+
+
+def reconcile_key(bank_key, wechat_key, options=""):
+    """
+    对账报告的缓存键：两端解析键 + 匹配选项 + 对账引擎版本
+    """
+    digest = content_hash(bank_key.encode(), b'|', wechat_key.encode(), b'|', options.encode())
+    return f"reconcile-{digest[:40]}-e{ENGINE_VERSION}"
+
+
+def frame_nbytes(df):
+    """
+    估算 DataFrame 占用的内存字节数
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def restore_list_columns(df):
+    """
+    Parquet 读回的列表列是 ndarray，还原为 list（报告中的漏项列依赖 list 的真值判断）
+    """
+    for col in df.columns:
+        if df[col].dtype == object and len(df) and isinstance(df[col].iloc[0], np.ndarray):
+            df[col] = [v.tolist() for v in df[col]]
+    return df
+
+
+class ResultCache:
+    """
+    解析/对账结果缓存：按字节与条目数限容的内存 LRU，可选 Parquet 磁盘存储
+
+    缓存中的 DataFrame 会被多个会话共享，调用方只读不改。
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir if disk_dir and importlib.util.find_spec("pyarrow") else None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.parquet")
+
+    def _remember(self, key, df):
+        size = frame_nbytes(df)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (df, size)
+        self._nbytes += size
+        while len(self._entries) > self.max_entries or self._nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._nbytes -= evicted
+
+    def get(self, key):
+        """
+        命中返回 DataFrame，未命中返回 None；磁盘命中会回填内存
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        df = None
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                df = restore_list_columns(pd.read_parquet(self._disk_path(key)))
+            except (OSError, ValueError):
+                # 磁盘缓存损坏时按未命中处理
+                df = None
+
+        with self._lock:
+            if df is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, df)
+            return df
+
+    def put(self, key, df):
+        """
+        写入缓存；磁盘写入失败不影响内存缓存
+        """
+        with self._lock:
+            self._remember(key, df)
+        if self.disk_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            try:
+                df.to_parquet(tmp_path)
+                os.replace(tmp_path, self._disk_path(key))
+            except (OSError, ValueError, TypeError, NotImplementedError):
+                # 部分列类型无法写入 Parquet 时仅保留内存缓存
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def get_or_compute(self, key, compute):
+        """
+        命中直接返回，否则调用 compute() 计算并写入（结果为 None 时不缓存）
+        """
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            if df is not None:
+                self.put(key, df)
+        return df
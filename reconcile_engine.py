@@ -0,0 +1,335 @@
+import numpy as np
+import pandas as pd
+
+# 对账引擎版本号：匹配规则或报告格式变化时递增
+ENGINE_VERSION = "2"
+
+# 对账报告的固定列顺序（与原 app.py 中 reconcile_daily 的输出保持一致）
+REPORT_COLUMNS = ["日期", "状态", "银行支笔数", "微信支笔数", "匹配总额", "银行漏项", "微信漏项"]
+
+STATUS_MATCHED = "✅ 完全匹配"
+STATUS_DIFF = "⚠️ 存在差异"
+STATUS_FUZZY = "🟡 容差匹配"
+
+# 容差对账的配对方式
+METHOD_CROSS_DAY = "跨日匹配"
+METHOD_TOLERANCE = "容差匹配"
+METHOD_CROSS_DAY_TOLERANCE = "跨日容差匹配"
+
+# 容差对账配对明细的列
+PAIR_COLUMNS = ["银行日期", "微信日期", "银行金额", "微信金额", "日差", "金额差", "匹配方式"]
+
+# 紧凑表示（见 compact_frame）中替代日期 / 金额的列：自 1970-01-01 起的天数、整数分
+DAY_COLUMN = "日序"
+CENTS_COLUMN = "金额分"
+
+
+def to_cents(amounts):
+    """
+    金额转为整数分，避免浮点数相等比较带来的误差
+    """
+    values = pd.to_numeric(pd.Series(amounts), errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+    return np.rint(values * 100).astype("int64")
+
+
+def to_day_numbers(dates):
+    """
+    日期转为自 1970-01-01 起的天数（int64）
+    """
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype("int64")
+
+
+def frame_day_numbers(df):
+    """
+    一端流水的日期天数（int64）；紧凑表示直接取日序列，标准表由日期列换算
+    """
+    if DAY_COLUMN in df.columns:
+        return df[DAY_COLUMN].to_numpy(dtype="int64")
+    return to_day_numbers(df["日期"])
+
+
+def frame_cents(df):
+    """
+    一端流水的整数分金额（int64）；紧凑表示直接取金额分列，标准表由金额列换算
+    """
+    if CENTS_COLUMN in df.columns:
+        return df[CENTS_COLUMN].to_numpy(dtype="int64")
+    return to_cents(df["金额"])
+
+
+def count_keys(df):
+    """
+    统计一端流水中每个 (日期, 金额分) 出现的次数
+    """
+    keys = pd.DataFrame({"d": frame_day_numbers(df), "c": frame_cents(df)})
+    return keys.groupby(["d", "c"], sort=False).size()
+
+
+def merge_counts(left, right):
+    """
+    合并两份 (日期, 金额分) 计数，用于分块累加
+    """
+    if left is None:
+        return right
+    return left.add(right, fill_value=0).astype("int64")
+
+
+def _split_by_day(day_codes, values, n_days):
+    """
+    按日期编码把已排序的数组切成每日一个 list
+    """
+    bounds = np.searchsorted(day_codes, np.arange(1, n_days))
+    return [part.tolist() for part in np.split(values, bounds)]
+
+
+def _align_counts(bank_counts, wechat_counts):
+    """
+    两端计数按 (日期, 金额分) 对齐，列 0 为银行、列 1 为微信
+    """
+    return (
+        pd.concat([bank_counts, wechat_counts], axis=1, keys=[0, 1])
+        .fillna(0)
+        .astype("int64")
+        .sort_index()
+    )
+
+
+def _missing_lists(days, left_days, left_cents):
+    """
+    把剩余 (日期, 金额分) 按日期分组为每日漏项列表，每日内部金额升序
+    """
+    order = np.lexsort((left_cents, left_days))
+    codes = np.searchsorted(days, left_days[order])
+    return _split_by_day(codes, left_cents[order] / 100, len(days))
+
+
+def _assemble_report(days, bank_total, wechat_total, matched_cents, bank_left, wechat_left):
+    """
+    按日汇总为报告；bank_left / wechat_left 为剩余 (日期数组, 金额分数组)
+    """
+    n_left = (
+        np.bincount(np.searchsorted(days, bank_left[0]), minlength=len(days))
+        + np.bincount(np.searchsorted(days, wechat_left[0]), minlength=len(days))
+    )
+    return pd.DataFrame({
+        "日期": days.astype("datetime64[D]").astype(object),
+        "状态": np.where(n_left > 0, STATUS_DIFF, STATUS_MATCHED),
+        "银行支笔数": bank_total.astype("int64"),
+        "微信支笔数": wechat_total.astype("int64"),
+        "匹配总额": np.round(matched_cents / 100, 2),
+        "银行漏项": _missing_lists(days, *bank_left),
+        "微信漏项": _missing_lists(days, *wechat_left),
+    }, columns=REPORT_COLUMNS)
+
+
+def _exact_stage(counts):
+    """
+    同日同金额精确匹配：每个键匹配 min(银行笔数, 微信笔数) 笔
+
+    返回 (日期, 每日银行笔数, 每日微信笔数, 每日匹配金额分, 银行剩余, 微信剩余)
+    """
+    key_day_numbers = counts.index.get_level_values(0).to_numpy()
+    days, key_days = np.unique(key_day_numbers, return_inverse=True)
+    key_cents = counts.index.get_level_values(1).to_numpy()
+    b_cnt = counts[0].to_numpy()
+    w_cnt = counts[1].to_numpy()
+    m_cnt = np.minimum(b_cnt, w_cnt)
+
+    def per_day(weights):
+        return np.bincount(key_days, weights=weights, minlength=len(days))
+
+    b_left = b_cnt - m_cnt
+    w_left = w_cnt - m_cnt
+    return (
+        days, per_day(b_cnt), per_day(w_cnt), per_day(key_cents * m_cnt),
+        (np.repeat(key_day_numbers, b_left), np.repeat(key_cents, b_left)),
+        (np.repeat(key_day_numbers, w_left), np.repeat(key_cents, w_left)),
+    )
+
+
+def report_from_counts(bank_counts, wechat_counts):
+    """
+    由两端的 (日期, 金额分) 计数生成按日对账报告
+
+    每个键匹配 min(银行笔数, 微信笔数) 笔，多出的部分即为当日漏项。
+    """
+    counts = _align_counts(bank_counts, wechat_counts)
+    if counts.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return _assemble_report(*_exact_stage(counts))
+
+
+def reconcile_daily(bank_df, wechat_df):
+    """
+    按日对账算法（哈希分组 + 整数分计数）
+
+    两端交易一次性按 (日期, 金额分) 分组计数，整体复杂度与交易笔数近似线性。
+    """
+    return report_from_counts(count_keys(bank_df), count_keys(wechat_df))
+
+
+def reconcile_daily_chunks(bank_chunks, wechat_chunks):
+    """
+    分块对账：逐块累加 (日期, 金额分) 计数，内存占用只与不同键的数量有关，与流水总行数无关
+    """
+    bank_counts = None
+    for chunk in bank_chunks:
+        bank_counts = merge_counts(bank_counts, count_keys(chunk))
+    wechat_counts = None
+    for chunk in wechat_chunks:
+        wechat_counts = merge_counts(wechat_counts, count_keys(chunk))
+
+    empty = pd.Series([], dtype="int64", index=pd.MultiIndex.from_arrays([[], []], names=["d", "c"]))
+    return report_from_counts(
+        bank_counts if bank_counts is not None else empty,
+        wechat_counts if wechat_counts is not None else empty,
+    )
+
+
+def _day_offsets(day_window):
+    """
+    日差搜索顺序：0, +1, -1, +2, -2 ...（由近到远）
+    """
+    offsets = [0]
+    for k in range(1, day_window + 1):
+        offsets += [k, -k]
+    return offsets
+
+
+def _rank_join(bank, wechat):
+    """
+    按 (日期, 金额分, 组内序号) 等值连接，保证多笔同额交易一一配对
+    """
+    bank = bank.assign(r=bank.groupby(["d", "c"]).cumcount())
+    wechat = wechat.assign(r=wechat.groupby(["d", "c"]).cumcount())
+    return bank.merge(wechat, on=["d", "c", "r"], suffixes=("_b", "_w"))[["pos_b", "pos_w"]]
+
+
+def _nearest_join(bank, wechat, tol_cents):
+    """
+    同一(平移后)日期内按金额最近邻配对，差额不超过 tol_cents；冲突时保留差额最小者，反复直到无新配对
+    """
+    found = []
+    while not bank.empty and not wechat.empty:
+        cand = pd.merge_asof(
+            bank.sort_values("c"), wechat.assign(wc=wechat["c"]).sort_values("c"),
+            on="c", by="d", direction="nearest", tolerance=tol_cents, suffixes=("_b", "_w"),
+        ).dropna(subset=["pos_w"])
+        if cand.empty:
+            break
+        cand["diff"] = (cand["c"] - cand["wc"]).abs()
+        cand = cand.sort_values(["diff", "pos_b"], kind="stable").drop_duplicates("pos_w")
+        pairs = cand[["pos_b", "pos_w"]].astype("int64")
+        found.append(pairs)
+        bank = bank[~bank["pos"].isin(pairs["pos_b"])]
+        wechat = wechat[~wechat["pos"].isin(pairs["pos_w"])]
+    return found
+
+
+def fuzzy_pairs(bank_left, wechat_left, day_window=1, tol_cents=0):
+    """
+    对精确匹配后的剩余交易做跨日 / 容差配对
+
+    先按日差由近到远做金额一致的跨日配对，再在每个日差内做金额最近邻的容差配对。
+    全部基于排序与连接运算，不做逐笔嵌套循环。返回 (银行位置, 微信位置, 日差, 匹配方式) 表。
+    """
+    bank = pd.DataFrame({"d": bank_left[0], "c": bank_left[1], "pos": np.arange(len(bank_left[0]))})
+    wechat = pd.DataFrame({"d": wechat_left[0], "c": wechat_left[1], "pos": np.arange(len(wechat_left[0]))})
+    found = []
+
+    def take(pairs, offset, method):
+        nonlocal bank, wechat
+        if pairs.empty:
+            return
+        found.append(pairs.assign(offset=offset, method=method))
+        bank = bank[~bank["pos"].isin(pairs["pos_b"])]
+        wechat = wechat[~wechat["pos"].isin(pairs["pos_w"])]
+
+    offsets = _day_offsets(day_window)
+    for offset in offsets[1:]:
+        # 微信日期平移 offset 天后与银行做等值连接
+        take(_rank_join(bank, wechat.assign(d=wechat["d"] - offset)), offset, METHOD_CROSS_DAY)
+
+    if tol_cents > 0:
+        for offset in offsets:
+            method = METHOD_TOLERANCE if offset == 0 else METHOD_CROSS_DAY_TOLERANCE
+            for pairs in _nearest_join(bank, wechat.assign(d=wechat["d"] - offset), tol_cents):
+                take(pairs, offset, method)
+
+    if not found:
+        return pd.DataFrame({"pos_b": [], "pos_w": [], "offset": [], "method": []}).astype({"pos_b": "int64", "pos_w": "int64"})
+    return pd.concat(found, ignore_index=True)
+
+
+def reconcile_fuzzy(bank_df, wechat_df, day_window=1, tolerance=0.0):
+    """
+    容差对账：同日精确匹配之后，对剩余交易允许 ±day_window 天的入账延迟与 tolerance 元以内的金额差
+
+    返回 (按日报告, 配对明细)。报告在 REPORT_COLUMNS 之外增加「容差匹配」笔数列；
+    配对明细逐对记录两端日期、金额、日差、金额差与匹配方式。
+    """
+    counts = _align_counts(count_keys(bank_df), count_keys(wechat_df))
+    if counts.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS + ["容差匹配"]), pd.DataFrame(columns=PAIR_COLUMNS)
+
+    days, bank_total, wechat_total, matched_cents, bank_left, wechat_left = _exact_stage(counts)
+    pairs = fuzzy_pairs(bank_left, wechat_left, day_window, int(round(tolerance * 100)))
+
+    b_pos = pairs["pos_b"].to_numpy()
+    w_pos = pairs["pos_w"].to_numpy()
+    b_days, b_cents = bank_left[0][b_pos], bank_left[1][b_pos]
+    w_days, w_cents = wechat_left[0][w_pos], wechat_left[1][w_pos]
+
+    # 容差配对计入银行入账日的匹配金额；两端所在日期都记一次容差匹配
+    b_codes = np.searchsorted(days, b_days)
+    w_codes = np.searchsorted(days, w_days)
+    matched_cents = matched_cents + np.bincount(b_codes, weights=b_cents, minlength=len(days))
+    fuzzy_count = (
+        np.bincount(b_codes, minlength=len(days))
+        + np.bincount(w_codes[w_codes != b_codes], minlength=len(days))
+    )
+
+    b_keep = np.ones(len(bank_left[0]), dtype=bool)
+    b_keep[b_pos] = False
+    w_keep = np.ones(len(wechat_left[0]), dtype=bool)
+    w_keep[w_pos] = False
+
+    report = _assemble_report(
+        days, bank_total, wechat_total, matched_cents,
+        (bank_left[0][b_keep], bank_left[1][b_keep]),
+        (wechat_left[0][w_keep], wechat_left[1][w_keep]),
+    )
+    report["容差匹配"] = fuzzy_count
+    report.loc[(report["状态"] == STATUS_MATCHED) & (report["容差匹配"] > 0), "状态"] = STATUS_FUZZY
+
+    detail = pd.DataFrame({
+        "银行日期": b_days.astype("datetime64[D]").astype(object),
+        "微信日期": w_days.astype("datetime64[D]").astype(object),
+        "银行金额": b_cents / 100,
+        "微信金额": w_cents / 100,
+        "日差": (w_days - b_days).astype("int64"),
+        "金额差": np.round((w_cents - b_cents) / 100, 2),
+        "匹配方式": pairs["method"].to_numpy(dtype=object),
+    }, columns=PAIR_COLUMNS)
+    return report, detail.sort_values(["银行日期", "银行金额"], kind="stable").reset_index(drop=True)
+
+
+class DayIndex:
+    """
+    按日期稳定排序后的流水 + 日期 -> 行区间索引，取某日明细只需切片
+    """
+
+    def __init__(self, df):
+        day_numbers = frame_day_numbers(df)
+        order = np.argsort(day_numbers, kind="stable")
+        self.frame = df.iloc[order]
+        days, starts = np.unique(day_numbers[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+        self.slices = dict(zip(days.astype("datetime64[D]").astype(object), zip(starts, stops)))
+
+    def rows(self, day):
+        """
+        某日的全部流水（保持原始相对顺序），无记录时返回空表
+        """
+        start, stop = self.slices.get(day, (0, 0))
+        return self.frame.iloc[start:stop]
@@ -0,0 +1,244 @@
+"""
+多来源对账：任意多份账单（工行、其他银行卡、微信、支付宝……，列格式同 parse_excel_universal 输出，标准或紧凑表示均可）
+
+基准端（默认第一份，可指定多份银行卡）与其余来源合并成的对手端对账：
+1. 同日同金额一对一精确匹配（整数分，向量化等值连接）；
+2. 剩余交易逐日做组合匹配：一笔对同一来源的多笔（合并扣款 / 拆单支付），
+   在整数分上做有界子集和搜索——组合大小逐轮由小到大、降序剪枝，单次搜索节点数与总耗时都有上限，
+   繁忙日期超出预算时停止搜索并在报告中标记「搜索截断」，剩余交易照常列为漏项。
+
+用法: python reconcile_multi.py 工行=icbc.xlsx 微信=wechat.xlsx 支付宝=alipay.xlsx [--base 工行] [-o report.csv]
+"""
+import argparse
+import bisect
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from reconcile_engine import STATUS_DIFF, STATUS_MATCHED, _missing_lists, frame_cents, frame_day_numbers
+
+STATUS_GROUP = "🔗 组合匹配"
+
+# 组合方向（以基准端为准）：一笔基准交易对多笔对手交易，或多笔基准交易对一笔对手交易
+METHOD_ONE_TO_MANY = "一对多"
+METHOD_MANY_TO_ONE = "多对一"
+
+# 组合匹配明细：同一组号的各行共同构成一次组合匹配
+GROUP_COLUMNS = ["组号", "日期", "匹配方式", "来源", "行号", "金额"]
+
+# 组合最多包含的笔数、单次子集和搜索的节点上限、整次对账的组合搜索总耗时上限（秒）
+MAX_GROUP = 4
+NODE_BUDGET = 20000
+TIME_BUDGET = 2.0
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def find_subset(target, values, size, budget):
+    """
+    在降序排列的正整数 values 中找 size 个下标使其和恰为 target，找不到返回 None；
+    budget 为单元素列表（剩余可展开节点数），耗尽时抛出 _BudgetExceeded
+    """
+    n = len(values)
+    if size > n:
+        return None
+    neg = [-v for v in values]
+    prefix = list(itertools.accumulate(values, initial=0))
+    chosen = []
+
+    def dfs(start, remaining, slots):
+        # 跳过大于剩余金额的项
+        i = bisect.bisect_left(neg, -remaining, start)
+        if slots == 1:
+            if i < n and values[i] == remaining:
+                chosen.append(i)
+                return True
+            return False
+        smallest = prefix[n] - prefix[n - slots + 1]
+        prev = None
+        while i <= n - slots:
+            v = values[i]
+            # 从 i 起最大的 slots 项都凑不够，之后只会更小
+            if prefix[i + slots] - prefix[i] < remaining:
+                return False
+            # 同额的项只展开一次；v 加上最小的 slots-1 项仍超出时换更小的 v
+            if v != prev and v + smallest <= remaining:
+                budget[0] -= 1
+                if budget[0] < 0:
+                    raise _BudgetExceeded
+                chosen.append(i)
+                if dfs(i + 1, remaining - v, slots - 1):
+                    return True
+                chosen.pop()
+                prev = v
+            i += 1
+        return False
+
+    return chosen if dfs(0, target, size) else None
+
+
+def _group_matches(targets, pool, max_group, node_budget, deadline):
+    """
+    targets / pool 为 [(行, 来源, 金额分)]；在 pool 的同一来源、同号交易中为目标找若干笔之和恰等于它的组合。
+    按组合大小由小到大逐轮搜索（先为所有目标找两笔组合，再找三笔……），笔数越少的组合越不容易误配；
+    每轮内目标按金额绝对值降序。返回 ([(目标行, [pool 行])], 是否因节点预算或到达 deadline 而未搜索完整)
+    """
+    used = set()
+    matches = []
+    truncated = False
+    by_key = {}
+    for row, src, cents in pool:
+        by_key.setdefault((src, cents > 0), []).append((abs(cents), row))
+    for items in by_key.values():
+        items.sort(reverse=True)
+
+    pending = sorted((t for t in targets if t[2] != 0), key=lambda t: -abs(t[2]))
+    for size in range(2, max_group + 1):
+        rest = []
+        for row, src, cents in pending:
+            if time.perf_counter() > deadline:
+                return matches, True
+            target = abs(cents)
+            found = None
+            for key in [k for k in by_key if k[1] == (cents > 0)]:
+                items = [item for item in by_key[key] if item[1] not in used and 0 < item[0] < target]
+                try:
+                    found = find_subset(target, [v for v, _ in items], size, [node_budget])
+                except _BudgetExceeded:
+                    truncated = True
+                if found:
+                    rows = [items[i][1] for i in found]
+                    used.update(rows)
+                    matches.append((row, rows))
+                    break
+            if not found:
+                rest.append((row, src, cents))
+        pending = rest
+    return matches, truncated
+
+
+def reconcile_multi(sources, base=None, max_group=MAX_GROUP, node_budget=NODE_BUDGET, time_budget=TIME_BUDGET):
+    """
+    多来源对账：sources 为 {来源名: 流水表（日期 / 金额）}，base 为基准端来源名（或名称列表，默认第一个来源）
+
+    返回 (按日报告, 组合匹配明细)。报告列为 日期、状态、各来源笔数、匹配总额（基准端）、组合匹配、
+    各来源漏项、搜索截断；明细列见 GROUP_COLUMNS，行号为该笔在其来源流水表中的位置。
+    """
+    names = list(sources)
+    base = [base] if isinstance(base, str) else list(base or names[:1])
+    unknown = [b for b in base if b not in sources]
+    if unknown or len(base) >= len(names):
+        raise ValueError(f"基准端应为部分来源名: {base}")
+    src_of = {name: i for i, name in enumerate(names)}
+
+    frame = pd.concat([
+        pd.DataFrame({
+            "src": src_of[name],
+            "side": int(name not in base),
+            "d": frame_day_numbers(df),
+            "c": frame_cents(df),
+            "pos": np.arange(len(df)),
+        })
+        for name, df in sources.items()
+    ], ignore_index=True)
+    frame["row"] = np.arange(len(frame))
+    src = frame["src"].to_numpy()
+    d = frame["d"].to_numpy()
+    c = frame["c"].to_numpy()
+
+    # 1. 同日同金额一对一：按 (日期, 金额分, 组内序号) 等值连接
+    ranked = frame.assign(r=frame.groupby(["side", "d", "c"]).cumcount())
+    exact = ranked[ranked["side"] == 0].merge(ranked[ranked["side"] == 1], on=["d", "c", "r"], suffixes=("_b", "_o"))
+    matched = np.zeros(len(frame), dtype=bool)
+    matched[exact["row_b"].to_numpy()] = True
+    matched[exact["row_o"].to_numpy()] = True
+
+    # 2. 逐日组合匹配，超出总耗时后剩余日期不再搜索
+    deadline = time.perf_counter() + time_budget
+    left = frame[~matched]
+    groups = []
+    truncated_days = set()
+    for day, rows in left.groupby("d", sort=True):
+        sides = rows["side"].to_numpy()
+        if sides.min() == sides.max():
+            continue
+        if time.perf_counter() > deadline:
+            truncated_days.add(day)
+            continue
+        records = list(zip(rows["row"], rows["src"], rows["c"]))
+        base_rows = [r for r, s in zip(records, sides) if s == 0]
+        other_rows = [r for r, s in zip(records, sides) if s == 1]
+        found, cut = _group_matches(base_rows, other_rows, max_group, node_budget, deadline)
+        groups += [(day, METHOD_ONE_TO_MANY, target, members) for target, members in found]
+        taken = {row for _, members in found for row in members} | {target for target, _ in found}
+        base_rows = [r for r in base_rows if r[0] not in taken]
+        other_rows = [r for r in other_rows if r[0] not in taken]
+        found, cut2 = _group_matches(other_rows, base_rows, max_group, node_budget, deadline)
+        groups += [(day, METHOD_MANY_TO_ONE, target, members) for target, members in found]
+        if cut or cut2:
+            truncated_days.add(day)
+
+    group_rows = [[target] + members for _, _, target, members in groups]
+    for rows in group_rows:
+        matched[rows] = True
+
+    # 3. 按日汇总
+    days, day_codes = np.unique(d, return_inverse=True)
+    report = pd.DataFrame({"日期": days.astype("datetime64[D]").astype(object)})
+    base_mask = frame["side"].to_numpy() == 0
+    left_count = np.bincount(day_codes[~matched], minlength=len(days))
+    group_count = np.bincount(np.searchsorted(days, [g[0] for g in groups]).astype("int64"), minlength=len(days))
+    report["状态"] = np.where(left_count > 0, STATUS_DIFF, np.where(group_count > 0, STATUS_GROUP, STATUS_MATCHED))
+    for name, i in src_of.items():
+        report[f"{name}笔数"] = np.bincount(day_codes[src == i], minlength=len(days))
+    report["匹配总额"] = np.round(
+        np.bincount(day_codes[base_mask & matched], weights=c[base_mask & matched], minlength=len(days)) / 100, 2
+    )
+    report["组合匹配"] = group_count
+    for name, i in src_of.items():
+        keep = (src == i) & ~matched
+        report[f"{name}漏项"] = _missing_lists(days, d[keep], c[keep])
+    report["搜索截断"] = np.isin(days, list(truncated_days))
+
+    detail = pd.DataFrame([
+        (gid, day, method, names[src[row]], int(frame["pos"].iat[row]), c[row] / 100)
+        for gid, ((day, method, _, _), rows) in enumerate(zip(groups, group_rows), start=1)
+        for row in rows
+    ], columns=GROUP_COLUMNS)
+    detail["日期"] = detail["日期"].to_numpy(dtype="int64").astype("datetime64[D]").astype(object)
+    return report, detail
+
+
+def main(argv=None):
+    from statement_parser import parse_excel_universal
+
+    parser = argparse.ArgumentParser(description="多来源账单组合对账")
+    parser.add_argument("statements", nargs="+", metavar="来源=文件", help="如 工行=icbc.xlsx 微信=wechat.xlsx")
+    parser.add_argument("--base", action="append", help="基准端来源名，可重复（默认第一个来源）")
+    parser.add_argument("--max-group", type=int, default=MAX_GROUP, help="组合最多包含的笔数")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET, help="组合搜索总耗时上限（秒）")
+    parser.add_argument("-o", "--output", default="multi_report.csv", help="报告 CSV 路径（明细写入 *_groups.csv）")
+    args = parser.parse_args(argv)
+
+    sources = {}
+    for item in args.statements:
+        name, _, path = item.partition("=")
+        if not path:
+            parser.error(f"参数应为 来源=文件: {item}")
+        print(f"正在读取 {name}: {path}...")
+        sources[name] = parse_excel_universal(path, name, compact=True)
+
+    report, detail = reconcile_multi(sources, args.base, args.max_group, time_budget=args.time_budget)
+    report.to_csv(args.output, index=False, encoding="utf-8-sig")
+    detail.to_csv(args.output.rsplit(".", 1)[0] + "_groups.csv", index=False, encoding="utf-8-sig")
+    print(f"对账天数 {len(report)}，异常天数 {int((report['状态'] == STATUS_DIFF).sum())}，"
+          f"组合匹配 {int(report['组合匹配'].sum())} 组，搜索截断 {int(report['搜索截断'].sum())} 天")
+    print(f"报告已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
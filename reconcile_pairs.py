@@ -0,0 +1,153 @@
+"""
+逐笔配对：在按日对账的基础上给出具体哪一笔银行流水对应哪一笔微信流水
+
+reconcile_daily 只按 (日期, 金额分) 计数，同日同额的多笔之间没有先后之分。这里先按 (日期, 金额分) 分桶，
+只在同一桶内比较两端文本（描述 / 对方户名 / 交易对方 / 商品）的相似度，按相似度由高到低贪心配对；
+每个桶配对 min(两端笔数) 笔，与 reconcile_daily 的匹配数一致，只是同额多笔时挑出文本最接近的组合，
+剩下的才是漏项。分词按文本取值缓存，category 列每个类别只分词一次。
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from reconcile_engine import frame_cents, frame_day_numbers
+
+# 参与相似度比较的文本列
+TEXT_COLUMNS = ["描述", "对方户名", "交易对方", "商品"]
+
+# 视为空白的占位文本（clean_frame 对缺失列填 "-"，无描述时为「无详细描述」）
+PLACEHOLDERS = {"", "-", "/", "nan", "无详细描述"}
+
+# 单个桶的候选对数上限：超过时该桶不再比较文本，按原始顺序配对
+MAX_BUCKET_CANDIDATES = 10000
+
+# 逐笔配对结果的列：两端行号为在传入表中的位置
+PAIR_COLUMNS = ["日期", "金额", "银行行号", "微信行号", "相似度"]
+
+_WORD = re.compile(r"[a-z0-9]+|[一-鿿]+")
+
+
+def tokenize(text):
+    """
+    文本 -> 词元集合：英文 / 数字取整段，中文取相邻两字（单字时取单字）
+    """
+    tokens = set()
+    for run in _WORD.findall(str(text).lower()):
+        if run[0] < "一" or len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class TokenCache:
+    """
+    文本取值 -> 词元集合的缓存，同一取值只分词一次
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, text):
+        tokens = self._cache.get(text)
+        if tokens is None:
+            tokens = frozenset() if text in PLACEHOLDERS else frozenset(tokenize(text))
+            self._cache[text] = tokens
+        return tokens
+
+
+def row_tokens(df, positions, cache):
+    """
+    指定行（位置）的词元集合：各文本列词元的并集；category 列按类别分词后用编码取用
+    """
+    out = [frozenset()] * len(positions)
+    for col in TEXT_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].iloc[positions]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            table = [cache.get(str(v)) for v in values.cat.categories] + [frozenset()]
+            tokens = [table[k] for k in values.cat.codes.to_numpy()]
+        else:
+            tokens = [cache.get(v) for v in values.astype(object).fillna("").astype(str).to_numpy()]
+        out = [acc | t if t else acc for acc, t in zip(out, tokens)]
+    return out
+
+
+def similarity(a, b):
+    """
+    词元集合的 Jaccard 相似度；两端都没有文本时为 0
+    """
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def match_pairs(bank_df, wechat_df, max_bucket=MAX_BUCKET_CANDIDATES, score_all=False, cache=None):
+    """
+    同日同金额的逐笔配对（标准或紧凑表示均可），返回 PAIR_COLUMNS 表（按日期、金额、银行行号排序）
+
+    只在 (日期, 金额分) 相同的桶内生成候选对；两端各只有一笔的桶直接配对，
+    其余桶计算候选对的文本相似度后贪心取最高者，同分时按两端原始顺序。
+    直接配对与超大桶的相似度为空；score_all=True 时直接配对的也计算相似度（用于展示）。
+    """
+    cache = cache or TokenCache()
+    bank = pd.DataFrame({"d": frame_day_numbers(bank_df), "c": frame_cents(bank_df), "pos": np.arange(len(bank_df))})
+    wechat = pd.DataFrame({"d": frame_day_numbers(wechat_df), "c": frame_cents(wechat_df), "pos": np.arange(len(wechat_df))})
+    bank["n"] = bank.groupby(["d", "c"])["pos"].transform("size")
+    wechat["n"] = wechat.groupby(["d", "c"])["pos"].transform("size")
+
+    # 候选对只在同一 (日期, 金额分) 桶内产生；候选对数超过 max_bucket 的桶按原始顺序配对，不展开候选
+    sizes = bank[["d", "c", "n"]].drop_duplicates().merge(wechat[["d", "c", "n"]].drop_duplicates(), on=["d", "c"])
+    big = sizes.loc[sizes["n_x"] * sizes["n_y"] > max_bucket, ["d", "c"]].assign(big=True)
+    bank = bank.merge(big, on=["d", "c"], how="left")
+    wechat = wechat.merge(big, on=["d", "c"], how="left")
+    b_big, w_big = bank["big"].eq(True), wechat["big"].eq(True)
+    ranked = (
+        bank[b_big].assign(r=bank[b_big].groupby(["d", "c"]).cumcount())
+        .merge(wechat[w_big].assign(r=wechat[w_big].groupby(["d", "c"]).cumcount()), on=["d", "c", "r"], suffixes=("_b", "_w"))
+    )
+    cand = bank[~b_big].merge(wechat[~w_big], on=["d", "c"], suffixes=("_b", "_w"))
+
+    score = np.full(len(cand), np.nan)
+    tied = (cand["n_b"] > 1).to_numpy() | (cand["n_w"] > 1).to_numpy()
+    if tied.any():
+        b_pos = cand["pos_b"].to_numpy()[tied]
+        w_pos = cand["pos_w"].to_numpy()[tied]
+        b_rows, b_inv = np.unique(b_pos, return_inverse=True)
+        w_rows, w_inv = np.unique(w_pos, return_inverse=True)
+        b_tokens = row_tokens(bank_df, b_rows, cache)
+        w_tokens = row_tokens(wechat_df, w_rows, cache)
+        score[tied] = [similarity(b_tokens[i], w_tokens[j]) for i, j in zip(b_inv, w_inv)]
+    cand = cand.assign(s=score, single=~tied).sort_values(
+        ["d", "c", "s", "pos_b", "pos_w"], ascending=[True, True, False, True, True], na_position="last"
+    )
+
+    # 贪心：按相似度由高到低，两端都未被占用的候选对入选
+    used_b, used_w = set(), set()
+    keep = np.zeros(len(cand), dtype=bool)
+    for k, (b, w) in enumerate(zip(cand["pos_b"].to_numpy(), cand["pos_w"].to_numpy())):
+        if b not in used_b and w not in used_w:
+            used_b.add(b)
+            used_w.add(w)
+            keep[k] = True
+    chosen = pd.concat([cand[keep], ranked.assign(s=np.nan, single=False)], ignore_index=True).sort_values(["d", "c", "pos_b"])
+
+    # 两端各一笔的桶未计算相似度，展示时补算
+    single = chosen["single"].to_numpy(dtype=bool)
+    if score_all and single.any():
+        b_pos = chosen["pos_b"].to_numpy()[single]
+        w_pos = chosen["pos_w"].to_numpy()[single]
+        chosen.loc[single, "s"] = [
+            similarity(a, b) for a, b in zip(row_tokens(bank_df, b_pos, cache), row_tokens(wechat_df, w_pos, cache))
+        ]
+
+    return pd.DataFrame({
+        "日期": chosen["d"].to_numpy(dtype="int64").astype("datetime64[D]").astype(object),
+        "金额": chosen["c"].to_numpy() / 100,
+        "银行行号": chosen["pos_b"].to_numpy(dtype="int64"),
+        "微信行号": chosen["pos_w"].to_numpy(dtype="int64"),
+        "相似度": np.round(chosen["s"].to_numpy(dtype="float64"), 3),
+    }, columns=PAIR_COLUMNS)
@@ -0,0 +1,172 @@
+"""
+向量化风险交易扫描
+
+扫描前先把账单整理为统一的内部列（_text 文本、_time 时间、_amount 金额、_merchant 商户），
+每条规则是一个接收该表、返回逐行风险原因（未命中为空字符串）的函数，可自由组合。
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+RISK_COLUMNS = ["时间", "商户/商品", "金额", "风险原因"]
+
+
+def keyword_pattern(keywords):
+    """
+    关键字编译为单个交替正则（长词优先），一次扫描判断是否命中任一关键字；关键字为空时返回永不命中的正则
+    """
+    if not keywords:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True)))
+
+
+def keyword_rule(keywords):
+    """
+    敏感词规则：先用交替正则筛出命中行，再只在命中行上逐词确认，原因中按关键字列表顺序列出全部命中词
+    """
+    keywords = list(dict.fromkeys(keywords))
+    pattern = keyword_pattern(keywords)
+
+    def rule(frame):
+        reasons = pd.Series("", index=frame.index, dtype=object)
+        hit = frame["_text"].str.contains(pattern, na=False)
+        if not hit.any():
+            return reasons
+        text = frame.loc[hit, "_text"]
+        matched = pd.Series("", index=text.index, dtype=object)
+        for k in keywords:
+            has = text.str.contains(k, regex=False)
+            matched = matched.where(~has, np.where(matched == "", k, matched + ", " + k))
+        reasons[hit] = "包含敏感词: " + matched
+        return reasons
+
+    return rule
+
+
+def night_rule(start_hour=1, end_hour=5):
+    """
+    非正常消费时间：交易小时落在 [start_hour, end_hour]
+    """
+    def rule(frame):
+        hour = frame["_time"].dt.hour
+        return pd.Series(np.where(hour.between(start_hour, end_hour), "非正常消费时间(凌晨)", ""), index=frame.index)
+
+    return rule
+
+
+def amount_rule(threshold=1000.0):
+    """
+    大额交易：金额绝对值不低于 threshold 元
+    """
+    def rule(frame):
+        big = frame["_amount"].abs() >= threshold
+        return pd.Series(np.where(big, f"大额交易(≥{threshold:g}元)", ""), index=frame.index)
+
+    return rule
+
+
+def merchant_burst_rule(min_count=3, window_minutes=10):
+    """
+    同一商户短时高频：window_minutes 分钟内同一商户出现不少于 min_count 笔，标记整段突发
+    """
+    window = window_minutes * 60
+    reason = f"同一商户短时高频(≥{min_count}笔/{window_minutes}分钟)"
+
+    def rule(frame):
+        valid = frame["_time"].notna().to_numpy() & frame["_merchant"].ne("").to_numpy()
+        flags = np.zeros(len(frame), dtype=bool)
+        if valid.sum() >= min_count:
+            secs = frame["_time"].to_numpy()[valid].astype("datetime64[s]").astype("int64")
+            codes = pd.factorize(frame["_merchant"].to_numpy()[valid])[0].astype("int64")
+            # (商户, 时间) 合成单调键，按商户分段后在时间轴上二分查找窗口起点
+            secs = secs - secs.min()
+            key = codes * (secs.max() + window + 1) + secs
+            order = np.argsort(key, kind="stable")
+            key = key[order]
+            left = np.searchsorted(key, key - window, side="left")
+            ends = np.flatnonzero(np.arange(len(key)) - left + 1 >= min_count)
+            # 差分数组标记每段突发 [left, end]
+            marks = np.zeros(len(key) + 1, dtype="int64")
+            np.add.at(marks, left[ends], 1)
+            np.add.at(marks, ends + 1, -1)
+            in_burst = np.empty(len(key), dtype=bool)
+            in_burst[order] = np.cumsum(marks[:-1]) > 0
+            flags[np.flatnonzero(valid)] = in_burst
+        return pd.Series(np.where(flags, reason, ""), index=frame.index)
+
+    return rule
+
+
+def night_cluster_rule(min_count=3, start_hour=1, end_hour=5):
+    """
+    凌晨集中消费：同一天凌晨时段交易不少于 min_count 笔
+    """
+    reason = f"凌晨集中消费(同日≥{min_count}笔)"
+
+    def rule(frame):
+        night = frame["_time"].dt.hour.between(start_hour, end_hour)
+        day = frame["_time"].dt.normalize().where(night)
+        count = day.map(day.value_counts()).fillna(0)
+        return pd.Series(np.where(night & (count >= min_count), reason, ""), index=frame.index)
+
+    return rule
+
+
+def default_rules(keywords):
+    """
+    默认规则：敏感词 + 凌晨交易
+    """
+    return [keyword_rule(keywords), night_rule()]
+
+
+def _as_text(values):
+    """
+    文本列转为字符串，缺失值为空串（category 列不能直接 fillna("")）
+    """
+    return values.astype(object).fillna("").astype(str)
+
+
+def prepare_frame(df, text_cols, time_col=None, amount_col="金额", merchant_col=None):
+    """
+    账单整理为扫描用的内部列；缺少时间列时时间规则自动不命中
+    """
+    text_cols = [c for c in text_cols if c in df.columns]
+    text = _as_text(df[text_cols[0]]) if text_cols else pd.Series("", index=df.index)
+    for c in text_cols[1:]:
+        text = text + " " + _as_text(df[c])
+    return pd.DataFrame({
+        "_text": text,
+        "_time": pd.to_datetime(df[time_col], errors="coerce") if time_col in df.columns else pd.NaT,
+        "_amount": pd.to_numeric(df[amount_col], errors="coerce"),
+        "_merchant": _as_text(df[merchant_col]) if merchant_col in df.columns else "",
+    }, index=df.index)
+
+
+def scan(frame, rules):
+    """
+    依次执行规则并合并原因，返回逐行原因（" | " 连接，未命中为空字符串）；只在命中行上拼接文本
+    """
+    parts = [rule(frame).to_numpy(dtype=object) for rule in rules]
+    hit = np.zeros(len(frame), dtype=bool)
+    for p in parts:
+        hit |= p != ""
+    idx = np.flatnonzero(hit)
+    reasons = np.full(len(frame), "", dtype=object)
+    reasons[idx] = [" | ".join(r for r in row if r) for row in zip(*(p[idx] for p in parts))]
+    return pd.Series(reasons, index=frame.index, dtype=object)
+
+
+def identify_risks(df, rules, text_cols, time_col=None, amount_col="金额", merchant_col=None):
+    """
+    扫描账单并返回风险交易表（时间 / 商户/商品 / 金额 / 风险原因）
+    """
+    frame = prepare_frame(df, text_cols, time_col, amount_col, merchant_col)
+    reasons = scan(frame, rules)
+    hit = reasons != ""
+    return pd.DataFrame({
+        "时间": df.loc[hit, time_col] if time_col in df.columns else pd.NaT,
+        "商户/商品": frame.loc[hit, "_text"],
+        "金额": frame.loc[hit, "_amount"],
+        "风险原因": reasons[hit],
+    }, columns=RISK_COLUMNS).reset_index(drop=True)
@@ -0,0 +1,114 @@
+"""
+扫描结果流式落盘与断点续扫
+
+命中结果按批追加写入 scan_<label>.partial.csv，已处理的代码逐行追加到 scan_<label>.checkpoint；
+启用筛选规则时各规则的命中另写入 scan_<label>.rules.partial.csv。
+先写结果、后写检查点：中断时最多重复处理一批（合并时按 (日期, 代码) 去重），不会丢结果。
+"""
+import os
+
+import pandas as pd
+
+from limit_screen import RESULT_COLUMNS
+from screen_rules import RULE_HIT_COLUMNS, merge_rule_hits
+from stock_universe import merge_results
+
+
+def _trim_partial_line(path):
+    """
+    截掉文件末尾被中断写入的半行
+    """
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class ScanCheckpoint:
+    """
+    单次扫描（按 label 区分）的结果流与检查点文件
+    """
+
+    def __init__(self, label, directory=".", rules=False):
+        self.results_path = os.path.join(directory, f"scan_{label}.partial.csv")
+        self.checkpoint_path = os.path.join(directory, f"scan_{label}.checkpoint")
+        self.rules_path = os.path.join(directory, f"scan_{label}.rules.partial.csv") if rules else None
+        self._results = None
+        self._checkpoint = None
+        self._rules = None
+
+    def open(self, resume=False):
+        """
+        打开结果流与检查点，返回已处理的代码集合；resume=False 时清空重来
+        """
+        done = set()
+        if resume and os.path.exists(self.results_path) and os.path.exists(self.checkpoint_path):
+            _trim_partial_line(self.results_path)
+            _trim_partial_line(self.checkpoint_path)
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                done = {line.strip() for line in f if line.strip()}
+            mode = "a"
+        else:
+            mode = "w"
+        self._results = open(self.results_path, mode, encoding="utf-8-sig", newline="")
+        self._checkpoint = open(self.checkpoint_path, mode, encoding="utf-8")
+        if mode == "w":
+            pd.DataFrame(columns=RESULT_COLUMNS).to_csv(self._results, index=False)
+            self._results.flush()
+        if self.rules_path:
+            # 续扫前未启用规则时没有规则结果流，从头写（已处理的标的不再补评估）
+            rules_mode = mode if os.path.exists(self.rules_path) else "w"
+            if rules_mode == "a":
+                _trim_partial_line(self.rules_path)
+            self._rules = open(self.rules_path, rules_mode, encoding="utf-8-sig", newline="")
+            if rules_mode == "w":
+                pd.DataFrame(columns=RULE_HIT_COLUMNS).to_csv(self._rules, index=False)
+                self._rules.flush()
+        return done
+
+    def append(self, rows, codes, rule_rows=None):
+        """
+        追加一批命中结果 (RESULT_COLUMNS 表)、规则命中 (RULE_HIT_COLUMNS 表) 及该批已处理的代码
+        """
+        if not rows.empty:
+            self._results.write(rows[RESULT_COLUMNS].to_csv(index=False, header=False))
+            self._results.flush()
+        if self._rules is not None and rule_rows is not None and not rule_rows.empty:
+            self._rules.write(rule_rows[RULE_HIT_COLUMNS].to_csv(index=False, header=False))
+            self._rules.flush()
+        if codes:
+            self._checkpoint.write("".join(f"{code}\n" for code in codes))
+            self._checkpoint.flush()
+
+    def close(self):
+        for f in (self._results, self._checkpoint, self._rules):
+            if f is not None:
+                f.close()
+        self._results = self._checkpoint = self._rules = None
+
+    def load_results(self):
+        """
+        读取已落盘的全部命中结果，去重并按日期升序、区间涨幅降序排列
+        """
+        return merge_results([self.results_path])[1]
+
+    def load_rule_hits(self, rules):
+        """
+        读取已落盘的规则命中，去重并按规则顺序、日期、代码排列；未启用规则时为空表
+        """
+        if not self.rules_path or not os.path.exists(self.rules_path):
+            return pd.DataFrame(columns=RULE_HIT_COLUMNS)
+        return merge_rule_hits([self.rules_path], [rule.name for rule in rules])[1]
+
+    def remove(self):
+        """
+        扫描完整结束后删除结果流与检查点
+        """
+        self.close()
+        for path in (self.results_path, self.checkpoint_path, self.rules_path):
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,413 @@
+"""
+选股规则语言：一行一条「名称 = 表达式」，编译为面板（limit_screen.build_panel）上的向量化数组运算
+
+表达式使用 Python 语法的子集：四则运算、比较、and / or / not（或 & | ~）、数字常量、下列变量与函数。
+每个变量 / 函数都在整张面板（全部股票 × 全部 K 线）上一次算出，按股票分段处理窗口与位移，
+同一批面板上的多条规则共用已算出的变量；规则只在目标日的 K 线上取命中。
+
+变量:
+    close / high / turnover     收盘 / 最高 / 换手率（或成交额）
+    prev_close                  前收盘
+    limit                       涨停价（创业板、科创板 20%，其余 10%）
+    touch / sealed              最高价触及涨停 / 收盘封住涨停
+    pct                         当日涨幅%
+    latest / period_pct         最新收盘 / 当日至最新的区间涨幅%
+    activity                    当日至最新的累计换手（tail_sum(turnover)）
+函数:
+    ref(x, n)                   n 根 K 线之前的值
+    mean / sum / max / min(x, n)  含当日的 n 根滚动统计（不足 n 根或窗口内有缺失值时为空）
+    count(cond, n)              n 根内条件成立的次数
+    streak(cond)                截至当日条件连续成立的根数
+    last(x) / tail_sum(x)       该股最新一根的值 / 当日至最新的累计和
+    abs(x)
+
+例:
+    连板 = streak(sealed) >= 2
+    炸板 = touch and not sealed
+    放量 = turnover >= 3 * ref(mean(turnover, 5), 1)
+"""
+import ast
+import glob
+import re
+
+import numpy as np
+import pandas as pd
+
+from limit_screen import MIN_BARS, limit_prices, limit_rates
+
+# 规则命中表的列
+RULE_HIT_COLUMNS = ["规则", "日期", "代码", "名称", "收盘", "当日涨幅%", "区间涨幅%", "现价"]
+RULE_HIT_KEY = ["规则", "日期", "代码"]
+
+# 滚动窗口的根数上限
+MAX_WINDOW = 250
+
+# --rules default 使用的内置规则
+DEFAULT_RULES = """
+# 原有形态：目标日最高价触及涨停
+触及涨停 = touch
+# 连续两日及以上收盘封板
+连板 = streak(sealed) >= 2
+# 盘中触及涨停但收盘未封住
+炸板 = touch and not sealed
+# 换手放大到前五日均值的三倍以上
+放量 = turnover >= 3 * ref(mean(turnover, 5), 1)
+"""
+
+_RULE_LINE = re.compile(r"^\s*([^=<>!#]+?)\s*=(?!=)\s*(.+?)\s*$")
+
+
+class RuleError(ValueError):
+    """
+    规则无法解析或编译
+    """
+
+
+class RuleContext:
+    """
+    一张面板上的规则求值环境：按股票分段的位置信息 + 已算出变量的缓存
+    """
+
+    def __init__(self, panel):
+        self.n = len(panel)
+        self.code_idx = panel["code"].cat.codes.to_numpy()
+        self.categories = panel["code"].cat.categories
+        self.date = panel["date"].to_numpy()
+        self.columns = {c: panel[c].to_numpy(dtype=float) for c in ("close", "high", "turnover")}
+        self.starts = np.flatnonzero(np.r_[True, self.code_idx[1:] != self.code_idx[:-1]])
+        self.sizes = np.diff(np.r_[self.starts, self.n])
+        self.group = np.repeat(np.arange(len(self.starts)), self.sizes)
+        self.ends = self.starts + self.sizes - 1
+        self.pos = np.arange(self.n) - self.starts[self.group]
+        self._vars = {}
+
+    def var(self, name):
+        if name not in self._vars:
+            self._vars[name] = VARIABLES[name][1](self)
+        return self._vars[name]
+
+    def shift(self, x, k):
+        """
+        同一股票内 k 根之前的值，越过该股首根时为空（条件为 False）
+        """
+        out = np.zeros(self.n, dtype=bool) if x.dtype == bool else np.full(self.n, np.nan)
+        idx = np.flatnonzero(self.pos >= k)
+        out[idx] = x[idx - k]
+        return out
+
+    def rolling(self, x, k, how):
+        """
+        含当日的 k 根滚动统计，不足 k 根或窗口内有缺失值（NaN）时为空
+        """
+        x = x.astype(float)
+        valid = self.pos >= k - 1
+        if how in ("sum", "mean"):
+            missing = np.isnan(x)
+            csum = np.cumsum(np.where(missing, 0.0, x))
+            cmiss = np.cumsum(missing)
+            if k < self.n:
+                total = csum - np.r_[np.zeros(k), csum[:-k]]
+                valid = valid & (cmiss - np.r_[np.zeros(k, dtype=cmiss.dtype), cmiss[:-k]] == 0)
+            else:
+                total = csum
+                valid = valid & (cmiss == 0)
+            out = total / k if how == "mean" else total
+        else:
+            stacked = np.vstack([self.shift(x, j) for j in range(k)])
+            with np.errstate(all="ignore"):
+                out = np.maximum.reduce(stacked) if how == "max" else np.minimum.reduce(stacked)
+        return np.where(valid, out, np.nan)
+
+    def streak(self, cond):
+        """
+        截至当日条件连续成立的根数（按股票分段）
+        """
+        idx = np.arange(self.n)
+        last_false = np.maximum.accumulate(np.where(cond, -1, idx))
+        base = np.maximum(last_false, self.starts[self.group] - 1)
+        return np.where(cond, idx - base, 0).astype(float)
+
+    def last(self, x):
+        return x[self.ends][self.group]
+
+    def tail_sum(self, x):
+        x = np.nan_to_num(x.astype(float))
+        csum = np.cumsum(x)
+        return csum[self.ends][self.group] - csum + x
+
+
+def _prev_close(ctx):
+    return ctx.shift(ctx.columns["close"], 1)
+
+
+def _limit(ctx):
+    return limit_prices(ctx.var("prev_close"), limit_rates(ctx.categories)[ctx.code_idx])
+
+
+def _pct(ctx):
+    prev = ctx.var("prev_close")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (ctx.columns["close"] - prev) / prev * 100
+
+
+def _period_pct(ctx):
+    close = ctx.columns["close"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (ctx.var("latest") - close) / close * 100
+
+
+# 变量名 -> (类型, 计算函数)；类型 "bool" 为条件，"num" 为数值
+VARIABLES = {
+    "close": ("num", lambda ctx: ctx.columns["close"]),
+    "high": ("num", lambda ctx: ctx.columns["high"]),
+    "turnover": ("num", lambda ctx: ctx.columns["turnover"]),
+    "prev_close": ("num", _prev_close),
+    "limit": ("num", _limit),
+    "touch": ("bool", lambda ctx: ctx.columns["high"] >= ctx.var("limit")),
+    "sealed": ("bool", lambda ctx: ctx.columns["close"] >= ctx.var("limit")),
+    "pct": ("num", _pct),
+    "latest": ("num", lambda ctx: ctx.last(ctx.columns["close"])),
+    "period_pct": ("num", _period_pct),
+    "activity": ("num", lambda ctx: ctx.tail_sum(ctx.columns["turnover"])),
+}
+
+# 依赖前一根 K 线（前收盘）的变量
+_PREV_BAR_VARIABLES = {"prev_close", "limit", "touch", "sealed", "pct"}
+
+_ARITH = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_COMPARE = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+
+
+def _window(node, source):
+    if not (isinstance(node, ast.Constant) and type(node.value) is int and 1 <= node.value <= MAX_WINDOW):
+        raise RuleError(f"窗口参数应为 1~{MAX_WINDOW} 的整数: {source}")
+    return node.value
+
+
+def _compile(node, source):
+    """
+    AST 节点 -> (类型, 求值函数 ctx -> ndarray 或标量)
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = float(node.value)
+        return "num", lambda ctx: value
+    if isinstance(node, ast.Name):
+        if node.id not in VARIABLES:
+            raise RuleError(f"未知变量 {node.id}（可用: {', '.join(VARIABLES)}）: {source}")
+        name = node.id
+        return VARIABLES[name][0], lambda ctx: ctx.var(name)
+    if isinstance(node, ast.BinOp) and type(node.op) in (ast.BitAnd, ast.BitOr):
+        op = np.logical_and if isinstance(node.op, ast.BitAnd) else np.logical_or
+        return _logical(op, [node.left, node.right], source)
+    if isinstance(node, ast.BoolOp):
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return _logical(op, node.values, source)
+    if isinstance(node, ast.UnaryOp):
+        kind, fn = _compile(node.operand, source)
+        if isinstance(node.op, (ast.Not, ast.Invert)):
+            _expect("bool", kind, source)
+            return "bool", lambda ctx: np.logical_not(fn(ctx))
+        if isinstance(node.op, ast.USub):
+            _expect("num", kind, source)
+            return "num", lambda ctx: np.negative(fn(ctx))
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        op = _ARITH[type(node.op)]
+        (lk, left), (rk, right) = _compile(node.left, source), _compile(node.right, source)
+        _expect("num", lk, source)
+        _expect("num", rk, source)
+
+        def arith(ctx):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return op(left(ctx), right(ctx))
+        return "num", arith
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+        parts = [_compile(n, source) for n in [node.left, *node.comparators]]
+        for kind, _ in parts:
+            _expect("num", kind, source)
+        ops = [_COMPARE[type(op)] for op in node.ops]
+
+        def compare(ctx):
+            values = [fn(ctx) for _, fn in parts]
+            out = ops[0](values[0], values[1])
+            for op, a, b in zip(ops[1:], values[1:], values[2:]):
+                out = out & op(a, b)
+            return out
+        return "bool", compare
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        return _call(node.func.id, node.args, source)
+    raise RuleError(f"不支持的语法「{ast.unparse(node)}」: {source}")
+
+
+def _expect(want, kind, source):
+    if want != kind:
+        raise RuleError(f"此处需要{'条件' if want == 'bool' else '数值'}表达式: {source}")
+
+
+def _logical(op, nodes, source):
+    parts = [_compile(n, source) for n in nodes]
+    for kind, _ in parts:
+        _expect("bool", kind, source)
+
+    def logical(ctx):
+        out = parts[0][1](ctx)
+        for _, fn in parts[1:]:
+            out = op(out, fn(ctx))
+        return out
+    return "bool", logical
+
+
+def _call(name, args, source):
+    if name in ("ref", "mean", "sum", "max", "min", "count") and len(args) == 2:
+        kind, fn = _compile(args[0], source)
+        k = _window(args[1], source)
+        if name == "ref":
+            return kind, lambda ctx: ctx.shift(np.broadcast_to(fn(ctx), ctx.n), k)
+        _expect("bool" if name == "count" else "num", kind, source)
+        how = "sum" if name == "count" else name
+        return "num", lambda ctx: ctx.rolling(np.broadcast_to(fn(ctx), ctx.n), k, how)
+    if name in ("streak", "last", "tail_sum", "abs") and len(args) == 1:
+        kind, fn = _compile(args[0], source)
+        if name == "streak":
+            _expect("bool", kind, source)
+            return "num", lambda ctx: ctx.streak(np.broadcast_to(fn(ctx), ctx.n))
+        _expect("num", kind, source)
+        if name == "abs":
+            return "num", lambda ctx: np.abs(fn(ctx))
+        method = name
+        return "num", lambda ctx: getattr(ctx, method)(np.broadcast_to(fn(ctx), ctx.n))
+    raise RuleError(f"未知函数或参数个数不符 {name}(…): {source}")
+
+
+def _lookback(node):
+    """
+    已通过编译的 AST 节点在当日之前至少需要的 K 线根数（窗口与位移逐层累加）
+    """
+    if isinstance(node, ast.Name):
+        return 1 if node.id in _PREV_BAR_VARIABLES else 0
+    if isinstance(node, ast.Call):
+        inner = _lookback(node.args[0])
+        if len(node.args) == 2:
+            k = node.args[1].value
+            return inner + (k if node.func.id == "ref" else k - 1)
+        return inner
+    return max((_lookback(child) for child in ast.iter_child_nodes(node)), default=0)
+
+
+class Rule:
+    """
+    一条已编译的规则：名称、原始表达式与求值函数；lookback 为目标日之前需要的 K 线根数
+    """
+
+    def __init__(self, name, expr):
+        self.name = name
+        self.expr = expr
+        try:
+            tree = ast.parse(expr, mode="eval")
+        except SyntaxError as e:
+            raise RuleError(f"规则 {name} 语法错误: {expr}") from e
+        kind, self._fn = _compile(tree.body, expr)
+        if kind != "bool":
+            raise RuleError(f"规则 {name} 应为条件表达式: {expr}")
+        self.lookback = _lookback(tree.body)
+
+    def evaluate(self, ctx):
+        return np.broadcast_to(self._fn(ctx), ctx.n)
+
+
+def parse_rules(text):
+    """
+    规则文本（每行「名称 = 表达式」，# 起为注释）-> [(名称, 表达式)]
+    """
+    specs = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        m = _RULE_LINE.match(line)
+        if not m:
+            raise RuleError(f"规则应写成「名称 = 表达式」: {line}")
+        specs.append((m.group(1), m.group(2)))
+    return specs
+
+
+def compile_rules(specs):
+    """
+    [(名称, 表达式)] -> [Rule]，名称不可重复
+    """
+    names = [name for name, _ in specs]
+    dup = sorted({n for n in names if names.count(n) > 1})
+    if dup:
+        raise RuleError(f"规则名称重复: {', '.join(dup)}")
+    return [Rule(name, expr) for name, expr in specs]
+
+
+def load_rules(path=None, extra=()):
+    """
+    读取规则文件（path 为 "default" 时用内置规则）并追加 extra 中的「名称=表达式」，编译后返回
+    """
+    specs = []
+    if path == "default":
+        specs += parse_rules(DEFAULT_RULES)
+    elif path:
+        with open(path, encoding="utf-8") as f:
+            specs += parse_rules(f.read())
+    for item in extra:
+        specs += parse_rules(item)
+    return compile_rules(specs)
+
+
+def rules_lookback(rules):
+    """
+    全部规则在目标日之前需要的 K 线根数（至少 1 根，供前收盘使用）
+    """
+    return max([1, *(rule.lookback for rule in rules)])
+
+
+def evaluate_rules(panel, rules, target_dates, names=None):
+    """
+    在面板上一次评估全部规则，返回目标日的命中表（RULE_HIT_COLUMNS，按规则顺序、日期、代码排列）
+    """
+    if len(panel) == 0 or not rules:
+        return pd.DataFrame(columns=RULE_HIT_COLUMNS)
+    ctx = RuleContext(panel)
+    targets = np.asarray([int(d) for d in target_dates], dtype="int64")
+    eligible = np.isin(ctx.date, targets) & (ctx.pos > 0) & (ctx.sizes[ctx.group] >= MIN_BARS)
+
+    hits = [np.flatnonzero(eligible & rule.evaluate(ctx)) for rule in rules]
+    rule_idx = np.repeat(np.arange(len(rules)), [len(r) for r in hits])
+    rows = np.concatenate(hits)
+    order = np.lexsort((ctx.code_idx[rows], ctx.date[rows], rule_idx))
+    rule_idx, rows = rule_idx[order], rows[order]
+    close = ctx.columns["close"]
+    pct, period_pct, latest = ctx.var("pct")[rows], ctx.var("period_pct")[rows], ctx.var("latest")[rows]
+    codes = ctx.categories[ctx.code_idx[rows]].astype(str)
+    names = names or {}
+    return pd.DataFrame({
+        "规则": np.array([rule.name for rule in rules], dtype=object)[rule_idx],
+        "日期": ctx.date[rows].astype(str),
+        "代码": codes,
+        "名称": [names.get(c, "") for c in codes],
+        "收盘": close[rows],
+        "当日涨幅%": [round(v, 2) for v in pct.tolist()],
+        "区间涨幅%": [round(v, 2) for v in period_pct.tolist()],
+        "现价": latest,
+    }, columns=RULE_HIT_COLUMNS)
+
+
+def merge_rule_hits(patterns, order=()):
+    """
+    合并多个规则命中 CSV（支持通配符），同一 (规则, 日期, 代码) 只保留最后一行；
+    按 order 中的规则顺序（未列出的规则按首次出现的顺序）、日期、代码排列
+    """
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    frames = [pd.read_csv(p, dtype={"日期": str, "代码": str}, encoding="utf-8-sig") for p in paths]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return paths, pd.DataFrame(columns=RULE_HIT_COLUMNS)
+    merged = pd.concat(frames, ignore_index=True).drop_duplicates(RULE_HIT_KEY, keep="last")
+    rank = {name: i for i, name in enumerate(dict.fromkeys([*order, *merged["规则"]]))}
+    merged = merged.assign(_order=merged["规则"].map(rank)).sort_values(["_order", "日期", "代码"], kind="stable")
+    return paths, merged.drop(columns="_order").reset_index(drop=True)
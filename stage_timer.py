@@ -0,0 +1,100 @@
+"""
+分阶段计时与 cProfile 剖析
+
+StageTimer 按阶段名累计每次耗时，汇总出次数、合计与 p50 / p95 / p99，可导出 JSON；
+选股脚本（取清单 / 抓取 / 解析 / 判定 / 写出）与对账页面（读取 / 表头探测 / 清洗 / 匹配 / 渲染）共用。
+"""
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+
+import numpy as np
+
+STAGE_QUANTILES = (50, 95, 99)
+SUMMARY_COLUMNS = ["阶段", "次数", "合计(ms)", "p50(ms)", "p95(ms)", "p99(ms)", "最大(ms)"]
+
+
+class StageTimer:
+    """
+    各阶段耗时样本（秒），阶段按首次出现的顺序排列
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - began)
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        """
+        {阶段: {count, total_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        out = {}
+        for name, samples in self.samples.items():
+            ms = np.asarray(samples) * 1000
+            out[name] = {"count": len(ms), "total_ms": round(float(ms.sum()), 3)}
+            for q, v in zip(STAGE_QUANTILES, np.percentile(ms, STAGE_QUANTILES)):
+                out[name][f"p{q}_ms"] = round(float(v), 3)
+            out[name]["max_ms"] = round(float(ms.max()), 3)
+        return out
+
+    def summary_rows(self):
+        """
+        报告用的表格行（列见 SUMMARY_COLUMNS）
+        """
+        return [
+            (name, s["count"], s["total_ms"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"])
+            for name, s in self.summary().items()
+        ]
+
+    def to_json(self, **extra):
+        return json.dumps({**extra, "stages": self.summary()}, ensure_ascii=False, indent=2)
+
+    def write_json(self, path, **extra):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json(**extra))
+
+
+def timed(timer, name):
+    """
+    timer 为 None 时不计时
+    """
+    return timer.stage(name) if timer is not None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def profiled(path=None, enabled=True):
+    """
+    在 cProfile 下执行代码块，产出 Profile（未启用时为 None）；给出 path 时结束后写入 .prof 文件
+    """
+    if not enabled:
+        yield None
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+
+
+def profile_report(profile, limit=30):
+    """
+    按累计耗时排序的前 limit 个函数（pstats 文本）
+    """
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,354 @@
+import contextlib
+import importlib.util
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from compact_frame import compact_frame, concat_compact
+from stage_timer import timed
+
+# 解析器版本号：解析规则或输出格式变化时递增，旧的缓存结果随之失效
+PARSER_VERSION = "4"
+
+# 表头探测只看前若干行
+HEADER_SCAN_ROWS = 40
+
+# 流式读取时每块的行数
+CHUNK_ROWS = 50000
+
+# pd.read_excel 默认视为缺失值的文本
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+# 无表头表格列推断：日期与金额的文本样式，以及判定所需的最小占比
+DATE_PATTERN = r"^\d{4}[-/.年]?\d{1,2}[-/.月]?\d{1,2}"
+AMOUNT_PATTERN = r"^[+-]?¥?\d+\.\d{1,2}$"
+INFER_MIN_RATIO = 0.6
+
+# 优先级排序的映射规则
+MAPPING_RULES = [
+    ("时间", ["交易时间", "日期", "时间"]),
+    ("金额", ["金额", "支出金额", "收入/支出", "交易金额"]),
+    ("方向", ["收/支", "方向"]),
+    ("摘要", ["摘要", "交易详情"]),
+    ("商品", ["商品", "商品名称"]),
+    ("商户", ["商户", "商户名称"]),
+    ("交易对方", ["交易对方", "交易对象"]),
+    ("对方户名", ["对方户名", "对方名称"])
+]
+
+DESC_FIELDS = ["摘要", "商户", "商品"]
+EXTRA_FIELDS = ["对方户名", "交易对方", "商品"]
+
+
+class StatementParseError(ValueError):
+    """
+    账单解析失败：type_tag 为账单类型，reason 为失败原因，missing 为缺失的关键字段
+    """
+
+    def __init__(self, type_tag, reason, missing=()):
+        self.type_tag = type_tag
+        self.reason = reason
+        self.missing = tuple(missing)
+        super().__init__(f"{type_tag} {reason}")
+
+
+@contextlib.contextmanager
+def parse_errors(type_tag):
+    """
+    把读取/清洗过程中的任意异常统一包装为 StatementParseError
+    """
+    try:
+        yield
+    except StatementParseError:
+        raise
+    except Exception as e:
+        raise StatementParseError(type_tag, f"解析失败: {e}") from e
+
+
+def is_header_row(values):
+    """
+    判断一行是否为表头：同时含有时间类与金额类字样
+    """
+    row_str = " ".join([str(x) for x in values if pd.notna(x)])
+    return ("时间" in row_str or "日期" in row_str) and ("金额" in row_str or "支出" in row_str)
+
+
+def find_header_row(raw):
+    """
+    在已读入内存的无表头数据中定位表头行，找不到时返回 0
+    """
+    for i, values in enumerate(raw.head(HEADER_SCAN_ROWS).itertuples(index=False, name=None)):
+        if is_header_row(values):
+            return i
+    return 0
+
+
+def make_columns(header_values):
+    """
+    生成列名，规则与 pd.read_excel 一致：空列名为 "Unnamed: i"，重名追加 ".1"、".2"
+    """
+    columns, seen = [], {}
+    for i, v in enumerate(header_values):
+        name = str(v).strip() if pd.notna(v) else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def map_columns(columns):
+    """
+    按映射规则把原始列名映射到标准字段，返回 {原始列名: 标准字段}
+    """
+    found_map = {}
+    used_cols = set()
+    for std, targets in MAPPING_RULES:
+        for c in columns:
+            if c in used_cols: continue
+            if any(t in c for t in targets):
+                found_map[c] = std
+                used_cols.add(c)
+                break # 该标准列已找到
+    return found_map
+
+
+def clean_amount(values):
+    """
+    向量化金额清洗：去掉 ¥ 与千分位，识别正负号；无法解析的文本记为 0，空单元格保持 NaN
+    """
+    s = values.astype(str).str.replace("¥", "", regex=False).str.replace(",", "", regex=False).str.strip()
+    num = pd.to_numeric(s, errors="coerce")
+    return num.where(num.notna() | values.isna(), 0.0).astype("float64")
+
+
+def direction_sign(values):
+    """
+    "支" 字样记为支出（-1），其余为 1
+    """
+    return np.where(values.astype(str).str.contains("支", regex=False), -1, 1)
+
+
+def join_desc(df, cols):
+    """
+    多列描述按 " | " 拼接（逐列向量化拼接，替代逐行 agg）
+    """
+    parts = [df[c].fillna("").astype(str) for c in cols]
+    out = parts[0]
+    for p in parts[1:]:
+        out = out + " | " + p
+    return out
+
+
+def clean_frame(df, type_tag="ICBC"):
+    """
+    对已带列名的原始数据完成：映射列 -> 清洗金额/方向/日期，输出标准结果列
+    """
+    # 逐列推断类型，等价于带表头读取时 pandas 的类型推断
+    df = df.infer_objects()
+
+    found_map = map_columns(df.columns)
+    missing = [std for std in ("时间", "金额") if std not in found_map.values()]
+    if missing:
+        raise StatementParseError(type_tag, "账单识别失败：找不到关键的时间或金额列", missing)
+
+    # 预先处理好描述（在 rename 之前，使用原始列名防止索引混淆）
+    desc_orig_cols = [c for c, std in found_map.items() if std in DESC_FIELDS]
+    if desc_orig_cols:
+        total_desc = join_desc(df, desc_orig_cols)
+    else:
+        total_desc = pd.Series("无详细描述", index=df.index)
+
+    # 执行重命名
+    df = df.rename(columns=found_map)
+
+    amount = clean_amount(df["金额"])
+    if "方向" in df.columns:
+        amount = amount * direction_sign(df["方向"])
+
+    res = pd.DataFrame({
+        "日期": pd.to_datetime(df["时间"], errors='coerce').dt.date,
+        "描述": total_desc,
+        "金额": amount,
+    })
+    for col in EXTRA_FIELDS:
+        if col in df.columns:
+            res[col] = df[col].astype(str).fillna("-")
+        else:
+            res[col] = "-"
+
+    return res.dropna(subset=["日期", "金额"]).copy()
+
+
+def frame_from_raw(raw, type_tag="ICBC", timer=None):
+    """
+    在内存中的无表头数据上完成：定位表头 -> 映射列 -> 清洗金额/方向/日期；
+    传入 timer (StageTimer) 时记录 header / clean 阶段耗时
+    """
+    with timed(timer, "header"):
+        start_row = find_header_row(raw)
+        df = raw.iloc[start_row + 1:].reset_index(drop=True)
+        df.columns = make_columns(raw.iloc[start_row].tolist())
+    with timed(timer, "clean"):
+        return clean_frame(df, type_tag)
+
+
+def infer_columns(raw, type_tag="ICBC"):
+    """
+    无表头表格的列推断：日期样式占比最高的列为交易日期，其后最左侧的金额样式列为交易金额，
+    首个文本列为摘要；其余列保留 col_i 命名
+    """
+    sample = raw.head(200).astype(str).apply(lambda c: c.str.replace(",", "", regex=False).str.strip())
+    date_ratio = sample.apply(lambda c: c.str.match(DATE_PATTERN).mean())
+    amount_ratio = sample.apply(lambda c: c.str.match(AMOUNT_PATTERN).mean())
+
+    date_col = date_ratio.idxmax() if len(date_ratio) and date_ratio.max() >= INFER_MIN_RATIO else None
+    # 金额只在日期列之后找，避免把日期前的序号 / 流水号列当作金额
+    after_date = list(raw.columns)[list(raw.columns).index(date_col) + 1:] if date_col is not None else []
+    amount_cols = [c for c in after_date if amount_ratio[c] >= INFER_MIN_RATIO]
+    if date_col is None or not amount_cols:
+        raise StatementParseError(type_tag, "账单识别失败：无法推断日期或金额列", ["时间", "金额"])
+
+    names = {date_col: "交易日期", amount_cols[0]: "交易金额"}
+    text_cols = [c for c in raw.columns if c not in names and date_ratio[c] < 0.2 and amount_ratio[c] < 0.2]
+    if text_cols:
+        names[text_cols[0]] = "摘要"
+    return [names.get(c, f"col_{c}") for c in raw.columns]
+
+
+def frame_from_table_rows(rows, type_tag="ICBC"):
+    """
+    PDF 等表格抽取结果（行列表）转为标准结果列：有表头行时按表头映射，否则按内容推断列
+    """
+    raw = pd.DataFrame(rows, dtype=object)
+    if raw.empty:
+        raise StatementParseError(type_tag, "账单识别失败：未抽取到表格")
+    # PDF 单元格内的折行只是排版产物
+    raw = raw.replace(r"\s*\n\s*", "", regex=True).replace(list(NA_STRINGS), np.nan)
+
+    with parse_errors(type_tag):
+        start_row = find_header_row(raw)
+        if is_header_row(raw.iloc[start_row].tolist()):
+            header = raw.iloc[start_row].tolist()
+            df = raw.iloc[start_row + 1:]
+            # 每页重复的表头行
+            df = df[~(df == pd.Series(header, index=df.columns)).all(axis=1)].reset_index(drop=True)
+            df.columns = make_columns(header)
+        else:
+            df = raw.reset_index(drop=True)
+            df.columns = infer_columns(raw, type_tag)
+        return clean_frame(df, type_tag)
+
+
+def _convert_cell(value):
+    """
+    单元格取值规则与 pd.read_excel 保持一致：空单元格与 NA 字样为 NaN，整数值浮点数转 int
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in NA_STRINGS:
+        return np.nan
+    return value
+
+
+def iter_raw_chunks(source, chunk_rows=CHUNK_ROWS, timer=None):
+    """
+    只读模式逐行读取第一个工作表，边读边探测表头，按块产出带列名的原始数据；
+    传入 timer 时记录 read（打开工作簿与逐块读取）与 header（表头探测）阶段耗时
+
+    同一时刻只在内存中保留一个数据块，峰值内存与文件大小无关。
+    """
+    from openpyxl import load_workbook
+
+    with timed(timer, "read"):
+        wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+
+        # 在前 HEADER_SCAN_ROWS 行内探测表头；找不到时与一次性读取一致，以首行为表头
+        with timed(timer, "header"):
+            head = []
+            for row in rows:
+                head.append(row)
+                if is_header_row(row) or len(head) >= HEADER_SCAN_ROWS:
+                    break
+            if not head:
+                return
+            header_at = len(head) - 1 if is_header_row(head[-1]) else 0
+            columns = make_columns(head[header_at])
+        width = len(columns)
+
+        offset = 0
+        rows = itertools.chain(head[header_at + 1:], rows)
+        while True:
+            with timed(timer, "read"):
+                buf = []
+                for row in itertools.islice(rows, chunk_rows):
+                    cells = [_convert_cell(v) for v in row[:width]]
+                    buf.append(cells + [np.nan] * (width - len(cells)))
+                if not buf:
+                    return
+                chunk = pd.DataFrame(buf, columns=columns, index=pd.RangeIndex(offset, offset + len(buf)), dtype=object)
+            yield chunk
+            offset += len(buf)
+    finally:
+        wb.close()
+
+
+def iter_excel_chunks(source, type_tag="ICBC", chunk_rows=CHUNK_ROWS, timer=None):
+    """
+    流式解析：逐块产出与 parse_excel_universal 相同列与类型的结果；
+    传入 timer 时记录 read / header（见 iter_raw_chunks）与逐块 clean 阶段耗时
+    """
+    with parse_errors(type_tag):
+        for raw in iter_raw_chunks(source, chunk_rows, timer):
+            with timed(timer, "clean"):
+                frame = clean_frame(raw, type_tag)
+            yield frame
+
+
+def parse_excel_streaming(source, type_tag="ICBC", chunk_rows=CHUNK_ROWS, timer=None, compact=False):
+    """
+    流式读取模式下的完整解析结果，与 parse_excel_universal 输出一致；
+    compact=True 时每块解析后立即转为紧凑表示，不保留整份标准结果
+    """
+    chunks = iter_excel_chunks(source, type_tag, chunk_rows, timer)
+    if compact:
+        chunks = (compact_frame(chunk) for chunk in chunks)
+    chunks = list(chunks)
+    if not chunks:
+        raise StatementParseError(type_tag, "账单识别失败：工作表为空")
+    return concat_compact(chunks) if compact else pd.concat(chunks)
+
+
+def excel_engine():
+    """
+    优先使用 calamine（Rust 实现，读取速度约为 openpyxl 的十倍），未安装时回退 pandas 默认引擎
+    """
+    return "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def parse_excel_universal(uploaded_file, type_tag="ICBC", timer=None, compact=False):
+    """
+    通用 Excel 账单解析逻辑：工作表只读取一次，表头探测与清洗都在内存中完成；
+    传入 timer (StageTimer) 时记录 read / header / clean 阶段耗时，compact=True 时返回紧凑表示（见 compact_frame）
+    """
+    with parse_errors(type_tag):
+        with timed(timer, "read"):
+            raw = pd.read_excel(uploaded_file, header=None, engine=excel_engine())
+        if raw.empty:
+            raise StatementParseError(type_tag, "账单识别失败：工作表为空")
+        df = frame_from_raw(raw, type_tag, timer)
+        del raw
+        if not compact:
+            return df
+        with timed(timer, "compact"):
+            return compact_frame(df)
@@ -0,0 +1,123 @@
+"""
+选股标的清单：带 TTL 的本地缓存、确定性分片与分片结果合并
+
+分片按代码的 CRC32 取模，与清单顺序及其余代码无关：各 CI 任务即使拿到的清单略有差异，
+同一代码也总落在同一分片，合并后不重不漏。
+"""
+import glob
+import json
+import os
+import re
+import time
+import zlib
+
+import pandas as pd
+
+UNIVERSE_CACHE_PATH = os.getenv("STOCK_UNIVERSE_CACHE", "stock_universe.csv")
+UNIVERSE_TTL = float(os.getenv("STOCK_UNIVERSE_TTL", 24 * 3600))
+
+# 涵盖沪深主板、创业板、科创板
+UNIVERSE_PREFIXES = ('00', '60', '300', '688')
+
+RESULT_KEY = ["日期", "代码"]
+
+# 分片输出文件名中的分片标记，如 results_20260203_shard2of4.csv
+SHARD_PATTERN = re.compile(r"_shard(\d+)of(\d+)")
+
+
+def read_universe(path=UNIVERSE_CACHE_PATH, ttl=UNIVERSE_TTL):
+    """
+    读取缓存清单 [{'code', 'name'}]；文件不存在、损坏或超过 ttl 秒时返回 None（ttl=None 不检查时效）
+    """
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            return None
+        df = pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+        return df[["code", "name"]].fillna("").to_dict("records") or None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_universe(stocks, path=UNIVERSE_CACHE_PATH):
+    """
+    写入缓存清单（先写临时文件再替换，避免并发任务读到半个文件）
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.DataFrame(stocks, columns=["code", "name"]).to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    os.replace(tmp_path, path)
+
+
+def parse_shard(spec):
+    """
+    解析 "i/N"（1 ≤ i ≤ N），返回 (i, N)
+    """
+    index, _, count = spec.partition("/")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"分片参数应为 i/N 且 1 ≤ i ≤ N: {spec}")
+    return index, count
+
+
+def shard_of(code, count):
+    """
+    代码所属分片 (1..count)
+    """
+    return zlib.crc32(str(code).encode()) % count + 1
+
+
+def shard_stocks(stocks, index, count):
+    """
+    取第 index 片（共 count 片）的标的，按代码排序
+    """
+    return sorted((s for s in stocks if shard_of(s["code"], count) == index), key=lambda s: s["code"])
+
+
+def merge_results(patterns):
+    """
+    合并多个分片的结果 CSV（支持通配符），按日期升序、区间涨幅降序排列，同一 (日期, 代码) 只保留一行
+    """
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    frames = [pd.read_csv(p, dtype={"日期": str, "代码": str}, encoding="utf-8-sig") for p in paths]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return paths, pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True).drop_duplicates(RESULT_KEY)
+    return paths, merged.sort_values(by=["日期", "区间涨幅%"], ascending=[True, False]).reset_index(drop=True)
+
+
+def write_shard_stats(path, symbols, stats):
+    """
+    写出分片的抓取统计（标的数 + FetchStats.to_dict），供合并报告汇总
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"symbols": symbols, "stats": stats.to_dict()}, f, ensure_ascii=False)
+
+
+def read_shard_stats(patterns):
+    """
+    读取各分片的抓取统计（支持通配符），返回 ({分片标记: 统计}, 标的总数)；损坏的文件跳过
+    """
+    items, symbols = {}, 0
+    for path in sorted({p for pattern in patterns for p in glob.glob(pattern)}):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        match = SHARD_PATTERN.search(path)
+        items[match.group(0) if match else path] = data.get("stats", {})
+        symbols += data.get("symbols", 0)
+    return items, symbols
+
+
+def missing_shards(paths):
+    """
+    按文件名中的分片标记找出缺失的分片（如某个分片任务失败），返回 ["i/N", ...]
+    """
+    seen, counts = set(), set()
+    for path in paths:
+        match = SHARD_PATTERN.search(os.path.basename(path))
+        if match:
+            seen.add((int(match.group(1)), int(match.group(2))))
+            counts.add(int(match.group(2)))
+    return [f"{i}/{n}" for n in sorted(counts) for i in range(1, n + 1) if (i, n) not in seen]
@@ -0,0 +1,109 @@
+"""
+本地对账台账：逐笔去重入账、只对新流水日期重新对账、审核失效与清空
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from audit_ledger import DEFAULT_LEDGER, AuditLedger, ledger_path
+from reconcile_engine import STATUS_DIFF, STATUS_MATCHED
+
+DAY1, DAY2 = date(2026, 2, 3), date(2026, 2, 4)
+
+
+def flow(*rows):
+    """
+    (日期, 金额, 描述) -> clean_frame 格式的流水表
+    """
+    return pd.DataFrame({
+        "日期": pd.to_datetime([d for d, _, _ in rows]),
+        "金额": [a for _, a, _ in rows],
+        "描述": [t for _, _, t in rows],
+    })
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = AuditLedger(str(tmp_path / "ledger.sqlite"))
+    yield ledger
+    ledger.close()
+
+
+def test_ingest_dedups_by_content_and_ordinal(ledger):
+    coffee = (DAY1, 25.0, "咖啡")
+    assert ledger.ingest("bank", flow(coffee, coffee, (DAY2, 9.9, "地铁"))) == {DAY1, DAY2}
+    # 同一份账单重复上传不入账
+    assert ledger.ingest("bank", flow(coffee, coffee, (DAY2, 9.9, "地铁"))) == set()
+    assert len(ledger.frame("bank")) == 3
+    # 同日同额同描述的第三笔是新流水，前两笔按序号识别为已存在
+    assert ledger.ingest("bank", flow(coffee, coffee, coffee)) == {DAY1}
+    assert len(ledger.frame("bank", {DAY1})) == 3
+    # 描述不同即为不同流水；另一端互不影响
+    assert ledger.ingest("bank", flow((DAY1, 25.0, "奶茶"))) == {DAY1}
+    assert ledger.ingest("wechat", flow(coffee)) == {DAY1}
+    assert len(ledger.frame("bank")) == 5 and len(ledger.frame("wechat")) == 1
+    with pytest.raises(ValueError):
+        ledger.ingest("alipay", flow(coffee))
+
+
+def test_reconcile_only_affected_dates(ledger):
+    affected = ledger.ingest_and_reconcile(
+        flow((DAY1, 10.0, "a"), (DAY2, 20.0, "b")),
+        flow((DAY1, 10.0, "a"), (DAY2, 21.0, "b")),
+    )
+    assert affected == {DAY1, DAY2}
+    report = ledger.report().set_index("日期")
+    assert report.loc[DAY1, "状态"] == STATUS_MATCHED
+    assert report.loc[DAY2, "状态"] == STATUS_DIFF
+    assert report.loc[DAY2, "银行漏项"] == [20.0] and report.loc[DAY2, "微信漏项"] == [21.0]
+
+    # 重叠上传：只有出现新流水的 DAY2 重新对账
+    affected = ledger.ingest_and_reconcile(flow((DAY1, 10.0, "a"), (DAY2, 21.0, "c")), flow((DAY1, 10.0, "a")))
+    assert affected == {DAY2}
+    report = ledger.report().set_index("日期")
+    assert report.loc[DAY2, "银行支笔数"] == 2 and report.loc[DAY2, "状态"] == STATUS_DIFF
+    assert report.loc[DAY2, "银行漏项"] == [20.0] and report.loc[DAY2, "微信漏项"] == []
+    assert ledger.reconcile(set()) == 0
+
+
+def test_audit_invalidated_when_day_gains_transactions(ledger):
+    ledger.ingest_and_reconcile(flow((DAY1, 10.0, "a"), (DAY2, 20.0, "b")), flow((DAY1, 11.0, "a")))
+    ledger.audit(DAY1)
+    ledger.audit(DAY2)
+    assert ledger.audited_dates() == {DAY1, DAY2}
+
+    # 重复上传不改变笔数，审核仍有效
+    ledger.ingest_and_reconcile(flow((DAY1, 10.0, "a")), flow((DAY1, 11.0, "a")))
+    assert ledger.audited_dates() == {DAY1, DAY2}
+
+    # DAY1 新入账一笔：该日审核失效，DAY2 不受影响
+    ledger.ingest_and_reconcile(flow((DAY1, 5.0, "c")), None)
+    assert ledger.audited_dates() == {DAY2}
+    # 重新审核后按新的笔数生效
+    ledger.audit(DAY1)
+    assert ledger.audited_dates() == {DAY1, DAY2}
+    ledger.revoke(DAY2)
+    assert ledger.audited_dates() == {DAY1}
+
+
+def test_clear(ledger):
+    rows = flow((DAY1, 10.0, "a"))
+    ledger.ingest_and_reconcile(rows, rows)
+    ledger.audit(DAY1)
+    ledger.clear()
+    assert ledger.report().empty
+    assert ledger.frame("bank").empty and ledger.frame("wechat").empty
+    assert ledger.audited_dates() == set()
+    # 清空后同一份流水重新入账
+    assert ledger.ingest_and_reconcile(rows, rows) == {DAY1}
+    assert ledger.audited_dates() == set()
+
+
+def test_ledger_path():
+    base = "/data/debit_sync_ledger.sqlite"
+    assert ledger_path(DEFAULT_LEDGER, base) == base
+    assert ledger_path("  ", base) == base
+    assert ledger_path("家庭", base) == "/data/debit_sync_ledger_家庭.sqlite"
+    # 路径分隔符与点号都被替换，名称不会跳出台账目录
+    assert ledger_path("../x y", base) == "/data/debit_sync_ledger____x_y.sqlite"
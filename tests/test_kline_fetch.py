@@ -0,0 +1,150 @@
+"""
+K 线抓取引擎对本地替身服务 (benchmarks/kline_server.py) 的重试、错误归类与熔断测试
+"""
+import asyncio
+import functools
+
+import pytest
+
+import kline_fetch
+from kline_fetch import FetchStats, fetch_klines
+from kline_server import HISTORY_DAYS, start_server
+
+CODES = [f"{600000 + i}" for i in range(40)]
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    # 退避时间缩短到毫秒级，测试只关心重试次数
+    monkeypatch.setattr(kline_fetch, "BACKOFF_BASE", 0.001)
+
+
+def serve(request, **kwargs):
+    server, url = start_server(**kwargs)
+    request.addfinalizer(server.shutdown)
+    return server, url
+
+
+def run(codes, url, **kwargs):
+    stats = FetchStats()
+    result = asyncio.run(fetch_klines(codes, concurrency=8, rate=10000, days=20, url=url, stats=stats, **kwargs))
+    return result, stats
+
+
+def test_fetch_success(request):
+    server, url = serve(request)
+    result, stats = run(CODES, url)
+    assert stats.ok == len(CODES) and not stats.failed and stats.retries == 0
+    assert all(len(result[c]) == 20 for c in CODES)
+    assert server.requests == len(CODES)
+    # keep-alive：连接数远少于请求数
+    assert server.connections <= 16
+
+
+def test_transient_errors_are_retried(request):
+    server, url = serve(request, error_rate=0.3)
+    result, stats = run(CODES, url)
+    assert stats.retries > 0
+    assert stats.ok + len(stats.failed) == len(CODES)
+    # 每次尝试对应一次请求：成功 + 重试 + 最终失败
+    assert server.requests == stats.ok + stats.retries + len(stats.failed)
+    assert set(stats.errors) <= {"http_429", "http_5xx"}
+    assert sorted(stats.failed) == sorted(c for c, df in result.items() if df is None)
+
+
+def test_persistent_errors_exhaust_retries(request, monkeypatch):
+    monkeypatch.setattr(kline_fetch, "CircuitBreaker", functools.partial(kline_fetch.CircuitBreaker, window=10, cooldown=0.05))
+    server, url = serve(request, error_rate=1.0)
+    result, stats = run(CODES, url)
+    assert stats.ok == 0 and sorted(stats.failed) == sorted(CODES)
+    assert stats.retries == len(CODES) * kline_fetch.MAX_RETRIES
+    assert sum(stats.errors.values()) == len(CODES)
+    assert set(stats.errors) <= {"http_429", "http_5xx"}
+    assert server.requests == len(CODES) * (kline_fetch.MAX_RETRIES + 1)
+    assert stats.breaker_trips >= 1
+
+
+def test_client_errors_are_not_retried(request):
+    server, url = serve(request)
+    result, stats = run(CODES, url.replace("fqkline", "missing"))
+    assert stats.retries == 0
+    assert stats.errors == {"http_4xx": len(CODES)}
+    assert server.requests == len(CODES)
+
+
+def test_timeouts_are_classified(request, monkeypatch):
+    monkeypatch.setattr(kline_fetch, "REQUEST_TIMEOUT", 0.05)
+    server, url = serve(request, latency_ms=200)
+    result, stats = run(CODES[:4], url)
+    assert stats.errors == {"timeout": 4}
+    assert stats.retries == 4 * kline_fetch.MAX_RETRIES
+
+
+def test_breaker_halves_concurrency_and_recovers():
+    breaker = kline_fetch.CircuitBreaker(8, window=10, threshold=0.5, cooldown=60)
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.trips == 1 and breaker.limit == 4 and breaker.is_open
+    for _ in range(10):
+        breaker.record(True)
+    assert breaker.limit == 5
+
+
+def test_eastmoney_source(request):
+    server, url = serve(request)
+    sources = kline_fetch.make_sources("eastmoney", {"eastmoney": server.eastmoney_url})
+    result, stats = run(CODES[:5], None, sources=sources)
+    assert stats.ok == 5
+    assert list(result[CODES[0]].columns) == ["date", "close", "high", "turnover"]
+    assert len(result[CODES[0]]) == min(20, HISTORY_DAYS)
+
+
+def two_sources(request, **fast_kwargs):
+    fast, fast_url = serve(request, latency_ms=5, **fast_kwargs)
+    steady, _ = serve(request, latency_ms=20)
+    return kline_fetch.make_sources("tencent,eastmoney", {"tencent": fast_url, "eastmoney": steady.eastmoney_url})
+
+
+def hedge_once(sources, primary_samples):
+    """
+    主源直方图预置 primary_samples（秒）后对一只股票发一次补发请求，返回 (结果, 路由器)
+    """
+    import aiohttp
+
+    async def go():
+        router = kline_fetch.SourceRouter(sources, concurrency=4, rate=1000, hedge=True)
+        for seconds in primary_samples:
+            router.stats.latency["tencent"].add(seconds)
+        async with aiohttp.ClientSession() as session:
+            return await router.hedged_request(session, sources[0], CODES[0], 20), router
+
+    return asyncio.run(go())
+
+
+def test_hedge_records_censored_primary_latency(request):
+    sources = two_sources(request, tail_rate=1.0, tail_ms=400)
+    (df, kind), router = hedge_once(sources, [0.01] * 20)
+    assert df is not None and kind is None
+    assert router.stats.hedged == 1
+    primary = router.stats.latency["tencent"]
+    # 落败的主源以取消时已等待的时长记一次截尾样本（不低于补发阈值 HEDGE_MIN_DELAY）
+    assert primary.total == 21
+    assert max(primary.recent) >= kline_fetch.HEDGE_MIN_DELAY * 1000
+    assert router.stats.latency["eastmoney"].total == 1
+
+
+def test_hedge_rate_is_capped(request, monkeypatch):
+    monkeypatch.setattr(kline_fetch, "HEDGE_MAX_RATIO", 0.0)
+    sources = two_sources(request, tail_rate=1.0, tail_ms=200)
+    (df, kind), router = hedge_once(sources, [0.01] * 20)
+    assert df is not None and router.stats.hedged == 0
+    assert router.stats.latency["eastmoney"].total == 0
+
+
+def test_hedged_fetch_matches_single_source(request):
+    sources = two_sources(request, tail_rate=0.2, tail_ms=300)
+    single, _ = run(CODES, None, sources=sources[:1])
+    hedged, stats = run(CODES, None, sources=sources, hedge=True)
+    assert stats.ok == len(CODES)
+    assert all(hedged[c].equals(single[c]) for c in CODES)
+    assert stats.hedged <= kline_fetch.HEDGE_MAX_RATIO * len(CODES) + 1
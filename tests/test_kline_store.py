@@ -0,0 +1,132 @@
+"""
+本地增量 K 线库：抓取计划（整段 / 最新 / 增量）、重叠 K 线校验与复权变动后的整段重抓
+"""
+import asyncio
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from kline_fetch import fetch_klines, make_sources
+from kline_server import start_server
+from kline_store import MARKET_TZ, KlineStore, iter_cached_klines
+
+CODES = ["600000", "000001"]
+DAYS = 20
+
+
+def at(day, hour=16):
+    return datetime(day.year, day.month, day.day, hour, tzinfo=MARKET_TZ).timestamp()
+
+
+@pytest.fixture
+def server(request):
+    server, url = start_server(end_date=date(2026, 2, 11))
+    request.addfinalizer(server.shutdown)
+    server.url = url
+    return server
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = KlineStore(str(tmp_path / "kline.sqlite"))
+    yield store
+    store.close()
+
+
+def cached(server, store, now):
+    async def collect():
+        return {code: (df, fetched) async for code, df, fetched in
+                iter_cached_klines(CODES, store, 4, 10000, server.url, now, days=DAYS)}
+    return asyncio.run(collect())
+
+
+def direct(server):
+    result = asyncio.run(fetch_klines(CODES, 4, 10000, days=DAYS, url=server.url))
+    return {code: df.astype({"close": float, "high": float, "turnover": float}) for code, df in result.items()}
+
+
+def test_plan_new_symbol_fetches_full_history(server, store):
+    fresh, starts = store.plan(CODES, at(date(2026, 2, 11)), DAYS)
+    assert fresh == [] and starts == {code: "" for code in CODES}
+
+    result = cached(server, store, at(date(2026, 2, 11)))
+    assert server.requests == len(CODES)
+    for code, df in direct(server).items():
+        got, fetched = result[code]
+        assert fetched and len(got) == DAYS
+        pd.testing.assert_frame_equal(got, df[got.columns])
+
+
+def test_plan_up_to_date_symbol_skips_request(server, store):
+    cached(server, store, at(date(2026, 2, 11)))
+    # 同一交易日收盘后再次扫描：直接读本地
+    assert store.plan(CODES, at(date(2026, 2, 11), 20), DAYS) == (CODES, {})
+    before = server.requests
+    result = cached(server, store, at(date(2026, 2, 11), 20))
+    assert server.requests == before
+    assert all(fetched and len(df) == DAYS for df, fetched in result.values())
+    # 盘中检查过的数据在收盘后过期
+    cached_intraday = at(date(2026, 2, 12), 10)
+    store._conn.execute("UPDATE checked SET at = ?", (cached_intraday,))
+    assert store.plan(CODES, at(date(2026, 2, 12), 16), DAYS)[0] == []
+
+
+def test_incremental_append_starts_from_second_to_last_bar(server, store):
+    cached(server, store, at(date(2026, 2, 11)))
+    server.end_date = date(2026, 2, 13)
+    fresh, starts = store.plan(CODES, at(date(2026, 2, 13)), DAYS)
+    assert fresh == [] and starts == {code: "2026-02-10" for code in CODES}
+
+    before = server.requests
+    result = cached(server, store, at(date(2026, 2, 13)))
+    assert server.requests - before == len(CODES)
+    for code, df in direct(server).items():
+        got, fetched = result[code]
+        assert fetched and got["date"].iloc[-1] == "2026-02-13" and len(got) == DAYS + 2
+        pd.testing.assert_frame_equal(got.tail(DAYS).reset_index(drop=True), df[got.columns])
+
+
+def test_incremental_overwrites_intraday_last_bar(server, store):
+    cached(server, store, at(date(2026, 2, 11)))
+    # 最后一根是盘中数据：增量抓取时被收盘数据覆盖，不触发整段重抓
+    store._conn.execute("UPDATE bars SET close = close + 1 WHERE date = '2026-02-11'")
+    server.end_date = date(2026, 2, 12)
+    before = server.requests
+    result = cached(server, store, at(date(2026, 2, 12)))
+    assert server.requests - before == len(CODES)
+    for code, df in direct(server).items():
+        got = result[code][0]
+        assert got["close"].iloc[-2] == df["close"].iloc[-2]
+
+
+def test_overlap_mismatch_triggers_full_refetch(server, store):
+    cached(server, store, at(date(2026, 2, 11)))
+    # 倒数第二根（重叠校验用）的本地价格与接口不一致，视为复权价变动
+    store._conn.execute("UPDATE bars SET close = close * 0.9 WHERE code = ? AND date = '2026-02-10'", (CODES[0],))
+    store._conn.execute("INSERT INTO bars VALUES (?, '2020-01-02', 1, 1, 1)", (CODES[0],))
+    server.end_date = date(2026, 2, 12)
+
+    before = server.requests
+    result = cached(server, store, at(date(2026, 2, 12)))
+    # 两只各一次增量请求，复权变动的一只再整段重抓一次
+    assert server.requests - before == len(CODES) + 1
+    expected = direct(server)
+    got = result[CODES[0]][0]
+    assert len(got) == DAYS and got["date"].iloc[0] != "2020-01-02"
+    pd.testing.assert_frame_equal(got, expected[CODES[0]][got.columns])
+    assert len(result[CODES[1]][0]) == DAYS + 1
+
+
+def test_merge_rejects_missing_overlap(store):
+    bars = pd.DataFrame({"date": ["2026-02-09", "2026-02-10"], "close": [10.0, 10.5], "high": [10.2, 10.6],
+                         "turnover": [1.0, 2.0]})
+    store.replace(CODES[0], bars, at(date(2026, 2, 10)))
+    later = pd.DataFrame({"date": ["2026-02-10", "2026-02-11"], "close": [10.5, 11.0], "high": [10.6, 11.0],
+                          "turnover": [2.0, 3.0]})
+    # 增量结果不从起始日开始、或本地没有起始日时不写入
+    assert not store.merge(CODES[0], later.iloc[1:], "2026-02-10")
+    assert not store.merge(CODES[0], later, "2026-02-08")
+    # 差异在 PRICE_EPS 内视为一致
+    assert store.merge(CODES[0], later.assign(close=[10.504, 11.0]), "2026-02-10")
+    assert store.load(CODES[0])["date"].tolist() == ["2026-02-09", "2026-02-10", "2026-02-11"]
@@ -0,0 +1,93 @@
+"""
+多来源组合对账：剪枝子集和搜索对照暴力枚举，以及节点预算截断
+"""
+import itertools
+import random
+
+import pandas as pd
+import pytest
+
+from reconcile_engine import STATUS_DIFF
+from reconcile_multi import METHOD_MANY_TO_ONE, METHOD_ONE_TO_MANY, STATUS_GROUP, _BudgetExceeded, find_subset, reconcile_multi
+
+
+def brute_force(target, values, size):
+    return any(sum(values[i] for i in combo) == target for combo in itertools.combinations(range(len(values)), size))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_subset_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        values = sorted((rng.randint(1, 12) for _ in range(rng.randint(0, 9))), reverse=True)
+        size = rng.randint(1, 5)
+        if values and size <= len(values) and rng.random() < 0.5:
+            # 一半的目标取自真实存在的组合
+            target = sum(rng.sample(values, size))
+        else:
+            target = rng.randint(1, 50)
+        found = find_subset(target, values, size, [10 ** 6])
+        assert (found is not None) == brute_force(target, values, size), (target, values, size)
+        if found is not None:
+            assert len(found) == size and len(set(found)) == size
+            assert sum(values[i] for i in found) == target
+
+
+def test_find_subset_node_budget():
+    # 全为偶数、目标为奇数：必须展开所有候选才能确认无解
+    values = list(range(40, 0, -2))
+    budget = [10 ** 6]
+    assert find_subset(61, values, 3, budget) is None
+    used = 10 ** 6 - budget[0]
+    assert used > 10
+
+    with pytest.raises(_BudgetExceeded):
+        find_subset(61, values, 3, [used - 1])
+    assert find_subset(61, values, 3, [used]) is None
+    # 单笔查找不消耗节点
+    assert find_subset(40, values, 1, [0]) == [0]
+
+
+def source(*amounts, day="2026-02-03"):
+    return pd.DataFrame({"日期": pd.to_datetime([day] * len(amounts)), "金额": list(amounts)})
+
+
+def test_reconcile_multi_groups():
+    report, detail = reconcile_multi({
+        "工行": source(100.0, 45.5, 12.0, 7.0),
+        "微信": source(12.0, 30.0, 20.0, 50.0, 45.5),
+        "支付宝": source(3.0, 4.0),
+    })
+    row = report.iloc[0]
+    assert row["状态"] == STATUS_GROUP and row["组合匹配"] == 2 and not row["搜索截断"]
+    assert row["匹配总额"] == 164.5
+    groups = {gid: g for gid, g in detail.groupby("组号")}
+    assert [g["匹配方式"].iat[0] for g in groups.values()] == [METHOD_ONE_TO_MANY, METHOD_ONE_TO_MANY]
+    # 两笔组合先于三笔组合搜索
+    assert sorted(groups[1]["金额"]) == [3.0, 4.0, 7.0]
+    assert set(groups[1]["来源"]) == {"工行", "支付宝"}
+    assert sorted(groups[2]["金额"]) == [20.0, 30.0, 50.0, 100.0]
+
+
+def test_reconcile_multi_many_to_one():
+    report, detail = reconcile_multi({"工行": source(20.0, 30.0), "微信": source(50.0)})
+    assert report["状态"].iat[0] == STATUS_GROUP
+    assert detail["匹配方式"].unique().tolist() == [METHOD_MANY_TO_ONE]
+
+
+def test_reconcile_multi_node_budget_truncates():
+    sources = {"工行": source(100.0), "微信": source(50.0, 30.0, 20.0)}
+    report, detail = reconcile_multi(sources, node_budget=1)
+    row = report.iloc[0]
+    assert row["搜索截断"] and row["状态"] == STATUS_DIFF and row["组合匹配"] == 0
+    assert detail.empty
+    assert row["工行漏项"] and row["微信漏项"]
+
+    report, detail = reconcile_multi(sources, node_budget=2)
+    assert not report["搜索截断"].iat[0] and report["状态"].iat[0] == STATUS_GROUP
+    assert len(detail) == 4
+
+
+def test_reconcile_multi_time_budget_truncates():
+    report, detail = reconcile_multi({"工行": source(100.0), "微信": source(50.0, 50.0, 1.0)}, time_budget=0)
+    assert report["搜索截断"].iat[0] and detail.empty
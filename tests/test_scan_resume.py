@@ -0,0 +1,159 @@
+"""
+断点续扫：结果流先于检查点落盘、中断后续扫与全量扫描结果一致、半行截断，以及退回本地旧数据的标的不记入检查点
+"""
+import asyncio
+import functools
+import os
+
+import pandas as pd
+import pytest
+
+import add
+import kline_fetch
+from kline_fetch import FetchStats, make_sources
+from kline_server import start_server
+from kline_store import KlineStore
+from limit_screen import RESULT_COLUMNS
+from scan_checkpoint import ScanCheckpoint
+from screen_rules import load_rules
+
+STOCKS = [{"code": f"{600000 + i}", "name": f"股{i}"} for i in range(30)]
+TARGETS = ["20260210", "20260211", "20260212"]
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(kline_fetch, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(kline_fetch, "CircuitBreaker", functools.partial(kline_fetch.CircuitBreaker, window=10, cooldown=0.05))
+
+
+@pytest.fixture
+def server(request):
+    server, url = start_server()
+    request.addfinalizer(server.shutdown)
+    server.sources = make_sources("tencent", {"tencent": url})
+    return server
+
+
+def scan(server, checkpoint, done=(), store=None, stats=None, rules=None):
+    asyncio.run(add.scan_market(STOCKS, TARGETS, 8, 10000, checkpoint, store, stats, server.sources, done=done,
+                                batch_size=10, rules=rules))
+
+
+def read_checkpoint(ckpt):
+    with open(ckpt.checkpoint_path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def test_resume_after_interrupted_batch(server, tmp_path):
+    rules = load_rules("default")
+    full = ScanCheckpoint("full", str(tmp_path), rules=True)
+    full.open()
+    scan(server, full, rules=rules)
+    full.close()
+    expected, expected_rules = full.load_results(), full.load_rule_hits(rules)
+    assert not expected.empty and not expected_rules.empty
+
+    # 第一批落盘后中断
+    ckpt = ScanCheckpoint("part", str(tmp_path), rules=True)
+    ckpt.open()
+    append = ckpt.append
+    calls = []
+
+    def append_once(*args):
+        if calls:
+            raise Interrupted
+        calls.append(1)
+        append(*args)
+
+    ckpt.append = append_once
+    with pytest.raises(Interrupted):
+        scan(server, ckpt, rules=rules)
+    ckpt.close()
+    first_batch = read_checkpoint(ckpt)
+    assert len(first_batch) == 10
+
+    ckpt = ScanCheckpoint("part", str(tmp_path), rules=True)
+    done = ckpt.open(resume=True)
+    assert done == set(first_batch)
+    before = server.requests
+    scan(server, ckpt, done, rules=rules)
+    ckpt.close()
+    # 续扫只抓未处理的标的
+    assert server.requests - before == len(STOCKS) - len(done)
+    assert sorted(read_checkpoint(ckpt)) == sorted(s["code"] for s in STOCKS)
+    pd.testing.assert_frame_equal(ckpt.load_results(), expected)
+    pd.testing.assert_frame_equal(ckpt.load_rule_hits(rules), expected_rules)
+
+    ckpt.remove()
+    assert not any(os.path.exists(p) for p in (ckpt.results_path, ckpt.checkpoint_path, ckpt.rules_path))
+
+
+def test_results_written_before_checkpoint(tmp_path):
+    ckpt = ScanCheckpoint("x", str(tmp_path))
+    ckpt.open()
+
+    class Crash:
+        def write(self, data):
+            raise Interrupted
+
+    ckpt._checkpoint.close()
+    ckpt._checkpoint = Crash()
+    row = pd.DataFrame([["20260210", "600000", "甲", 10.0, 1.0, 10.0, "涨停", 11.0]], columns=RESULT_COLUMNS)
+    with pytest.raises(Interrupted):
+        ckpt.append(row, ["600000"])
+    ckpt._checkpoint = None
+    ckpt.close()
+    # 检查点写入失败时该批结果已在结果流中，续扫会重做该批，合并时去重
+    assert ckpt.load_results()["代码"].tolist() == ["600000"]
+    assert ScanCheckpoint("x", str(tmp_path)).open(resume=True) == set()
+
+
+def test_resume_trims_partial_trailing_line(tmp_path):
+    ckpt = ScanCheckpoint("x", str(tmp_path))
+    ckpt.open()
+    row = pd.DataFrame([["20260210", "600000", "甲", 10.0, 1.0, 10.0, "涨停", 11.0]], columns=RESULT_COLUMNS)
+    ckpt.append(row, ["600000", "600001"])
+    ckpt.close()
+    # 模拟写到一半被杀：结果流与检查点末尾各有半行
+    with open(ckpt.results_path, "a", encoding="utf-8") as f:
+        f.write("20260210,6000")
+    with open(ckpt.checkpoint_path, "a", encoding="utf-8") as f:
+        f.write("6000")
+
+    ckpt = ScanCheckpoint("x", str(tmp_path))
+    assert ckpt.open(resume=True) == {"600000", "600001"}
+    ckpt.append(row.assign(代码="600002"), ["600002"])
+    ckpt.close()
+    assert read_checkpoint(ckpt) == ["600000", "600001", "600002"]
+    assert ckpt.load_results()["代码"].tolist() == ["600000", "600002"]
+
+
+def test_stale_fallback_not_checkpointed(server, tmp_path, monkeypatch):
+    # 替身服务的 K 线止于 2026-02，抓取深度放大到足以走增量抓取
+    monkeypatch.setattr(add, "history_days", lambda target_dates, lookback=1: 1000)
+    store = KlineStore(str(tmp_path / "kline.sqlite"))
+    ckpt = ScanCheckpoint("warm", str(tmp_path))
+    ckpt.open()
+    scan(server, ckpt, store=store)
+    ckpt.close()
+    assert len(read_checkpoint(ckpt)) == len(STOCKS)
+
+    # 本地数据过期后增量抓取全部失败：退回本地旧数据照常判定，但不记入检查点
+    store._conn.execute("UPDATE checked SET at = 0")
+    server.error_rate = 1.0
+    stats = FetchStats()
+    ckpt = ScanCheckpoint("stale", str(tmp_path))
+    ckpt.open()
+    scan(server, ckpt, store=store, stats=stats)
+    ckpt.close()
+    store.close()
+    assert sorted(stats.failed) == sorted(s["code"] for s in STOCKS)
+    assert read_checkpoint(ckpt) == []
+    warm = ScanCheckpoint("warm", str(tmp_path)).load_results()
+    assert not warm.empty
+    pd.testing.assert_frame_equal(ckpt.load_results(), warm)
@@ -0,0 +1,175 @@
+"""
+选股规则语言：AST 白名单、按股票分段的窗口运算（对照 pandas groupby().rolling()）与命中表合并
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from limit_screen import build_panel
+from screen_rules import (
+    MAX_WINDOW, RULE_HIT_COLUMNS, Rule, RuleContext, RuleError, evaluate_rules, load_rules, merge_rule_hits,
+    parse_rules, rules_lookback,
+)
+
+
+def bars(closes, highs=None, turnover=None, start="2026-01-05"):
+    days = pd.bdate_range(start, periods=len(closes)).strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "date": days,
+        "close": closes,
+        "high": closes if highs is None else highs,
+        "turnover": np.ones(len(closes)) if turnover is None else turnover,
+    })
+
+
+def random_panel(seed=0, sizes=(30, 1, 7, 45)):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, n in enumerate(sizes):
+        close = 10 + rng.normal(0, 1, n).cumsum()
+        turnover = rng.uniform(0, 5, n)
+        turnover[rng.random(n) < 0.1] = np.nan
+        frames.append((f"{600000 + i}", bars(close, close + 0.5, turnover)))
+    return build_panel(frames)
+
+
+@pytest.mark.parametrize("expr", [
+    "__import__('os').system('echo')",
+    "close.real > 1",
+    "(x := close) > 1",
+    "close = 1",
+    "close > 'a'",
+    "mean(close, 251) > 1",
+    "mean(close, 0) > 1",
+    "mean(close, 2.5) > 1",
+    "ref(close, n) > 1",
+    "[close][0] > 1",
+    "lambda: 1",
+    "volume > 1",
+])
+def test_rejects_non_whitelisted_syntax(expr):
+    with pytest.raises(RuleError):
+        Rule("x", expr)
+
+
+def test_rejects_type_mismatch_and_non_condition():
+    with pytest.raises(RuleError):
+        Rule("x", "close + 1")
+    with pytest.raises(RuleError):
+        Rule("x", "touch + 1 > 0")
+    with pytest.raises(RuleError):
+        Rule("x", "sum(close, 3) > 0 and close")
+
+
+def test_parse_rules_and_duplicate_names():
+    assert parse_rules("# 注释\n a = close > 1  # 行尾注释\n\nb = pct >= 5\n") == [("a", "close > 1"), ("b", "pct >= 5")]
+    with pytest.raises(RuleError):
+        parse_rules("close > 1")
+    with pytest.raises(RuleError):
+        load_rules(extra=["a = touch", "a = sealed"])
+    assert [r.name for r in load_rules("default")] == ["触及涨停", "连板", "炸板", "放量"]
+
+
+def test_lookback():
+    assert Rule("x", "close > 1").lookback == 0
+    assert Rule("x", "touch").lookback == 1
+    assert Rule("x", f"mean(turnover, {MAX_WINDOW}) > 1").lookback == MAX_WINDOW - 1
+    assert Rule("x", "ref(close, 50) > 1").lookback == 50
+    assert Rule("x", "turnover >= 3 * ref(mean(turnover, 5), 1)").lookback == 5
+    assert Rule("x", "count(pct > 5, 10) >= 2").lookback == 10
+    assert rules_lookback([]) == 1
+    assert rules_lookback(load_rules(extra=["a = close > 1", "b = ref(max(high, 20), 3) > close"])) == 22
+
+
+@pytest.mark.parametrize("how", ["sum", "mean", "max", "min"])
+@pytest.mark.parametrize("k", [1, 3, 8, 40])
+def test_rolling_matches_pandas(how, k):
+    panel = random_panel()
+    ctx = RuleContext(panel)
+    grouped = panel.groupby("code", observed=True, sort=False)["turnover"]
+    expected = grouped.rolling(k).agg(how).reset_index(level=0, drop=True).sort_index().to_numpy()
+    np.testing.assert_allclose(ctx.rolling(ctx.columns["turnover"], k, how), expected, equal_nan=True)
+
+
+def test_rolling_propagates_nan():
+    panel = build_panel([("600000", bars([1.0] * 6, turnover=[1, 2, np.nan, 4, 5, 6]))])
+    ctx = RuleContext(panel)
+    x = ctx.columns["turnover"]
+    np.testing.assert_array_equal(ctx.rolling(x, 2, "sum"), [np.nan, 3, np.nan, np.nan, 9, 11])
+    np.testing.assert_array_equal(ctx.rolling(x, 3, "max"), [np.nan, np.nan, np.nan, np.nan, np.nan, 6])
+    np.testing.assert_array_equal(ctx.rolling(x, 3, "min"), [np.nan, np.nan, np.nan, np.nan, np.nan, 4])
+
+
+@pytest.mark.parametrize("k", [1, 2, 7, 60])
+def test_shift_matches_pandas(k):
+    panel = random_panel(1)
+    ctx = RuleContext(panel)
+    expected = panel.groupby("code", observed=True, sort=False)["close"].shift(k).to_numpy()
+    np.testing.assert_array_equal(ctx.shift(ctx.columns["close"], k), expected)
+    cond = ctx.columns["close"] > 10
+    shifted = ctx.shift(cond, k)
+    assert shifted.dtype == bool
+    np.testing.assert_array_equal(shifted, pd.Series(expected > 10).where(~np.isnan(expected), False).to_numpy())
+
+
+def test_streak_restarts_per_code():
+    panel = random_panel(2)
+    ctx = RuleContext(panel)
+    cond = ctx.columns["close"] > 10
+    expected, run, prev = [], 0, None
+    for code, flag in zip(panel["code"], cond):
+        run = run + 1 if flag and code == prev else int(flag)
+        prev = code
+        expected.append(run)
+    np.testing.assert_array_equal(ctx.streak(cond), expected)
+
+
+def test_evaluate_rules_on_panel():
+    # 600000: 第 6 根封板、第 7 根再次封板（连板）、第 8 根触及未封（炸板）；300001 为 20% 涨跌幅
+    main = bars([10, 10, 10, 10, 10, 11, 12.1, 12.5], highs=[10, 10, 10, 10, 10, 11, 12.1, 13.31])
+    gem = bars([10, 10, 10, 10, 10, 12, 12, 12], highs=[10, 10, 10, 10, 10, 12, 12, 12])
+    short = bars([10, 11, 12.1])
+    panel = build_panel([("600000", main), ("300001", gem), ("600001", short)])
+    rules = load_rules(extra=["触及 = touch", "连板 = streak(sealed) >= 2", "炸板 = touch and not sealed"])
+    days = ["20260112", "20260113", "20260114"]
+    hits = evaluate_rules(panel, rules, days, {"600000": "甲", "300001": "乙"})
+
+    assert list(hits.columns) == RULE_HIT_COLUMNS
+    # 按规则顺序、日期排列，同日按面板中的股票顺序
+    assert list(hits.itertuples(index=False, name=None))[:2] == [
+        ("触及", "20260112", "600000", "甲", 11.0, 10.0, 13.64, 12.5),
+        ("触及", "20260112", "300001", "乙", 12.0, 20.0, 0.0, 12.0),
+    ]
+    assert hits["规则"].tolist() == ["触及"] * 4 + ["连板", "炸板"]
+    got = {(r.规则, r.日期, r.代码) for r in hits.itertuples()}
+    assert got == {
+        ("触及", "20260112", "300001"), ("触及", "20260112", "600000"),
+        ("触及", "20260113", "600000"), ("触及", "20260114", "600000"),
+        ("连板", "20260113", "600000"),
+        ("炸板", "20260114", "600000"),
+    }
+    # K 线不足 MIN_BARS 的股票不参与
+    assert "600001" not in set(hits["代码"])
+    assert evaluate_rules(panel, [], days).empty
+    assert evaluate_rules(build_panel([]), rules, days).empty
+
+
+def test_merge_rule_hits(tmp_path):
+    def hit(rule, day, code, close):
+        return [rule, day, code, "", close, 0.0, 0.0, close]
+
+    pd.DataFrame([hit("b", "20260210", "000002", 1), hit("a", "20260211", "000001", 1)],
+                 columns=RULE_HIT_COLUMNS).to_csv(tmp_path / "rules_x_shard1of2.csv", index=False)
+    pd.DataFrame([hit("a", "20260210", "000003", 2), hit("b", "20260210", "000002", 3), hit("c", "20260210", "000009", 1)],
+                 columns=RULE_HIT_COLUMNS).to_csv(tmp_path / "rules_x_shard2of2.csv", index=False)
+    pd.DataFrame(columns=RULE_HIT_COLUMNS).to_csv(tmp_path / "rules_y_shard1of2.csv", index=False)
+
+    paths, merged = merge_rule_hits([str(tmp_path / "rules_*_shard*.csv")], ["a", "b"])
+    assert len(paths) == 3
+    assert list(merged.columns) == RULE_HIT_COLUMNS
+    assert list(merged[["规则", "日期", "代码"]].itertuples(index=False, name=None)) == [
+        ("a", "20260210", "000003"), ("a", "20260211", "000001"), ("b", "20260210", "000002"), ("c", "20260210", "000009"),
+    ]
+    # 同一 (规则, 日期, 代码) 保留最后一行，代码保持字符串
+    assert merged.loc[merged["规则"] == "b", "收盘"].tolist() == [3]
+    assert merge_rule_hits([str(tmp_path / "none_*.csv")])[1].empty